@@ -0,0 +1,309 @@
+import argparse
+import numpy as np
+import profiling
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from engine import calculate_points_numpy, float_dtype
+from backends import Backend
+from colorizer import palette_colors
+
+CalculatePoints = Callable[[AppState, NDArray[np.complex128]], NDArray[np.int32]]
+
+DEFAULT_SUBSAMPLES = 4
+DEFAULT_EDGE_THRESHOLD = 32
+SAMPLES_PER_CHUNK = 2**20
+GPU_BACKENDS = ["cuda"]
+PERTURBATION_BACKENDS = ["perturbation", "perturbation-cuda"]
+
+
+class AntialiasStatistics:
+    """Counts the samples of an adaptive supersampling pass."""
+
+    def __init__(self, pixels: int, subsamples: int):
+        self.pixels = pixels
+        self.subsamples = subsamples
+        self.edge_pixels = 0
+        self.refined_pixels = 0
+
+    @property
+    def samples(self) -> int:
+        """The samples calculated: one per pixel plus those of refined pixels."""
+        return self.pixels + self.refined_pixels * self.subsamples**2
+
+    @property
+    def uniform_samples(self) -> int:
+        """The samples uniform supersampling at the same rate would calculate."""
+        return self.pixels * self.subsamples**2
+
+    @property
+    def fraction_of_uniform(self) -> float:
+        """The samples calculated as a fraction of uniform supersampling."""
+        return self.samples / self.uniform_samples if self.uniform_samples else 0.0
+
+    def add(self, other: "AntialiasStatistics") -> None:
+        """Adds the counts of another pass at the same rate, such as a frame.
+
+        Args:
+            other (AntialiasStatistics): The counts to add.
+        """
+        self.pixels += other.pixels
+        self.edge_pixels += other.edge_pixels
+        self.refined_pixels += other.refined_pixels
+
+    def __str__(self) -> str:
+        return (
+            f"{self.refined_pixels:,} of {self.pixels:,} pixels refined "
+            f"({self.edge_pixels:,} edges) with {self.subsamples}x"
+            f"{self.subsamples} samples: {self.samples:,} samples, "
+            f"{self.fraction_of_uniform:.1%} of uniform supersampling"
+        )
+
+
+def edge_strength(colors: NDArray[np.uint8]) -> NDArray[np.int32]:
+    """Measures how much every pixel differs from its four neighbours.
+
+    Args:
+        colors (NDArray[np.uint8]): The (height, width, 3) RGB colors.
+
+    Returns:
+        NDArray[np.int32]: The (height, width) largest difference of any color
+                           channel between each pixel and a neighbour.
+    """
+    signed_colors = colors.astype(np.int32)
+    strength = np.zeros(colors.shape[:2], dtype=np.int32)
+
+    vertical = np.abs(np.diff(signed_colors, axis=0)).max(axis=2)
+    np.maximum(strength[1:], vertical, out=strength[1:])
+    np.maximum(strength[:-1], vertical, out=strength[:-1])
+
+    horizontal = np.abs(np.diff(signed_colors, axis=1)).max(axis=2)
+    np.maximum(strength[:, 1:], horizontal, out=strength[:, 1:])
+    np.maximum(strength[:, :-1], horizontal, out=strength[:, :-1])
+
+    return strength
+
+
+def jittered_offsets(
+    count: int, subsamples: int, generator: np.random.Generator
+) -> NDArray[np.float64]:
+    """Places stratified, jittered subsamples inside pixels.
+
+    Every pixel is divided into a `subsamples` by `subsamples` grid of cells,
+    and one sample is placed at a random position inside each cell, which
+    avoids both the clumping of purely random samples and the aliasing of a
+    regular grid.
+
+    Args:
+        count (int): The number of pixels.
+        subsamples (int): The number of cells along each axis of a pixel.
+        generator (np.random.Generator): The source of the jitter.
+
+    Returns:
+        NDArray[np.float64]: A (count, subsamples**2, 2) array of (x, y) offsets
+                             from each pixel's sample point, within half a
+                             pixel in each direction.
+    """
+    cells = np.arange(subsamples)
+    cell_x, cell_y = np.meshgrid(cells, cells)
+    corners = np.stack([cell_x.ravel(), cell_y.ravel()], axis=1)
+
+    jitter = generator.random((count, subsamples**2, 2))
+    return (corners + jitter) / subsamples - 0.5
+
+
+def calculate_samples_numpy(
+    state: AppState, offsets: NDArray[np.complex128]
+) -> NDArray[np.int32]:
+    """Calculates the counts of sample points with the NumPy engine.
+
+    Args:
+        state (AppState): The view the samples belong to.
+        offsets (NDArray[np.complex128]): The offsets of the samples from the
+                                          centre of the view, in any shape.
+
+    Returns:
+        NDArray[np.int32]: The iteration count of every sample, honoring the
+                           view's short-circuits and precision.
+    """
+    return calculate_points_numpy(
+        offsets + state.center,
+        state.quality,
+        cardioid_check=state.cardioid_check,
+        periodicity_check=state.periodicity_check,
+        dtype=float_dtype(state),
+    )
+
+
+def calculate_samples_gpu(
+    state: AppState, offsets: NDArray[np.complex128]
+) -> NDArray[np.int32]:
+    """Calculates the counts of sample points with the CUDA kernel.
+
+    Args:
+        state (AppState): The view the samples belong to.
+        offsets (NDArray[np.complex128]): The offsets of the samples from the
+                                          centre of the view, in any shape.
+
+    Returns:
+        NDArray[np.int32]: The iteration count of every sample, honoring the
+                           view's short-circuits and precision.
+    """
+    from engine import calculate_points_gpu
+
+    return calculate_points_gpu(
+        offsets + state.center,
+        state.quality,
+        cardioid_check=state.cardioid_check,
+        periodicity_check=state.periodicity_check,
+        dtype=float_dtype(state),
+    )
+
+
+def calculate_samples_perturbation(
+    state: AppState, offsets: NDArray[np.complex128]
+) -> NDArray[np.int32]:
+    """Calculates the counts of sample points as offsets from a reference orbit.
+
+    Adding the offsets to the centre in double precision would move the
+    samples of a deep zoom to the wrong place, so they are iterated from the
+    view's reference orbit like the pixels of the perturbation backends.
+
+    Args:
+        state (AppState): The view the samples belong to.
+        offsets (NDArray[np.complex128]): The offsets of the samples from the
+                                          centre of the view, in any shape.
+
+    Returns:
+        NDArray[np.int32]: The iteration count of every sample.
+    """
+    from perturbation import calculate_points_perturbation, prepare_reference
+
+    orbit, skip, coefficients = prepare_reference(state)
+    return calculate_points_perturbation(
+        offsets, orbit, state.quality, skip, coefficients
+    )
+
+
+def antialias(
+    state: AppState,
+    iteration_grid: NDArray[np.int32],
+    calculate_points: CalculatePoints = calculate_samples_numpy,
+    palette: str = "classic",
+    subsamples: int = DEFAULT_SUBSAMPLES,
+    threshold: int = DEFAULT_EDGE_THRESHOLD,
+    sample_budget: Optional[int] = None,
+    seed: int = 0,
+) -> tuple[NDArray[np.uint8], AntialiasStatistics]:
+    """Colors a view, supersampling only the pixels on edges.
+
+    Starts from the iteration counts of an ordinary render at one sample per
+    pixel. Pixels whose color differs from a neighbour's by more than
+    `threshold` in any channel are edges; each of them is recalculated at
+    `subsamples` squared jittered points and colored with their average.
+    Everywhere else a single sample already gives the color uniform
+    supersampling would, so the output matches it at a fraction of the work.
+    Subsamples are passed to the engine as offsets from the centre of the
+    view, so deep zooms can place them exactly.
+
+    Args:
+        state (AppState): The view the iteration counts were calculated for.
+        iteration_grid (NDArray[np.int32]): The counts of every pixel.
+        calculate_points (CalculatePoints): Calculates the counts of an array of
+            offsets from the centre of the view, such as
+            `calculate_samples_numpy`. See `points_calculator`.
+        palette (str): The color palette, one of `colorizer.PALETTES`.
+        subsamples (int): The samples along each axis of a refined pixel.
+        threshold (int): The channel difference above which a pixel is an edge.
+        sample_budget (Optional[int]): The most extra samples to spend. When
+            there are more edges than it allows, the strongest are refined.
+            Defaults to refining every edge.
+        seed (int): Seeds the jitter, so a view always renders the same way.
+
+    Returns:
+        tuple[NDArray[np.uint8], AntialiasStatistics]: The (height, width, 3)
+            RGB colors and the samples spent on them.
+    """
+    colors = palette_colors(state.quality, palette)
+    image = colors[iteration_grid]
+    statistics = AntialiasStatistics(iteration_grid.size, subsamples)
+
+    with profiling.span("antialias.edges"):
+        strength = edge_strength(image)
+        edge_indices = np.flatnonzero(strength > threshold)
+    statistics.edge_pixels = edge_indices.size
+
+    if sample_budget is not None:
+        refined_count = min(edge_indices.size, sample_budget // subsamples**2)
+        strongest = np.argsort(-strength.ravel()[edge_indices], kind="stable")
+        edge_indices = np.sort(edge_indices[strongest[:refined_count]])
+    statistics.refined_pixels = edge_indices.size
+
+    generator = np.random.default_rng(seed)
+    flat_image = image.reshape(-1, 3)
+    pixels_per_chunk = max(1, SAMPLES_PER_CHUNK // subsamples**2)
+
+    for chunk_start in range(0, edge_indices.size, pixels_per_chunk):
+        chunk = edge_indices[chunk_start : chunk_start + pixels_per_chunk]
+        rows, columns = np.divmod(chunk, state.width)
+        offsets = jittered_offsets(chunk.size, subsamples, generator)
+
+        sample_x = columns[:, np.newaxis] + offsets[:, :, 0] - state.width / 2
+        sample_y = rows[:, np.newaxis] + offsets[:, :, 1] - state.height / 2
+        sample_offsets = np.empty(sample_x.shape, dtype=np.complex128)
+        sample_offsets.real = sample_x / state.width * state.scale
+        sample_offsets.imag = sample_y / state.height * state.scale
+
+        with profiling.span("antialias.samples"):
+            sample_iterations = calculate_points(state, sample_offsets)
+        sample_colors = colors[sample_iterations].astype(np.float64)
+        flat_image[chunk] = np.rint(sample_colors.mean(axis=1)).astype(np.uint8)
+
+    return image, statistics
+
+
+def points_calculator(backend: Backend) -> CalculatePoints:
+    """Picks the engine that calculates subsamples alongside a backend.
+
+    Args:
+        backend (Backend): The backend that rendered the view.
+
+    Returns:
+        CalculatePoints: `calculate_samples_perturbation` for the perturbation
+                         backends, `calculate_samples_gpu` for the CUDA
+                         backend and `calculate_samples_numpy` otherwise.
+    """
+    if backend.name in PERTURBATION_BACKENDS:
+        return calculate_samples_perturbation
+    if backend.name in GPU_BACKENDS:
+        return calculate_samples_gpu
+
+    return calculate_samples_numpy
+
+
+def add_antialias_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the standard adaptive supersampling options to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+    """
+    parser.add_argument(
+        "--antialias",
+        type=int,
+        default=0,
+        metavar="N",
+        help="supersample edge pixels with NxN jittered samples (default: off)",
+    )
+    parser.add_argument(
+        "--edge-threshold",
+        type=int,
+        default=DEFAULT_EDGE_THRESHOLD,
+        help="color difference that marks an edge pixel "
+        f"(default: {DEFAULT_EDGE_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--sample-budget",
+        type=int,
+        default=None,
+        help="most extra samples per frame (default: refine every edge)",
+    )
@@ -0,0 +1,373 @@
+import argparse
+import importlib
+import importlib.util
+import numpy as np
+import profiling
+import threading
+import warnings
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from engine import Tile
+
+CalculateRegion = Callable[..., NDArray[np.int32]]
+OnTile = Callable[[Tile, NDArray[np.int32]], None]
+RenderView = Callable[..., NDArray[np.int32]]
+
+ROWS_PER_BAND = 16
+FALLBACK_ORDER = ["cuda", "jit", "multiprocess", "numpy", "python"]
+CPU_FALLBACK_ORDER = FALLBACK_ORDER[1:]
+
+
+class Backend:
+    """A named rendering engine whose dependencies are imported on first use.
+
+    Every backend calculates regions of a view with the same interface as
+    `engine.calculate_fractal_numpy`. Backends may also provide their own whole
+    view renderer; otherwise the view is calculated band by band. A backend may
+    name the backend to try first when it is unavailable, ahead of the
+    standard `FALLBACK_ORDER`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        load_calculate: Callable[[], CalculateRegion],
+        probe: Callable[[], bool],
+        load_render: Optional[Callable[[], RenderView]] = None,
+        fallback: Optional[str] = None,
+    ):
+        self.name = name
+        self.description = description
+        self._load_calculate = load_calculate
+        self._load_render = load_render
+        self._probe = probe
+        self.fallback = fallback
+        self._calculate: Optional[CalculateRegion] = None
+        self._render: Optional[RenderView] = None
+        self._available: Optional[bool] = None
+
+    def is_available(self) -> bool:
+        """Checks once whether the backend can run on this machine.
+
+        Returns:
+            bool: True if the backend's dependencies and hardware are present.
+        """
+        if self._available is None:
+            try:
+                self._available = bool(self._probe())
+            except Exception:
+                self._available = False
+
+        return self._available
+
+    @property
+    def has_renderer(self) -> bool:
+        """Whether the backend renders views its own way instead of in bands."""
+        return self._load_render is not None
+
+    def calculate(
+        self,
+        state: AppState,
+        row_start: int = 0,
+        row_end: Optional[int] = None,
+        column_start: int = 0,
+        column_end: Optional[int] = None,
+    ) -> NDArray[np.int32]:
+        """Calculates the iteration counts of a region of the view.
+
+        Args:
+            state (AppState): The application state containing all parameters
+                              for the render.
+            row_start (int): The first pixel row to calculate (inclusive).
+            row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                     Defaults to the full height of the view.
+            column_start (int): The first pixel column to calculate (inclusive).
+            column_end (Optional[int]): The last pixel column to calculate
+                                        (exclusive). Defaults to the full width
+                                        of the view.
+
+        Returns:
+            NDArray[np.int32]: The iteration counts of the requested region.
+        """
+        if self._calculate is None:
+            self._calculate = self._load_calculate()
+
+        with profiling.span(f"calculate:{self.name}"):
+            return self._calculate(state, row_start, row_end, column_start, column_end)
+
+    def render(
+        self,
+        state: AppState,
+        on_tile: Optional[OnTile] = None,
+        stop_event: Optional[threading.Event] = None,
+        regions: Optional[list[Tile]] = None,
+    ) -> NDArray[np.int32]:
+        """Renders the view, reporting each finished piece as it completes.
+
+        Args:
+            state (AppState): The application state containing all parameters
+                              for the render.
+            on_tile (Optional[OnTile]): Called with each completed tile or band
+                                        and its iteration counts.
+            stop_event (Optional[threading.Event]): A signal to abandon the render.
+            regions (Optional[list[Tile]]): Restricts the render to these regions
+                                            of the view. Defaults to the whole
+                                            view.
+
+        Returns:
+            NDArray[np.int32]: The iteration counts of the full view. Pixels
+                               outside `regions` or skipped because of a stop
+                               request are left at zero.
+        """
+        if self._load_render is not None:
+            if self._render is None:
+                self._render = self._load_render()
+            with profiling.span(f"render:{self.name}"):
+                return self._render(
+                    state, on_tile=on_tile, stop_event=stop_event, regions=regions
+                )
+
+        iteration_grid = np.zeros((state.height, state.width), dtype=np.int32)
+        if regions is None:
+            regions = [(0, 0, state.width, state.height)]
+
+        for column_start, region_row_start, column_end, region_row_end in regions:
+            for row_start in range(region_row_start, region_row_end, ROWS_PER_BAND):
+                if stop_event is not None and stop_event.is_set():
+                    return iteration_grid
+
+                row_end = min(row_start + ROWS_PER_BAND, region_row_end)
+                band = self.calculate(
+                    state, row_start, row_end, column_start, column_end
+                )
+                iteration_grid[row_start:row_end, column_start:column_end] = band
+
+                if on_tile is not None:
+                    on_tile((column_start, row_start, column_end, row_end), band)
+
+        return iteration_grid
+
+
+_backends: dict[str, Backend] = {}
+
+
+def register_backend(backend: Backend) -> None:
+    """Adds a backend to the registry, replacing any backend of the same name.
+
+    Args:
+        backend (Backend): The backend to register.
+    """
+    _backends[backend.name] = backend
+
+
+def backend_names() -> list[str]:
+    """Lists the names of all registered backends, whether available or not.
+
+    Returns:
+        list[str]: The registered backend names in registration order.
+    """
+    return list(_backends)
+
+
+def available_backends() -> list[str]:
+    """Lists the registered backends that can run on this machine.
+
+    Probing a backend may import its dependencies.
+
+    Returns:
+        list[str]: The names of the available backends in registration order.
+    """
+    return [name for name, backend in _backends.items() if backend.is_available()]
+
+
+def get_backend(name: str = "auto", fallback: bool = True) -> Backend:
+    """Looks up a backend, falling back to the next available one if needed.
+
+    The fallback walks `FALLBACK_ORDER` from the requested backend towards the
+    plain Python renderer, which is always available, after trying the
+    backend's own fallback if it names one. Asking for "auto" picks the first
+    available backend in `FALLBACK_ORDER`, and "cpu" the first available one
+    in `CPU_FALLBACK_ORDER`.
+
+    Args:
+        name (str): The backend name, "auto" or "cpu".
+        fallback (bool): If False, the named backend is returned even when it
+                         is unavailable, so callers can check and skip it.
+
+    Returns:
+        Backend: The requested backend, or the fallback used in its place.
+
+    Raises:
+        ValueError: If no backend is registered under the given name.
+    """
+    if not fallback and name in _backends:
+        return _backends[name]
+
+    if name == "auto":
+        candidates = FALLBACK_ORDER
+    elif name == "cpu":
+        candidates = CPU_FALLBACK_ORDER
+    elif name not in _backends:
+        raise ValueError(
+            f"Unknown backend '{name}'. Choose from: {', '.join(backend_names())}."
+        )
+    elif name in FALLBACK_ORDER:
+        candidates = FALLBACK_ORDER[FALLBACK_ORDER.index(name) :]
+    else:
+        own_fallback = _backends[name].fallback
+        candidates = [name, *([own_fallback] if own_fallback else []), *FALLBACK_ORDER]
+
+    for candidate in candidates:
+        backend = _backends.get(candidate)
+        if backend is not None and backend.is_available():
+            if name not in ("auto", "cpu", candidate):
+                warnings.warn(
+                    f"Backend '{name}' is not available, using '{candidate}'.",
+                    RuntimeWarning,
+                    stacklevel=2,
+                )
+            return backend
+
+    raise RuntimeError("No rendering backend is available.")
+
+
+def add_backend_argument(parser: argparse.ArgumentParser, default: str) -> None:
+    """Adds the standard `--backend` option to a command-line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+        default (str): The backend used when the option is not given.
+    """
+    parser.add_argument(
+        "--backend",
+        choices=["auto", "cpu", *backend_names()],
+        default=default,
+        help=f"rendering backend (default: {default})",
+    )
+
+
+def _module_has(module_name: str) -> bool:
+    """Checks whether a module can be imported, without importing it.
+
+    Args:
+        module_name (str): The top-level module name.
+
+    Returns:
+        bool: True if the module is installed.
+    """
+    return importlib.util.find_spec(module_name) is not None
+
+
+def _load_attribute(module_name: str, attribute: str) -> Callable[[], Callable]:
+    """Creates a loader that imports a module and returns one of its functions.
+
+    Args:
+        module_name (str): The module to import on first use.
+        attribute (str): The function to return from the module.
+
+    Returns:
+        Callable[[], Callable]: The loader.
+    """
+    return lambda: getattr(importlib.import_module(module_name), attribute)
+
+
+def _probe_cuda() -> bool:
+    """Checks for CuPy and at least one CUDA device.
+
+    Returns:
+        bool: True if CUDA rendering can run on this machine.
+    """
+    if not _module_has("cupy"):
+        return False
+
+    import cupy as cp
+
+    return cp.cuda.runtime.getDeviceCount() > 0
+
+
+register_backend(
+    Backend(
+        "python",
+        "Per-pixel reference renderer in plain Python",
+        _load_attribute("engine", "calculate_fractal_python"),
+        probe=lambda: True,
+    )
+)
+register_backend(
+    Backend(
+        "numpy",
+        "Vectorized NumPy renderer on a single core",
+        _load_attribute("engine", "calculate_fractal_numpy"),
+        probe=lambda: _module_has("numpy"),
+    )
+)
+register_backend(
+    Backend(
+        "jit",
+        "Numba-compiled kernel on every CPU core",
+        _load_attribute("jit", "calculate_fractal_jit"),
+        probe=lambda: _module_has("numba"),
+    )
+)
+register_backend(
+    Backend(
+        "multiprocess",
+        "Tiled NumPy renderer on a pool of worker processes",
+        _load_attribute("parallel", "calculate_fractal_tiled"),
+        probe=lambda: _module_has("numpy"),
+        load_render=_load_attribute("parallel", "render_tiled"),
+    )
+)
+register_backend(
+    Backend(
+        "subdivide",
+        "Mariani-Silver subdivision that fills rectangles with uniform borders",
+        _load_attribute("engine", "calculate_fractal_subdivided"),
+        probe=lambda: _module_has("numpy"),
+    )
+)
+register_backend(
+    Backend(
+        "progressive",
+        "NumPy renderer that sharpens a coarse preview in interlaced passes",
+        _load_attribute("engine", "calculate_fractal_numpy"),
+        probe=lambda: _module_has("numpy"),
+        load_render=_load_attribute("progressive", "render_progressive"),
+    )
+)
+register_backend(
+    Backend(
+        "resumable",
+        "NumPy renderer that resumes unescaped pixels when the quality rises",
+        _load_attribute("resumable", "calculate_fractal_resumable"),
+        probe=lambda: _module_has("numpy"),
+        load_render=_load_attribute("resumable", "render_resumable"),
+    )
+)
+register_backend(
+    Backend(
+        "cuda",
+        "CUDA kernel through CuPy",
+        _load_attribute("engine", "calculate_fractal_gpu"),
+        probe=_probe_cuda,
+    )
+)
+register_backend(
+    Backend(
+        "perturbation",
+        "Deep-zoom NumPy renderer iterating offsets from a reference orbit",
+        _load_attribute("perturbation", "calculate_fractal_perturbation"),
+        probe=lambda: _module_has("numpy"),
+    )
+)
+register_backend(
+    Backend(
+        "perturbation-cuda",
+        "Deep-zoom CUDA kernel iterating offsets from a reference orbit",
+        _load_attribute("perturbation", "calculate_fractal_perturbation_gpu"),
+        probe=_probe_cuda,
+        fallback="perturbation",
+    )
+)
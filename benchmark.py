@@ -1,164 +1,306 @@
 #!/usr/bin/env python3
+import argparse
+import numpy as np
+import os
 import pygame
-import threading
-import time
+from numpy.typing import NDArray
+from typing import Optional
 from state import AppState
-from engine import pixel_to_complex_cpu, calculate_fractal_cpu, colorer_cpu
-from engine import calculate_fractal_gpu, colorer_gpu
-
-
-def generate_cpu_half(
-    x: int, y: int, window: pygame.Surface, stop_event: threading.Event, state: AppState
-):
-    """Renders the CPU's half of the benchmark image, pixel by pixel.
-
-    Designed to be run in a background thread. Iterates sequentially through
-    each pixel of its target surface, calculates the fractal value, and draws
-    the result. Also measures and prints its total execution time.
+from engine import Tile, exposed_regions
+from backends import Backend, add_backend_argument, backend_names, get_backend
+from colorizer import Colorizer, add_palette_argument
+from presenter import Presenter, add_presenter_arguments
+from profiling import OverlaySink, add_profiling_arguments, close_sinks
+from profiling import sinks_from_arguments
+from scheduler import RenderScheduler, add_scheduler_arguments
+from scheduler import scheduler_from_arguments
+from tile_cache import add_cache_arguments, cache_from_arguments
+
+PAN_STEP = 64
+ZOOM_FACTOR = 1.5
+PAN_KEYS = {
+    pygame.K_LEFT: (-PAN_STEP, 0),
+    pygame.K_RIGHT: (PAN_STEP, 0),
+    pygame.K_UP: (0, -PAN_STEP),
+    pygame.K_DOWN: (0, PAN_STEP),
+}
+
+
+def half_view_state(state: AppState) -> AppState:
+    """Creates the state of one half of the benchmark window.
 
     Args:
-        x (int): The starting x-coordinate for the render.
-        y (int): The starting y-coordinate for the render.
-        window (pygame.Surface): The off-screen surface to draw onto.
-        stop_event (threading.Event): A signal to terminate the render early.
-        state (AppState): The main application state.
-    """
-    start_time = time.perf_counter()
-
-    half_width, height = window.get_size()
-    adjusted_state = AppState(width=half_width, height=height, quality=state.quality)
-
-    while y < height and not stop_event.is_set():
-        translated_pixel = pixel_to_complex_cpu(x, y, adjusted_state)
-        iteration_count = calculate_fractal_cpu(translated_pixel, state.quality)
-        pixel_color = colorer_cpu(iteration_count, state.quality)
-        window.set_at((x, y), pixel_color)
-
-        x += 1
-        if x >= half_width:
-            x = 0
-            y += 1
-
-    end_time = time.perf_counter()
-    if not stop_event.is_set():
-        elapsed_time = (end_time - start_time) * 1000
-        print(f"CPU rendering: {elapsed_time:.2f} ms")
-
+        state (AppState): The main application state, sized to the full window.
 
-def generate_gpu_half(window: pygame.Surface, state: AppState):
-    """Renders the GPU's half of the benchmark image in parallel.
-
-    Designed to be run in a background thread. Calls the GPU-accelerated
-    engine functions to generate the entire fractal at once. Also measures
-    and prints its total execution time.
-
-    Args:
-        window (pygame.Surface): The off-screen surface to draw onto.
-        state (AppState): The main application state.
+    Returns:
+        AppState: A copy of the state sized to one half of the window, which is
+                  the view that pans and zooms are measured in.
     """
-    start_time = time.perf_counter()
+    return state.with_size(state.width // 2, state.height)
 
-    half_width, height = window.get_size()
-    adjusted_state = AppState(width=half_width, height=height, quality=state.quality)
 
-    iteration_grid = calculate_fractal_gpu(adjusted_state)
-    finished_image = colorer_gpu(iteration_grid, state.quality)
-    window.blit(finished_image, (0, 0))
-
-    end_time = time.perf_counter()
-    elapsed_time = (end_time - start_time) * 1000
-    print(f"GPU rendering: {elapsed_time:.2f} ms")
-
-
-def start_render_threads(
+def submit_renders(
     state: AppState,
-) -> tuple[
-    pygame.Surface, pygame.Surface, threading.Thread, threading.Thread, threading.Event
-]:
-    """Creates new surfaces and starts the CPU and GPU rendering threads.
+    schedulers: tuple[RenderScheduler, RenderScheduler],
+    colorizers: tuple[Colorizer, Colorizer],
+    presenter: Presenter,
+    surfaces: Optional[tuple[pygame.Surface, pygame.Surface]] = None,
+    regions: Optional[list[Tile]] = None,
+    focus: Optional[tuple[float, float]] = None,
+    debounce: bool = False,
+    overlay: Optional[OverlaySink] = None,
+) -> tuple[pygame.Surface, pygame.Surface]:
+    """Hands a new view to the CPU and GPU schedulers, replacing the current one.
+
+    Each half is colored onto its surface piece by piece as the scheduler
+    finishes it and marked for the presenter to show, and prints its total
+    render time once it is complete.
 
     Args:
         state (AppState): The main application state, used to determine the
                           size of the new render surfaces.
+        schedulers (tuple[RenderScheduler, RenderScheduler]): The schedulers of
+            the CPU (left) and GPU (right) halves.
+        colorizers (tuple[Colorizer, Colorizer]): The colorizers of the CPU and
+            GPU halves, one per half so each guards its own surface.
+        presenter (Presenter): Shows the pieces, in window coordinates.
+        surfaces (Optional[tuple[pygame.Surface, pygame.Surface]]): Existing CPU
+            and GPU surfaces to draw onto instead of creating new ones.
+        regions (Optional[list[Tile]]): Restricts both renders to these regions
+            of their surfaces. Defaults to the whole surfaces.
+        focus (Optional[tuple[float, float]]): The pixel of each half to render
+            first. Defaults to the centre of the halves.
+        debounce (bool): Whether to wait briefly for a newer view first, as for
+            the bursts of events of a window being resized.
+        overlay (Optional[OverlaySink]): The profiling overlay, reset so it
+            shows the timings of the new render.
 
     Returns:
-        tuple: A tuple containing the new CPU and GPU surfaces, the new CPU and
-               GPU thread objects, and the new stop event.
+        tuple[pygame.Surface, pygame.Surface]: The CPU and GPU surfaces.
     """
-    half_width = state.width // 2
-    cpu_surface = pygame.Surface((half_width, state.height))
-    gpu_surface = pygame.Surface((half_width, state.height))
-
-    stop_event = threading.Event()
+    half_state = half_view_state(state)
+    quality = state.quality
+    if surfaces is None:
+        surfaces = (
+            pygame.Surface((half_state.width, half_state.height)),
+            pygame.Surface((half_state.width, half_state.height)),
+        )
+        presenter.mark_all_dirty()
+
+    if overlay is not None:
+        overlay.reset()
+
+    for label, scheduler, colorizer, surface, offset in zip(
+        ["CPU", "GPU"], schedulers, colorizers, surfaces, [0, half_state.width]
+    ):
+
+        def draw_tile(
+            tile: Tile,
+            iteration_tile: NDArray[np.int32],
+            colorizer: Colorizer = colorizer,
+            surface: pygame.Surface = surface,
+            offset: int = offset,
+        ) -> None:
+            """Colors a completed tile at its place on its half's surface."""
+            column_start, row_start, _, _ = tile
+            colorizer.draw(iteration_tile, quality, surface, (column_start, row_start))
+            tile_height, tile_width = iteration_tile.shape
+            presenter.mark_dirty(
+                pygame.Rect(offset + column_start, row_start, tile_width, tile_height)
+            )
+
+        def report_time(
+            seconds: float, label: str = label, backend: Backend = scheduler.backend
+        ) -> None:
+            """Prints how long the half took to render."""
+            print(f"{label} rendering ({backend.name}): {seconds * 1000:.2f} ms")
+
+        scheduler.submit(
+            half_state,
+            draw_tile,
+            regions=regions,
+            focus=focus,
+            debounce=debounce,
+            on_done=report_time,
+        )
+
+    return surfaces
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses the command-line options of the benchmark.
 
-    cpu_thread = threading.Thread(
-        target=generate_cpu_half,
-        args=(0, 0, cpu_surface, stop_event, state),
-        daemon=True,
+    Returns:
+        argparse.Namespace: The parsed options, including the backends of the
+                            CPU (left) and GPU (right) halves.
+    """
+    parser = argparse.ArgumentParser(description="Side-by-side fractal benchmark.")
+    add_backend_argument(parser, default="cpu")
+    parser.add_argument(
+        "--gpu-backend",
+        choices=["auto", *backend_names()],
+        default="cuda",
+        help="rendering backend of the right half (default: cuda)",
     )
-    gpu_thread = threading.Thread(
-        target=generate_gpu_half,
-        args=(gpu_surface, state),
-        daemon=True,
+    parser.add_argument(
+        "--optimize",
+        action="append",
+        choices=["cardioid", "periodicity", "mirror"],
+        default=[],
+        help="enable an escape-time short-circuit in both halves (repeatable)",
     )
-
-    cpu_thread.start()
-    gpu_thread.start()
-
-    return cpu_surface, gpu_surface, cpu_thread, gpu_thread, stop_event
+    add_cache_arguments(parser, default=0)
+    add_scheduler_arguments(parser, default=os.cpu_count() or 1)
+    add_palette_argument(parser)
+    add_presenter_arguments(parser)
+    add_profiling_arguments(parser, overlay=True)
+    return parser.parse_args()
 
 
 def main():
     """Initializes Pygame and runs the main benchmark application loop.
 
-    Starts separate threads for the CPU and GPU renderers and enters a
-    responsive main loop to display their real-time progress. The loop also
-    handles events for quitting, resizing, refreshing, and zooming.
+    Starts a render scheduler for each of the CPU and GPU halves and enters a
+    responsive main loop to display their real-time progress. The loop sleeps
+    until input arrives or tiles are finished and presents only the parts of
+    the window that changed, at most `--max-fps` times a second, so the
+    display does not take CPU time from the renderers it is measuring. Every
+    new view replaces the one in progress, and resizes are debounced. The loop also
+    handles events for quitting, resizing, refreshing, panning with the arrow
+    keys, and zooming with the mouse wheel.
     """
+    arguments = parse_arguments()
+    cpu_backend, cpu_cache = cache_from_arguments(
+        arguments, get_backend(arguments.backend)
+    )
+    gpu_backend, gpu_cache = cache_from_arguments(
+        arguments, get_backend(arguments.gpu_backend)
+    )
+    backends = (cpu_backend, gpu_backend)
+    colorizers = (Colorizer(arguments.palette), Colorizer(arguments.palette))
+    overlay = sinks_from_arguments(arguments)
+
     pygame.display.init()
-    app_state = AppState(width=1280, height=480, quality=2500)
+    app_state = AppState(
+        width=1280,
+        height=480,
+        quality=2500,
+        cardioid_check="cardioid" in arguments.optimize,
+        periodicity_check="periodicity" in arguments.optimize,
+        mirror_symmetry="mirror" in arguments.optimize,
+    )
     app_window = pygame.display.set_mode(
         (app_state.width, app_state.height),
         pygame.RESIZABLE,
     )
-    pygame.display.set_caption("Fractal Visualizer: CPU (Left) vs GPU (Right)")
+    pygame.display.set_caption(
+        f"Fractal Visualizer: CPU (Left, {backends[0].name}) "
+        f"vs GPU (Right, {backends[1].name})"
+    )
 
-    cpu_window, gpu_window, cpu_thread, gpu_thread, stop_event = start_render_threads(
-        app_state
+    presenter = Presenter(app_window, arguments.max_fps)
+    schedulers = (
+        scheduler_from_arguments(arguments, cpu_backend),
+        RenderScheduler(
+            gpu_backend, tile_size=None, debounce_seconds=arguments.debounce_ms / 1000
+        ),
+    )
+    cpu_window, gpu_window = submit_renders(
+        app_state, schedulers, colorizers, presenter, overlay=overlay
     )
 
     app_running = True
     while app_running:
-        for event in pygame.event.get():
+        for event in presenter.wait_for_events():
             if event.type == pygame.QUIT:
                 app_running = False
-                stop_event.set()
 
             elif event.type == pygame.VIDEORESIZE:
-                stop_event.set()
                 app_state.width, app_state.height = event.size
                 app_window = pygame.display.set_mode(
                     (app_state.width, app_state.height), pygame.RESIZABLE
                 )
-
-                cpu_window, gpu_window, cpu_thread, gpu_thread, stop_event = (
-                    start_render_threads(app_state)
+                presenter.set_window(app_window)
+
+                cpu_window, gpu_window = submit_renders(
+                    app_state,
+                    schedulers,
+                    colorizers,
+                    presenter,
+                    debounce=True,
+                    overlay=overlay,
                 )
 
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                stop_event.set()
+                cpu_window, gpu_window = submit_renders(
+                    app_state, schedulers, colorizers, presenter, overlay=overlay
+                )
 
-                cpu_window, gpu_window, cpu_thread, gpu_thread, stop_event = (
-                    start_render_threads(app_state)
+            elif event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+                dx, dy = PAN_KEYS[event.key]
+                half_state = half_view_state(app_state)
+                half_state.pan(dx, dy)
+                app_state.set_precise_center(
+                    half_state.center_real, half_state.center_imag
                 )
 
-        half_width = app_state.width // 2
-        app_window.blit(cpu_window, (0, 0))
-        app_window.blit(gpu_window, (half_width, 0))
-        pygame.display.flip()
+                if any(scheduler.busy for scheduler in schedulers):
+                    cpu_window, gpu_window = submit_renders(
+                        app_state, schedulers, colorizers, presenter, overlay=overlay
+                    )
+                else:
+                    cpu_window.scroll(-dx, -dy)
+                    gpu_window.scroll(-dx, -dy)
+                    presenter.mark_all_dirty()
+                    cpu_window, gpu_window = submit_renders(
+                        app_state,
+                        schedulers,
+                        colorizers,
+                        presenter,
+                        surfaces=(cpu_window, gpu_window),
+                        regions=exposed_regions(
+                            half_state.width, half_state.height, dx, dy
+                        ),
+                        overlay=overlay,
+                    )
+
+            elif event.type == pygame.MOUSEWHEEL:
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                half_state = half_view_state(app_state)
+                focus = (mouse_x % half_state.width, mouse_y)
+                half_state.zoom_at(*focus, ZOOM_FACTOR**event.y)
+                app_state.set_precise_center(
+                    half_state.center_real, half_state.center_imag
+                )
+                app_state.scale = half_state.scale
+
+                cpu_window, gpu_window = submit_renders(
+                    app_state,
+                    schedulers,
+                    colorizers,
+                    presenter,
+                    focus=focus,
+                    overlay=overlay,
+                )
 
-    cpu_thread.join(timeout=1.0)
-    gpu_thread.join(timeout=1.0)
+        half_width = app_state.width // 2
+        presenter.present(
+            [
+                (cpu_window, (0, 0), colorizers[0].lock),
+                (gpu_window, (half_width, 0), colorizers[1].lock),
+            ],
+            overlay,
+        )
+
+    for name, scheduler in zip(["CPU", "GPU"], schedulers):
+        scheduler.close()
+        print(f"{name} render scheduler: {scheduler.statistics}")
+    print(f"Presenter: {presenter.statistics}")
+    for name, cache in [("CPU", cpu_cache), ("GPU", gpu_cache)]:
+        if cache is not None:
+            print(f"{name} tile cache: {cache.statistics}")
+            cache.clear()
+    close_sinks()
     pygame.quit()
 
 
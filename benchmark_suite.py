@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import numpy as np
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Optional
+from state import PRECISIONS, AppState
+from backends import Backend, backend_names, get_backend
+from precision import PRECISION_BACKENDS, REFERENCE_PRECISION
+from profiling import add_profiling_arguments, close_sinks, sinks_from_arguments
+
+VIEWPORTS = {
+    "full": (-0.5 + 0j, 3.0),
+    "seahorse": (-0.745 + 0.113j, 0.01),
+    "interior": (-0.1 + 0j, 0.05),
+}
+DEFAULT_BACKENDS = ["numpy", "multiprocess", "subdivide", "jit", "cuda"]
+DEFAULT_RESOLUTIONS = ["320x240", "640x480"]
+DEFAULT_QUALITIES = [100, 1000]
+DEFAULT_PRECISIONS = ["float64"]
+DEFAULT_REPEATS = 5
+DEFAULT_WARMUP = 1
+DEFAULT_THRESHOLD = 0.10
+RESULT_FIELDS = ("backend", "viewport", "width", "height", "quality", "precision")
+RESULT_DEFAULTS = {"precision": "float64"}
+
+
+def parse_resolution(resolution: str) -> tuple[int, int]:
+    """Parses a resolution written as WIDTHxHEIGHT.
+
+    Args:
+        resolution (str): The resolution, such as "640x480".
+
+    Returns:
+        tuple[int, int]: The width and height in pixels.
+
+    Raises:
+        argparse.ArgumentTypeError: If the text is not a valid resolution.
+    """
+    try:
+        width, height = (int(size) for size in resolution.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid resolution '{resolution}'. Use WIDTHxHEIGHT, such as 640x480."
+        ) from None
+    if width < 1 or height < 1:
+        raise argparse.ArgumentTypeError(f"Invalid resolution '{resolution}'.")
+
+    return width, height
+
+
+def viewport_state(
+    viewport: str, width: int, height: int, quality: int, precision: str = "float64"
+) -> AppState:
+    """Creates the state of a standard benchmark view.
+
+    Args:
+        viewport (str): One of `VIEWPORTS`: "full" shows the whole set,
+                        "seahorse" the boundary detail of Seahorse Valley and
+                        "interior" a region inside the main cardioid, where
+                        every pixel runs to the iteration limit.
+        width (int): The width of the view in pixels.
+        height (int): The height of the view in pixels.
+        quality (int): The iteration limit.
+        precision (str): The floating-point precision, one of
+                         `state.PRECISIONS`.
+
+    Returns:
+        AppState: The benchmark view.
+
+    Raises:
+        ValueError: If the viewport is not one of `VIEWPORTS`.
+    """
+    if viewport not in VIEWPORTS:
+        raise ValueError(
+            f"Unknown viewport '{viewport}'. Choose from: {', '.join(VIEWPORTS)}."
+        )
+    center, scale = VIEWPORTS[viewport]
+
+    return AppState(
+        width, height, quality, center=center, scale=scale, precision=precision
+    )
+
+
+def time_render(
+    backend: Backend, state: AppState, repeats: int, warmup: int
+) -> tuple[list[float], int]:
+    """Times full renders of one view.
+
+    Every backend calculates the whole view in a single call, so the timings
+    compare the engines rather than how `Backend.render` splits a view into
+    bands, which on the GPU would add a kernel launch per band.
+
+    Args:
+        backend (Backend): The backend to time.
+        state (AppState): The view to render.
+        repeats (int): The number of timed renders.
+        warmup (int): The number of untimed renders first, which load the
+                      backend, start worker pools and compile kernels.
+
+    Returns:
+        tuple[list[float], int]: The duration of each timed render in seconds,
+                                 and the total iteration count of the view.
+    """
+    for _ in range(warmup):
+        backend.calculate(state)
+
+    durations = []
+    iteration_grid = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        iteration_grid = backend.calculate(state)
+        durations.append(time.perf_counter() - start_time)
+
+    iterations = int(iteration_grid.sum(dtype=np.int64)) if repeats else 0
+    return durations, iterations
+
+
+def run_benchmarks(
+    backends: list[Backend],
+    viewports: list[str],
+    resolutions: list[tuple[int, int]],
+    qualities: list[int],
+    precisions: Optional[list[str]] = None,
+    repeats: int = DEFAULT_REPEATS,
+    warmup: int = DEFAULT_WARMUP,
+    log: bool = False,
+) -> list[dict[str, Any]]:
+    """Times every combination of backend, viewport, resolution, quality and
+    precision.
+
+    Backends that cannot run on this machine are recorded as skipped instead
+    of falling back to another backend, so results stay comparable. So are
+    reduced precisions of backends outside `precision.PRECISION_BACKENDS`,
+    which would iterate in float64 anyway.
+
+    Args:
+        backends (list[Backend]): The backends to time.
+        viewports (list[str]): Names from `VIEWPORTS`.
+        resolutions (list[tuple[int, int]]): The (width, height) sizes.
+        qualities (list[int]): The iteration limits.
+        precisions (Optional[list[str]]): Names from `state.PRECISIONS`.
+                                          Defaults to `DEFAULT_PRECISIONS`.
+        repeats (int): The number of timed renders per combination.
+        warmup (int): The number of untimed renders before them.
+        log (bool): Prints each result as soon as it is measured.
+
+    Returns:
+        list[dict[str, Any]]: One result per combination, holding the fields
+                              of `RESULT_FIELDS` and a "status" of "ok" or
+                              "skipped", with the "reason" of every skipped
+                              one. Timed results also hold the
+                              "seconds" of every render, their
+                              "median_seconds", "pixels_per_second" and
+                              "iterations_per_second".
+    """
+    if precisions is None:
+        precisions = DEFAULT_PRECISIONS
+
+    results = []
+    for backend in backends:
+        available = backend.is_available()
+        for viewport in viewports:
+            for width, height in resolutions:
+                for quality in qualities:
+                    for precision in precisions:
+                        reason = None
+                        if not available:
+                            reason = "backend not available"
+                        elif (
+                            precision != REFERENCE_PRECISION
+                            and backend.name not in PRECISION_BACKENDS
+                        ):
+                            reason = "precision not supported"
+
+                        result: dict[str, Any] = {
+                            "backend": backend.name,
+                            "viewport": viewport,
+                            "width": width,
+                            "height": height,
+                            "quality": quality,
+                            "precision": precision,
+                            "status": "skipped" if reason else "ok",
+                        }
+                        if reason:
+                            result["reason"] = reason
+                        else:
+                            state = viewport_state(
+                                viewport, width, height, quality, precision
+                            )
+                            durations, iterations = time_render(
+                                backend, state, repeats, warmup
+                            )
+                            median = statistics.median(durations)
+                            result["seconds"] = durations
+                            result["median_seconds"] = median
+                            result["pixels_per_second"] = width * height / median
+                            result["iterations_per_second"] = iterations / median
+
+                        results.append(result)
+                        if log:
+                            print(format_result(result), flush=True)
+
+    return results
+
+
+def result_key(result: dict[str, Any]) -> tuple:
+    """Identifies the benchmark case a result measured.
+
+    Args:
+        result (dict[str, Any]): A result from `run_benchmarks`.
+
+    Returns:
+        tuple: The values of `RESULT_FIELDS`, taken from `RESULT_DEFAULTS`
+               for fields older results do not record.
+    """
+    return tuple(
+        result.get(field, RESULT_DEFAULTS.get(field)) for field in RESULT_FIELDS
+    )
+
+
+def format_result(result: dict[str, Any]) -> str:
+    """Describes one result on a single line.
+
+    Args:
+        result (dict[str, Any]): A result from `run_benchmarks`.
+
+    Returns:
+        str: The benchmark case followed by its timing, or "skipped".
+    """
+    case = (
+        f"{result['backend']:<18} {result['viewport']:<9} "
+        f"{result['width']}x{result['height']:<5} q{result['quality']:<6} "
+        f"{result.get('precision', RESULT_DEFAULTS['precision']):<7}"
+    )
+    if result["status"] != "ok":
+        return f"{case} skipped ({result.get('reason', 'backend not available')})"
+
+    return (
+        f"{case} {result['median_seconds'] * 1000:9.2f} ms "
+        f"{result['pixels_per_second'] / 1e6:8.2f} Mpixel/s "
+        f"{result['iterations_per_second'] / 1e6:9.2f} Miter/s"
+    )
+
+
+def environment() -> dict[str, Any]:
+    """Describes the machine and software the benchmarks ran on.
+
+    Returns:
+        dict[str, Any]: The date, Python and NumPy versions, platform and CPU
+                        count.
+    """
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(
+    path: str, results: list[dict[str, Any]], settings: dict[str, Any]
+) -> None:
+    """Writes results as JSON, along with how and where they were measured.
+
+    Args:
+        path (str): The file to write.
+        results (list[dict[str, Any]]): The results from `run_benchmarks`.
+        settings (dict[str, Any]): The repeat and warmup counts used.
+    """
+    document = {
+        "environment": environment(),
+        "settings": settings,
+        "results": results,
+    }
+    with open(path, "w") as json_file:
+        json.dump(document, json_file, indent=2)
+        json_file.write("\n")
+
+
+def load_results(path: str) -> list[dict[str, Any]]:
+    """Reads the results of a file written by `save_results`.
+
+    Args:
+        path (str): The file to read.
+
+    Returns:
+        list[dict[str, Any]]: The stored results.
+    """
+    with open(path) as json_file:
+        return json.load(json_file)["results"]
+
+
+def compare_results(
+    baseline: list[dict[str, Any]],
+    current: list[dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[tuple[dict[str, Any], dict[str, Any], float]]:
+    """Pairs up the cases measured in both runs and compares their medians.
+
+    Cases missing from either run, or skipped in either, are left out.
+
+    Args:
+        baseline (list[dict[str, Any]]): The reference results.
+        current (list[dict[str, Any]]): The new results.
+        threshold (float): The relative slowdown beyond which a case counts
+                           as a regression, such as 0.1 for 10%.
+
+    Returns:
+        list[tuple[dict[str, Any], dict[str, Any], float]]: The baseline and
+            current result and the relative change of the median render time
+            of every shared case, in the order of the current run. Positive
+            changes are slowdowns.
+    """
+    baseline_by_key = {
+        result_key(result): result for result in baseline if result["status"] == "ok"
+    }
+
+    comparisons = []
+    for result in current:
+        reference = baseline_by_key.get(result_key(result))
+        if reference is None or result["status"] != "ok":
+            continue
+        change = result["median_seconds"] / reference["median_seconds"] - 1
+        comparisons.append((reference, result, change))
+
+    return comparisons
+
+
+def run_command(arguments: argparse.Namespace) -> int:
+    """Runs the benchmark sweep and saves the results.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "run" command.
+
+    Returns:
+        int: The exit status.
+    """
+    backends = [get_backend(name, fallback=False) for name in arguments.backend]
+    sinks_from_arguments(arguments)
+    try:
+        results = run_benchmarks(
+            backends,
+            arguments.viewport,
+            arguments.resolution,
+            arguments.quality,
+            arguments.precision,
+            repeats=arguments.repeats,
+            warmup=arguments.warmup,
+            log=True,
+        )
+    finally:
+        close_sinks()
+    save_results(
+        arguments.output,
+        results,
+        {"repeats": arguments.repeats, "warmup": arguments.warmup},
+    )
+    print(f"Results written to {arguments.output}")
+    return 0
+
+
+def compare_command(arguments: argparse.Namespace) -> int:
+    """Compares two result files and reports regressions.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "compare" command.
+
+    Returns:
+        int: 1 if any case slowed down by more than the threshold, else 0.
+    """
+    comparisons = compare_results(
+        load_results(arguments.baseline),
+        load_results(arguments.current),
+        arguments.threshold,
+    )
+
+    regressions = 0
+    for reference, result, change in comparisons:
+        flag = ""
+        if change > arguments.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{format_result(result)} {change:+7.1%} "
+            f"(was {reference['median_seconds'] * 1000:.2f} ms){flag}"
+        )
+
+    print(
+        f"{len(comparisons)} cases compared, {regressions} slower by more than "
+        f"{arguments.threshold:.0%}."
+    )
+    return 1 if regressions else 0
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses the command-line options of the benchmark suite.
+
+    Returns:
+        argparse.Namespace: The chosen command and its options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Headless benchmark suite for the rendering backends."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time the backends")
+    run_parser.set_defaults(handler=run_command)
+    run_parser.add_argument(
+        "--backend",
+        action="append",
+        choices=backend_names(),
+        help=f"backend to time (repeatable, default: {', '.join(DEFAULT_BACKENDS)})",
+    )
+    run_parser.add_argument(
+        "--viewport",
+        action="append",
+        choices=list(VIEWPORTS),
+        help="view to render (repeatable, default: all)",
+    )
+    run_parser.add_argument(
+        "--resolution",
+        action="append",
+        type=parse_resolution,
+        help=f"WIDTHxHEIGHT (repeatable, default: {', '.join(DEFAULT_RESOLUTIONS)})",
+    )
+    run_parser.add_argument(
+        "--quality",
+        action="append",
+        type=int,
+        help="iteration limit (repeatable, default: "
+        f"{', '.join(map(str, DEFAULT_QUALITIES))})",
+    )
+    run_parser.add_argument(
+        "--precision",
+        action="append",
+        choices=PRECISIONS,
+        help="floating-point precision (repeatable, default: "
+        f"{', '.join(DEFAULT_PRECISIONS)})",
+    )
+    run_parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    run_parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    run_parser.add_argument("--output", default="benchmark_results.json")
+    add_profiling_arguments(run_parser)
+
+    compare_parser = commands.add_parser(
+        "compare", help="flag regressions against a baseline"
+    )
+    compare_parser.set_defaults(handler=compare_command)
+    compare_parser.add_argument("baseline", help="baseline results file")
+    compare_parser.add_argument("current", help="new results file")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"relative slowdown counted as a regression (default: "
+        f"{DEFAULT_THRESHOLD})",
+    )
+
+    arguments = parser.parse_args()
+    if arguments.command == "run":
+        arguments.backend = arguments.backend or DEFAULT_BACKENDS
+        arguments.viewport = arguments.viewport or list(VIEWPORTS)
+        arguments.resolution = arguments.resolution or [
+            parse_resolution(resolution) for resolution in DEFAULT_RESOLUTIONS
+        ]
+        arguments.quality = arguments.quality or DEFAULT_QUALITIES
+        arguments.precision = arguments.precision or DEFAULT_PRECISIONS
+
+    return arguments
+
+
+def main():
+    """Runs the requested command of the benchmark suite.
+
+    "run" times every combination of the chosen backends, viewports,
+    resolutions, qualities and precisions without opening a window and writes
+    the results as JSON. "compare" reads a baseline and a new results file and
+    exits with status 1 if any shared case got slower than the threshold
+    allows.
+    """
+    arguments = parse_arguments()
+    sys.exit(arguments.handler(arguments))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import numpy as np
+import profiling
+import pygame
+import threading
+from numpy.typing import NDArray
+
+PALETTES = ["classic", "smooth"]
+SMOOTH_PERIOD = 64
+MAX_CACHED_TABLES = 8
+
+
+def palette_colors(max_iterations: int, palette: str = "classic") -> NDArray[np.uint8]:
+    """Builds the RGB color of every possible iteration count.
+
+    The "classic" palette reproduces `engine.colorer_gpu` band for band. The
+    "smooth" palette blends continuously through a cosine gradient that
+    repeats every `SMOOTH_PERIOD` iterations, without hard band edges. Points
+    that never escaped are black in both.
+
+    Args:
+        max_iterations (int): The render quality limit, whose count is black.
+        palette (str): One of `PALETTES`.
+
+    Returns:
+        NDArray[np.uint8]: A (max_iterations + 1, 3) array of RGB colors indexed
+                           by iteration count.
+
+    Raises:
+        ValueError: If the palette is not one of `PALETTES`.
+    """
+    iterations = np.arange(max_iterations + 1)
+
+    if palette == "classic":
+        colors = np.stack(
+            [(iterations % 8) * 32, (iterations % 4) * 64, (iterations % 16) * 16],
+            axis=1,
+        )
+    elif palette == "smooth":
+        phase = 2 * np.pi * (iterations / SMOOTH_PERIOD)
+        colors = np.stack(
+            [
+                127.5 + 127.5 * np.cos(phase),
+                127.5 + 127.5 * np.cos(phase + 2 * np.pi / 3),
+                127.5 + 127.5 * np.cos(phase + 4 * np.pi / 3),
+            ],
+            axis=1,
+        )
+    else:
+        raise ValueError(
+            f"Unknown palette '{palette}'. Choose from: {', '.join(PALETTES)}."
+        )
+
+    colors = colors.astype(np.uint8)
+    colors[max_iterations] = 0
+    return colors
+
+
+def pack_colors(
+    colors: NDArray[np.uint8], surface: pygame.Surface
+) -> NDArray[np.uint32]:
+    """Packs RGB colors into the pixel format of a 32-bit surface.
+
+    Args:
+        colors (NDArray[np.uint8]): An (n, 3) array of RGB colors.
+        surface (pygame.Surface): The surface whose channel layout to use.
+
+    Returns:
+        NDArray[np.uint32]: The n packed pixel values, fully opaque.
+    """
+    shifts = surface.get_shifts()
+    losses = surface.get_losses()
+    alpha_mask = surface.get_masks()[3]
+
+    packed = np.full(colors.shape[0], alpha_mask, dtype=np.uint32)
+    for channel in range(3):
+        channel_values = colors[:, channel].astype(np.uint32) >> losses[channel]
+        packed |= channel_values << shifts[channel]
+
+    return packed
+
+
+class Colorizer:
+    """Colors iteration counts straight into the pixels of a surface.
+
+    Each iteration limit and pixel format gets a lookup table of packed pixel
+    values once. Coloring a grid is then a single gather from that table into
+    the surface's own 32-bit pixel buffer: no image, mask or channel arrays
+    are allocated and no new surface is created. Surfaces of other depths
+    fall back to building an image with `pygame.surfarray`.
+
+    A surface cannot be blitted while its pixels are being written, so a
+    thread that shows a surface another thread draws on should hold `lock`
+    while blitting it.
+    """
+
+    def __init__(self, palette: str = "classic"):
+        if palette not in PALETTES:
+            raise ValueError(
+                f"Unknown palette '{palette}'. Choose from: {', '.join(PALETTES)}."
+            )
+        self.palette = palette
+        self.lock = threading.Lock()
+        self._tables: dict[tuple, NDArray[np.uint32]] = {}
+
+    def lookup_table(
+        self, max_iterations: int, surface: pygame.Surface
+    ) -> NDArray[np.uint32]:
+        """Gets the packed color of every iteration count for a surface.
+
+        Args:
+            max_iterations (int): The render quality limit.
+            surface (pygame.Surface): The 32-bit surface to draw on.
+
+        Returns:
+            NDArray[np.uint32]: The packed pixel value of each iteration count.
+        """
+        key = (max_iterations, surface.get_shifts(), surface.get_losses())
+        table = self._tables.get(key)
+        if table is None:
+            if len(self._tables) >= MAX_CACHED_TABLES:
+                self._tables.clear()
+            colors = palette_colors(max_iterations, self.palette)
+            table = self._tables[key] = pack_colors(colors, surface)
+
+        return table
+
+    def draw(
+        self,
+        iteration_grid: NDArray[np.int32],
+        max_iterations: int,
+        surface: pygame.Surface,
+        position: tuple[int, int] = (0, 0),
+    ) -> None:
+        """Colors a grid of iteration counts onto a surface.
+
+        Args:
+            iteration_grid (NDArray[np.int32]): The (height, width) iteration
+                                                counts to draw.
+            max_iterations (int): The render quality limit, used to identify
+                                  points inside the set.
+            surface (pygame.Surface): The surface to draw on.
+            position (tuple[int, int]): The surface pixel of the grid's top-left
+                                        corner.
+        """
+        x, y = position
+        height, width = iteration_grid.shape
+
+        if surface.get_bytesize() != 4:
+            colors = palette_colors(max_iterations, self.palette)
+            image = pygame.surfarray.make_surface(
+                colors[np.clip(iteration_grid.T, 0, max_iterations)]
+            )
+            surface.blit(image, position)
+            return
+
+        table = self.lookup_table(max_iterations, surface)
+        with self.lock, profiling.span("colorize"):
+            pixels = pygame.surfarray.pixels2d(surface)
+            np.take(
+                table,
+                iteration_grid.T,
+                out=pixels[x : x + width, y : y + height],
+                mode="clip",
+            )
+            del pixels
+
+
+def add_palette_argument(parser: argparse.ArgumentParser) -> None:
+    """Adds the standard `--palette` option to a command-line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+    """
+    parser.add_argument(
+        "--palette",
+        choices=PALETTES,
+        default="classic",
+        help="color palette (default: classic)",
+    )
@@ -1,112 +1,226 @@
 #!/usr/bin/env python3
+import argparse
+import numpy as np
+import os
 import pygame
-import threading
+from numpy.typing import NDArray
 from state import AppState
-from engine import pixel_to_complex_cpu, calculate_fractal_cpu, colorer_cpu
-
-
-def calculate_fractal(
-    window: pygame.Surface, state: AppState, stop_event: threading.Event
-):
-    """Renders the fractal pixel by pixel in a background thread.
-
-    Intended to be the target of a `threading.Thread`. It iterates
-    over every pixel of the provided surface, calculates its Mandelbrot set
-    value, and draws the corresponding color. It will exit prematurely if the
-    stop_event is set.
+from typing import Optional
+from engine import Tile, exposed_regions
+from backends import add_backend_argument, get_backend
+from colorizer import Colorizer, add_palette_argument
+from precision import add_precision_arguments, precision_from_arguments
+from presenter import Presenter, add_presenter_arguments
+from profiling import add_profiling_arguments, close_sinks, sinks_from_arguments
+from scheduler import RenderScheduler, add_scheduler_arguments
+from scheduler import scheduler_from_arguments
+from tile_cache import DEFAULT_CACHE_MEGABYTES, add_cache_arguments
+from tile_cache import cache_from_arguments
+
+PAN_STEP = 64
+ZOOM_FACTOR = 1.5
+PAN_KEYS = {
+    pygame.K_LEFT: (-PAN_STEP, 0),
+    pygame.K_RIGHT: (PAN_STEP, 0),
+    pygame.K_UP: (0, -PAN_STEP),
+    pygame.K_DOWN: (0, PAN_STEP),
+}
+QUALITY_KEYS = {pygame.K_PAGEUP: 2.0, pygame.K_PAGEDOWN: 0.5}
+
+
+def submit_render(
+    scheduler: RenderScheduler,
+    window: pygame.Surface,
+    state: AppState,
+    colorizer: Colorizer,
+    presenter: Presenter,
+    regions: Optional[list[Tile]] = None,
+    focus: Optional[tuple[float, float]] = None,
+    debounce: bool = False,
+) -> int:
+    """Hands a new view to the render scheduler, replacing the current one.
+
+    The scheduler's threads render the view tile by tile, starting nearest to
+    the focus, and each tile is colored onto the surface as soon as it is
+    finished and marked for the presenter to show. Tiles of the view being
+    replaced are no longer drawn.
 
     Args:
+        scheduler (RenderScheduler): The scheduler that renders the view.
         window (pygame.Surface): The off-screen surface to draw the fractal onto.
-        state (AppState): The main application state, used for render settings like
-                          quality.
-        stop_event (threading.Event): An event that signals the thread to terminate.
-    """
-    x, y = 0, 0
-    width, height = window.get_size()
-    render_state = AppState(width=width, height=height, quality=state.quality)
+        state (AppState): The main application state. The scheduler works on a
+                          snapshot of it, so later pans and zooms do not affect
+                          a render in progress.
+        colorizer (Colorizer): Colors each tile straight into the surface.
+        presenter (Presenter): Shows the tiles, in window coordinates.
+        regions (Optional[list[Tile]]): Restricts the render to these regions of
+                                        the surface. Defaults to the whole surface.
+        focus (Optional[tuple[float, float]]): The pixel to render first, such as
+                                               the cursor of a zoom. Defaults to
+                                               the centre of the surface.
+        debounce (bool): Whether to wait briefly for a newer view first, as for
+                         the bursts of events of a window being resized.
 
-    while y < height and not stop_event.is_set():
-        translated_pixel = pixel_to_complex_cpu(x, y, render_state)
-        iteration_count = calculate_fractal_cpu(translated_pixel, state.quality)
-        pixel_color = colorer_cpu(iteration_count, state.quality)
-        window.set_at((x, y), pixel_color)
+    Returns:
+        int: The generation of the new render.
+    """
+    quality = state.quality
 
-        x += 1
-        if x >= width:
-            x = 0
-            y += 1
+    def draw_tile(tile: Tile, iteration_tile: NDArray[np.int32]) -> None:
+        """Colors a completed tile at its place on the surface."""
+        column_start, row_start, _, _ = tile
+        colorizer.draw(iteration_tile, quality, window, (column_start, row_start))
+        tile_height, tile_width = iteration_tile.shape
+        presenter.mark_dirty(
+            pygame.Rect(column_start, row_start, tile_width, tile_height)
+        )
 
+    width, height = window.get_size()
+    return scheduler.submit(
+        state.with_size(width, height),
+        draw_tile,
+        regions=regions,
+        focus=focus,
+        debounce=debounce,
+    )
 
-def start_render_thread(window: pygame.Surface, app_state: AppState):
-    """Creates, configures, and starts a new background rendering thread.
 
-    Args:
-        window (pygame.Surface): The off-screen surface for the new thread to draw on.
-        app_state (AppState): The main application state object to pass to the thread.
+def argument_parser() -> argparse.ArgumentParser:
+    """Builds the command-line parser of the CPU demo.
 
     Returns:
-        tuple[threading.Thread, threading.Event]: A tuple containing the newly
-        created and started Thread object and its associated Event object, which
-        can be used to stop it.
+        argparse.ArgumentParser: The parser of every option of the program.
     """
-    stop_event = threading.Event()
-
-    render_thread = threading.Thread(
-        target=calculate_fractal,
-        args=(window, app_state, stop_event),
-        daemon=True,
-    )
-
-    render_thread.start()
-
-    return render_thread, stop_event
+    parser = argparse.ArgumentParser(description="Live CPU fractal renderer.")
+    add_backend_argument(parser, default="multiprocess")
+    add_cache_arguments(parser, default=DEFAULT_CACHE_MEGABYTES)
+    add_scheduler_arguments(parser, default=os.cpu_count() or 1)
+    add_palette_argument(parser)
+    add_precision_arguments(parser, default="float64")
+    add_presenter_arguments(parser)
+    add_profiling_arguments(parser)
+    return parser
 
 
 def main():
     """Initializes Pygame and runs the main application loop for the CPU demo.
 
-    Initiates the fractal rendering process on a background thread to maintain
-    UI responsiveness. The main loop handles user input for quitting, resizing,
-    and refreshing, while continuously displaying the progressive render.
+    Hands every view to a long-lived render scheduler whose threads render it
+    tile by tile, so the UI stays responsive and a new view immediately
+    replaces the one in progress; the bursts of events of a window being
+    resized are debounced. The main loop handles user input for quitting,
+    resizing, refreshing, panning with the arrow keys, zooming with the mouse
+    wheel and changing the quality with Page Up and Page Down. It sleeps until
+    input arrives or tiles are finished, and then presents only the parts of
+    the window that changed, at most `--max-fps` times a second, so it leaves
+    the CPU to the renderer. Tiles of views seen before are served from the
+    tile cache.
     """
+    parser = argument_parser()
+    arguments = parser.parse_args()
+    backend, precision_statistics = precision_from_arguments(
+        parser, arguments, get_backend(arguments.backend)
+    )
+    backend, cache = cache_from_arguments(arguments, backend)
+    colorizer = Colorizer(arguments.palette)
+    sinks_from_arguments(arguments)
+
     pygame.display.init()
-    app_state = AppState(width=640, height=480, quality=2500)
+    app_state = AppState(
+        width=640, height=480, quality=2500, precision=arguments.precision
+    )
     app_window = pygame.display.set_mode(
         (app_state.width, app_state.height), pygame.RESIZABLE
     )
-    pygame.display.set_caption("Fractal Visualizer: CPU Rendering Pixel by Pixel")
+    pygame.display.set_caption(f"Fractal Visualizer: CPU Rendering ({backend.name})")
 
+    presenter = Presenter(app_window, arguments.max_fps)
+    scheduler = scheduler_from_arguments(arguments, backend)
     window = pygame.Surface((app_state.width, app_state.height))
-    cpu_thread, stop_event = start_render_thread(window, app_state)
+    submit_render(scheduler, window, app_state, colorizer, presenter)
 
     app_running = True
     while app_running:
-        for event in pygame.event.get():
+        for event in presenter.wait_for_events():
             if event.type == pygame.QUIT:
                 app_running = False
-                stop_event.set()
 
             elif event.type == pygame.VIDEORESIZE:
-                stop_event.set()
                 app_state.width, app_state.height = event.size
 
                 app_window = pygame.display.set_mode(
                     (app_state.width, app_state.height), pygame.RESIZABLE
                 )
 
+                presenter.set_window(app_window)
+
                 window = pygame.Surface((app_state.width, app_state.height))
-                cpu_thread, stop_event = start_render_thread(window, app_state)
+                submit_render(
+                    scheduler, window, app_state, colorizer, presenter, debounce=True
+                )
 
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                stop_event.set()
+                scheduler.cancel()
+                window.fill((0, 0, 0))
+                presenter.mark_all_dirty()
+
+                submit_render(scheduler, window, app_state, colorizer, presenter)
+
+            elif event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+                dx, dy = PAN_KEYS[event.key]
+                app_state.pan(dx, dy)
+
+                if scheduler.busy:
+                    scheduler.cancel()
+                    window.fill((0, 0, 0))
+                    presenter.mark_all_dirty()
+                    submit_render(scheduler, window, app_state, colorizer, presenter)
+                else:
+                    window.scroll(-dx, -dy)
+                    presenter.mark_all_dirty()
+                    submit_render(
+                        scheduler,
+                        window,
+                        app_state,
+                        colorizer,
+                        presenter,
+                        exposed_regions(app_state.width, app_state.height, dx, dy),
+                    )
+
+            elif event.type == pygame.MOUSEWHEEL:
+                scheduler.cancel()
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                app_state.zoom_at(mouse_x, mouse_y, ZOOM_FACTOR**event.y)
                 window.fill((0, 0, 0))
+                presenter.mark_all_dirty()
+
+                submit_render(
+                    scheduler,
+                    window,
+                    app_state,
+                    colorizer,
+                    presenter,
+                    focus=(mouse_x, mouse_y),
+                )
+
+            elif event.type == pygame.KEYDOWN and event.key in QUALITY_KEYS:
+                app_state.quality = max(
+                    1, round(app_state.quality * QUALITY_KEYS[event.key])
+                )
 
-                cpu_thread, stop_event = start_render_thread(window, app_state)
+                submit_render(scheduler, window, app_state, colorizer, presenter)
 
-        app_window.blit(window, (0, 0))
-        pygame.display.flip()
+        presenter.present([(window, (0, 0), colorizer.lock)])
 
-    cpu_thread.join(timeout=1.0)
+    scheduler.close()
+    print(f"Render scheduler: {scheduler.statistics}")
+    print(f"Presenter: {presenter.statistics}")
+    if precision_statistics is not None:
+        print(f"Precision: {precision_statistics}")
+    if cache is not None:
+        print(f"Tile cache: {cache.statistics}")
+        cache.clear()
+    close_sinks()
     pygame.quit()
 
 
@@ -0,0 +1,681 @@
+import argparse
+import json
+import numpy as np
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from numpy.typing import NDArray
+from typing import Any, Optional
+from state import AppState
+from engine import Tile
+from backends import Backend, add_backend_argument, get_backend
+from parallel import estimate_tile_costs, split_region_into_tiles
+
+LOCALHOST = "127.0.0.1"
+DEFAULT_PORT = 8100
+DEFAULT_DISTRIBUTED_TILE_SIZE = 128
+DEFAULT_TASK_TIMEOUT = 60.0
+MAX_ATTEMPTS = 3
+MAX_TILES_IN_FLIGHT = 8
+TARGET_IN_FLIGHT_SECONDS = 0.25
+WORKER_START_SECONDS = 60.0
+
+# Every message is a JSON header followed by an optional binary payload,
+# preceded by the byte lengths of both.
+MESSAGE_LENGTHS = struct.Struct("!II")
+
+
+def send_message(
+    connection: socket.socket, header: dict[str, Any], payload: bytes = b""
+) -> None:
+    """Sends one message of the coordinator protocol.
+
+    Args:
+        connection (socket.socket): The connection to send on.
+        header (dict[str, Any]): The JSON-serializable header, whose "type"
+                                 names the message.
+        payload (bytes): Binary data following the header, such as the
+                         iteration counts of a tile.
+    """
+    encoded_header = json.dumps(header).encode()
+    connection.sendall(
+        MESSAGE_LENGTHS.pack(len(encoded_header), len(payload))
+        + encoded_header
+        + payload
+    )
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytearray:
+    """Reads exactly `size` bytes from a connection.
+
+    Raises:
+        ConnectionError: If the connection closes first.
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = connection.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Connection closed by the peer.")
+        received += count
+
+    return buffer
+
+
+def receive_message(connection: socket.socket) -> tuple[dict[str, Any], bytearray]:
+    """Receives one message of the coordinator protocol.
+
+    Args:
+        connection (socket.socket): The connection to receive from.
+
+    Returns:
+        tuple[dict[str, Any], bytearray]: The header and the payload.
+
+    Raises:
+        ConnectionError: If the connection closes before the whole message.
+    """
+    header_length, payload_length = MESSAGE_LENGTHS.unpack(
+        _receive_exactly(connection, MESSAGE_LENGTHS.size)
+    )
+    header = json.loads(_receive_exactly(connection, header_length))
+    return header, _receive_exactly(connection, payload_length)
+
+
+def run_worker(host: str, port: int, backend: Backend) -> int:
+    """Renders the tiles a coordinator hands out until it disconnects.
+
+    Args:
+        host (str): The address of the coordinator.
+        port (int): The port of the coordinator.
+        backend (Backend): The backend that calculates every tile.
+
+    Returns:
+        int: The number of tiles rendered.
+    """
+    tiles = 0
+    with socket.create_connection((host, port)) as connection:
+        send_message(
+            connection,
+            {
+                "type": "hello",
+                "name": f"{socket.gethostname()}:{os.getpid()}",
+                "backend": backend.name,
+            },
+        )
+
+        while True:
+            try:
+                header, _ = receive_message(connection)
+            except ConnectionError:
+                return tiles
+            if header["type"] == "stop":
+                return tiles
+
+            column_start, row_start, column_end, row_end = header["tile"]
+            start_time = time.perf_counter()
+            try:
+                iteration_tile = backend.calculate(
+                    AppState.from_dict(header["state"]),
+                    row_start,
+                    row_end,
+                    column_start,
+                    column_end,
+                )
+            except Exception as error:
+                send_message(
+                    connection,
+                    {"type": "error", "job": header["job"], "message": str(error)},
+                )
+                continue
+
+            iteration_tile = np.ascontiguousarray(iteration_tile, dtype=np.int32)
+            send_message(
+                connection,
+                {
+                    "type": "result",
+                    "job": header["job"],
+                    "tile": header["tile"],
+                    "seconds": time.perf_counter() - start_time,
+                },
+                iteration_tile.tobytes(),
+            )
+            tiles += 1
+
+
+class WorkerStatistics:
+    """Counts the work one worker did and how fast it did it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.tiles = 0
+        self.pixels = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def pixels_per_second(self) -> float:
+        """The pixels the worker calculates per second of rendering."""
+        return self.pixels / self.busy_seconds if self.busy_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.tiles} tiles, "
+            f"{self.pixels_per_second / 1e6:.2f} Mpixels/s"
+        )
+
+
+class DistributedStatistics:
+    """Measures one distributed render and the share of every worker."""
+
+    def __init__(self):
+        self.pixels = 0
+        self.tiles = 0
+        self.retries = 0
+        self.speculative = 0
+        self.elapsed_seconds = 0.0
+        self.workers: dict[str, WorkerStatistics] = {}
+
+    @property
+    def pixels_per_second(self) -> float:
+        """The pixels assembled per second of wall-clock time."""
+        return self.pixels / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self) -> str:
+        worker_lines = "".join(f"\n  {worker}" for worker in self.workers.values())
+        return (
+            f"{self.tiles} tiles in {self.elapsed_seconds * 1000:.1f} ms "
+            f"({self.pixels_per_second / 1e6:.2f} Mpixels/s) on "
+            f"{len(self.workers)} workers, {self.retries} retries, "
+            f"{self.speculative} speculative copies{worker_lines}"
+        )
+
+
+class DistributedJob:
+    """The tiles of one render, the copies of them in flight and the result."""
+
+    def __init__(self, identifier: int, state: AppState, tiles: list[Tile]):
+        self.identifier = identifier
+        self.message = state.to_dict()
+        self.pending = deque(tiles)
+        self.remaining = set(tiles)
+        self.copies_in_flight = {tile: 0 for tile in tiles}
+        self.attempts = {tile: 0 for tile in tiles}
+        self.dispatched: dict[Tile, float] = {}
+        self.iteration_grid = np.empty((state.height, state.width), dtype=np.int32)
+        self.statistics = DistributedStatistics()
+        self.started = time.perf_counter()
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+
+class Coordinator:
+    """Hands the tiles of a render out to workers connected over TCP.
+
+    Workers started with `run_worker` connect at any time and stay connected
+    between renders. Each asks for work by finishing the tiles it holds, so
+    faster workers take more tiles, and each holds as many tiles as it
+    finishes in `TARGET_IN_FLIGHT_SECONDS`, so a fast worker never waits for
+    a round trip. The most expensive tiles go out first. Once no tiles are
+    left to hand out, idle workers take a second copy of a tile still held by
+    another one and the first copy back wins, so a slow machine cannot hold
+    up the end of a render. Tiles of a worker that disconnects, fails or does
+    not answer within `task_timeout` seconds go back to the queue, up to
+    `max_attempts` times each.
+
+    Binds to localhost unless another `host` is given.
+    """
+
+    def __init__(
+        self,
+        host: str = LOCALHOST,
+        port: int = DEFAULT_PORT,
+        tile_size: int = DEFAULT_DISTRIBUTED_TILE_SIZE,
+        task_timeout: float = DEFAULT_TASK_TIMEOUT,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.tile_size = tile_size
+        self.task_timeout = task_timeout
+        self.max_attempts = max_attempts
+        self.workers: dict[str, WorkerStatistics] = {}
+        self._job: Optional[DistributedJob] = None
+        self._jobs = 0
+        self._connections: set[socket.socket] = set()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._listener = socket.create_server((host, port))
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def wait_for_workers(self, count: int, timeout: Optional[float] = None) -> bool:
+        """Waits until at least `count` workers are connected.
+
+        Args:
+            count (int): The number of workers to wait for.
+            timeout (Optional[float]): The longest time to wait in seconds.
+
+        Returns:
+            bool: True if enough workers are connected.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self.workers) >= count, timeout)
+
+    def render(
+        self, state: AppState, timeout: Optional[float] = None
+    ) -> tuple[NDArray[np.int32], DistributedStatistics]:
+        """Renders a view on the connected workers.
+
+        Args:
+            state (AppState): The view to render.
+            timeout (Optional[float]): The longest time to wait in seconds.
+
+        Returns:
+            tuple[NDArray[np.int32], DistributedStatistics]: The iteration counts
+                of the whole view and how the render was shared out.
+
+        Raises:
+            RuntimeError: If a tile failed `max_attempts` times.
+            TimeoutError: If the render did not finish in time.
+        """
+        tiles = split_region_into_tiles(
+            (0, 0, state.width, state.height), self.tile_size
+        )
+        costs = estimate_tile_costs(state, tiles)
+        tiles = [tile for _, tile in sorted(zip(costs, tiles), reverse=True)]
+
+        with self._condition:
+            self._jobs += 1
+            job = DistributedJob(self._jobs, state, tiles)
+            self._job = job
+            self._condition.notify_all()
+
+        finished = job.done.wait(timeout)
+        with self._condition:
+            self._job = None
+
+        if job.error is not None:
+            raise RuntimeError(job.error)
+        if not finished:
+            raise TimeoutError(f"The render did not finish within {timeout} s.")
+
+        return job.iteration_grid, job.statistics
+
+    def close(self) -> None:
+        """Disconnects every worker and stops listening."""
+        with self._condition:
+            self._closed = True
+            connections = list(self._connections)
+            self._condition.notify_all()
+
+        self._listener.close()
+        for connection in connections:
+            try:
+                send_message(connection, {"type": "stop"})
+            except OSError:
+                pass
+
+    def _accept(self) -> None:
+        """Runs in the accepting thread, serving every worker in its own thread."""
+        while True:
+            try:
+                connection, address = self._listener.accept()
+            except OSError:
+                return
+
+            threading.Thread(
+                target=self._serve_worker, args=(connection, address), daemon=True
+            ).start()
+
+    def _tiles_in_flight(self, worker: WorkerStatistics) -> int:
+        """How many tiles a worker should hold, given its measured speed."""
+        if not worker.pixels_per_second:
+            return 1
+
+        tiles_per_target = (
+            worker.pixels_per_second * TARGET_IN_FLIGHT_SECONDS / self.tile_size**2
+        )
+        return 1 + min(MAX_TILES_IN_FLIGHT - 1, int(tiles_per_target))
+
+    def _next_tile(self, idle: bool) -> Optional[tuple[DistributedJob, Tile]]:
+        """Takes the next tile to hand out, while holding the lock.
+
+        Args:
+            idle (bool): Whether the worker holds no tiles, which makes it
+                         eligible for a speculative copy.
+
+        Returns:
+            Optional[tuple[DistributedJob, Tile]]: The job and tile, or None if
+                                                   there is nothing to do.
+        """
+        job = self._job
+        if job is None or job.done.is_set():
+            return None
+
+        if job.pending:
+            tile = job.pending.popleft()
+        elif idle:
+            single_copies = [
+                tile for tile in job.remaining if job.copies_in_flight[tile] == 1
+            ]
+            if not single_copies:
+                return None
+            tile = min(single_copies, key=job.dispatched.__getitem__)
+            job.statistics.speculative += 1
+        else:
+            return None
+
+        job.copies_in_flight[tile] += 1
+        job.dispatched.setdefault(tile, time.perf_counter())
+        return job, tile
+
+    def _complete(
+        self,
+        job: DistributedJob,
+        tile: Tile,
+        header: dict[str, Any],
+        payload: bytearray,
+        worker: WorkerStatistics,
+    ) -> None:
+        """Stores a finished tile, while holding the lock."""
+        column_start, row_start, column_end, row_end = tile
+        shape = (row_end - row_start, column_end - column_start)
+        job.copies_in_flight[tile] -= 1
+
+        worker.tiles += 1
+        worker.pixels += shape[0] * shape[1]
+        worker.busy_seconds += header["seconds"]
+        job_worker = job.statistics.workers.setdefault(
+            worker.name, WorkerStatistics(worker.name)
+        )
+        job_worker.tiles += 1
+        job_worker.pixels += shape[0] * shape[1]
+        job_worker.busy_seconds += header["seconds"]
+
+        if tile not in job.remaining:
+            return
+
+        job.iteration_grid[row_start:row_end, column_start:column_end] = np.frombuffer(
+            payload, dtype=np.int32
+        ).reshape(shape)
+        job.remaining.discard(tile)
+        job.statistics.tiles += 1
+        job.statistics.pixels += shape[0] * shape[1]
+
+        if not job.remaining:
+            job.statistics.elapsed_seconds = time.perf_counter() - job.started
+            job.done.set()
+
+    def _requeue(self, job: DistributedJob, tile: Tile) -> None:
+        """Puts back a tile that a worker lost, while holding the lock."""
+        job.copies_in_flight[tile] -= 1
+        if tile not in job.remaining or job.copies_in_flight[tile]:
+            return
+
+        job.attempts[tile] += 1
+        if job.attempts[tile] >= self.max_attempts:
+            job.error = f"Tile {tile} failed {job.attempts[tile]} times."
+            job.done.set()
+            return
+
+        job.statistics.retries += 1
+        job.pending.appendleft(tile)
+
+    def _serve_worker(self, connection: socket.socket, address: tuple) -> None:
+        """Runs in one thread per worker, feeding it tiles and collecting them."""
+        in_flight: deque[tuple[DistributedJob, Tile]] = deque()
+        worker: Optional[WorkerStatistics] = None
+        connection.settimeout(self.task_timeout)
+
+        try:
+            hello, _ = receive_message(connection)
+            with self._condition:
+                if self._closed:
+                    return
+                name = f"{hello['name']} ({hello['backend']})"
+                while name in self.workers:
+                    name += "'"
+                worker = self.workers[name] = WorkerStatistics(name)
+                self._connections.add(connection)
+                self._condition.notify_all()
+
+            while True:
+                to_send = []
+                with self._condition:
+                    while not self._closed:
+                        while len(in_flight) < self._tiles_in_flight(worker):
+                            task = self._next_tile(idle=not in_flight)
+                            if task is None:
+                                break
+                            in_flight.append(task)
+                            to_send.append(task)
+                        if in_flight:
+                            break
+                        self._condition.wait()
+                    if self._closed:
+                        return
+
+                for job, tile in to_send:
+                    send_message(
+                        connection,
+                        {
+                            "type": "tile",
+                            "job": job.identifier,
+                            "tile": list(tile),
+                            "state": job.message,
+                        },
+                    )
+
+                header, payload = receive_message(connection)
+                job, tile = in_flight.popleft()
+                with self._condition:
+                    if header["type"] == "result":
+                        self._complete(job, tile, header, payload, worker)
+                    else:
+                        self._requeue(job, tile)
+                    self._condition.notify_all()
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            with self._condition:
+                for job, tile in in_flight:
+                    self._requeue(job, tile)
+                if worker is not None:
+                    del self.workers[worker.name]
+                self._connections.discard(connection)
+                self._condition.notify_all()
+            connection.close()
+
+
+def add_view_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options describing the view to render to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+    """
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--quality", type=int, default=2500)
+    parser.add_argument(
+        "--center",
+        nargs=2,
+        type=Decimal,
+        default=[Decimal("-0.745"), Decimal("0.113")],
+        metavar=("REAL", "IMAG"),
+    )
+    parser.add_argument("--scale", type=float, default=0.05)
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_DISTRIBUTED_TILE_SIZE)
+
+
+def view_from_arguments(arguments: argparse.Namespace) -> AppState:
+    """Builds the view described by `add_view_arguments` options.
+
+    Args:
+        arguments (argparse.Namespace): The parsed options.
+
+    Returns:
+        AppState: The view to render.
+    """
+    state = AppState(
+        width=arguments.width,
+        height=arguments.height,
+        quality=arguments.quality,
+        scale=arguments.scale,
+    )
+    state.set_precise_center(*arguments.center)
+    return state
+
+
+def worker_command(arguments: argparse.Namespace) -> int:
+    """Runs a worker until its coordinator disconnects.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "worker" command.
+
+    Returns:
+        int: The exit status.
+    """
+    tiles = run_worker(arguments.host, arguments.port, get_backend(arguments.backend))
+    print(f"Worker finished after {tiles} tiles")
+    return 0
+
+
+def render_command(arguments: argparse.Namespace) -> int:
+    """Renders one view on workers that connect to this coordinator.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "render" command.
+
+    Returns:
+        int: The exit status.
+    """
+    coordinator = Coordinator(
+        arguments.host, arguments.port, tile_size=arguments.tile_size
+    )
+    try:
+        print(f"Waiting for {arguments.workers} workers on port {coordinator.port}")
+        coordinator.wait_for_workers(arguments.workers)
+        iteration_grid, statistics = coordinator.render(view_from_arguments(arguments))
+    finally:
+        coordinator.close()
+
+    np.save(arguments.output, iteration_grid)
+    print(f"Distributed rendering: {statistics}")
+    print(f"Iteration counts written to {arguments.output}")
+    return 0
+
+
+def scaling_command(arguments: argparse.Namespace) -> int:
+    """Measures how throughput scales as local worker processes are added.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "scaling" command.
+
+    Returns:
+        int: The exit status.
+    """
+    coordinator = Coordinator(port=0, tile_size=arguments.tile_size)
+    state = view_from_arguments(arguments)
+    processes: list[subprocess.Popen] = []
+    single_worker_rate = 0.0
+
+    try:
+        for count in range(1, arguments.max_workers + 1):
+            processes.append(
+                subprocess.Popen(
+                    [
+                        sys.executable,
+                        os.path.abspath(__file__),
+                        "worker",
+                        "--port",
+                        str(coordinator.port),
+                        "--backend",
+                        arguments.backend,
+                    ],
+                    stdout=subprocess.DEVNULL,
+                )
+            )
+            if not coordinator.wait_for_workers(count, WORKER_START_SECONDS):
+                raise RuntimeError(f"Worker {count} did not connect.")
+
+            # The first render warms up the new worker's backend.
+            coordinator.render(state)
+            _, statistics = coordinator.render(state)
+            single_worker_rate = single_worker_rate or statistics.pixels_per_second
+            print(
+                f"{count} workers: {statistics.elapsed_seconds * 1000:.1f} ms, "
+                f"{statistics.pixels_per_second / 1e6:.2f} Mpixels/s, "
+                f"{statistics.pixels_per_second / single_worker_rate:.2f}x one "
+                "worker"
+            )
+    finally:
+        coordinator.close()
+        for process in processes:
+            process.wait()
+
+    return 0
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses the command-line options of the distributed renderer.
+
+    Returns:
+        argparse.Namespace: The chosen command and its options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Renders a view on worker processes across machines."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = commands.add_parser("worker", help="render tiles for a coordinator")
+    worker_parser.set_defaults(handler=worker_command)
+    worker_parser.add_argument("--host", default=LOCALHOST, help="coordinator address")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_backend_argument(worker_parser, default="cpu")
+
+    render_parser = commands.add_parser(
+        "render", help="coordinate a render and save its iteration counts"
+    )
+    render_parser.set_defaults(handler=render_command)
+    render_parser.add_argument(
+        "--host",
+        default=LOCALHOST,
+        help=f"address to listen on, e.g. 0.0.0.0 for other machines "
+        f"(default: {LOCALHOST})",
+    )
+    render_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    render_parser.add_argument(
+        "--workers", type=int, default=1, help="workers to wait for before starting"
+    )
+    render_parser.add_argument("--output", default="iterations.npy")
+    add_view_arguments(render_parser)
+
+    scaling_parser = commands.add_parser(
+        "scaling", help="report throughput as local workers are added"
+    )
+    scaling_parser.set_defaults(handler=scaling_command)
+    scaling_parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    add_backend_argument(scaling_parser, default="numpy")
+    add_view_arguments(scaling_parser)
+
+    return parser.parse_args()
+
+
+def main():
+    """Runs the requested command of the distributed renderer.
+
+    "worker" connects to a coordinator and renders the tiles it is given with
+    any backend. "render" coordinates one render across the workers that
+    connect and saves the assembled iteration counts. "scaling" starts local
+    workers one by one and reports the throughput gained by each.
+    """
+    arguments = parse_arguments()
+    sys.exit(arguments.handler(arguments))
+
+
+if __name__ == "__main__":
+    main()
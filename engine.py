@@ -1,9 +1,94 @@
-import cupy as cp
 import numpy as np
+import profiling
 import pygame
-from cupy import RawKernel  # type: ignore
 from numpy.typing import NDArray
-from state import AppState
+from typing import Callable, Optional
+from state import PRECISIONS, AppState
+
+Tile = tuple[int, int, int, int]
+
+SUBDIVISION_MIN_SIZE = 6
+POINTS_THREADS_PER_BLOCK = 256
+
+FLOAT32_MIN_PIXEL_ULPS = 4096
+ESCAPE_RADIUS = 2.0
+
+MANDELBROT_KERNEL_CODE = r"""
+#include <cupy/complex.cuh>
+
+template<typename T>
+__device__ void mandelbrot_pixel(const complex<T>* initial_grid, int* output_iterations,
+                                 int max_iterations, int width, int height,
+                                 int cardioid_check, int periodicity_check) {
+
+    int x = blockDim.x * blockIdx.x + threadIdx.x;
+    int y = blockDim.y * blockIdx.y + threadIdx.y;
+
+    if (x >= width || y >= height) {
+        return;
+    }
+
+    int index = y * width + x;
+
+    complex<T> c = initial_grid[index];
+
+    if (cardioid_check) {
+        T shifted_real = c.real() - T(0.25);
+        T imag_squared = c.imag() * c.imag();
+        T q = shifted_real * shifted_real + imag_squared;
+        T bulb_real = c.real() + T(1);
+
+        if (q * (q + shifted_real) < T(0.25) * imag_squared ||
+            bulb_real * bulb_real + imag_squared < T(0.0625)) {
+            output_iterations[index] = max_iterations;
+            return;
+        }
+    }
+
+    complex<T> z = 0;
+    complex<T> saved_z = 0;
+    int next_checkpoint = 1;
+    int n = 0;
+
+    while (abs(z) <= T(2) && n < max_iterations) {
+        z = z * z + c;
+        n++;
+
+        if (periodicity_check) {
+            if (z == saved_z) {
+                n = max_iterations;
+                break;
+            }
+            if (n == next_checkpoint) {
+                saved_z = z;
+                next_checkpoint *= 2;
+            }
+        }
+    }
+    output_iterations[index] = n;
+}
+
+extern "C" __global__
+void mandelbrot_kernel(const complex<double>* initial_grid, int* output_iterations,
+                        int max_iterations, int width, int height,
+                        int cardioid_check, int periodicity_check) {
+    mandelbrot_pixel<double>(initial_grid, output_iterations, max_iterations,
+                             width, height, cardioid_check, periodicity_check);
+}
+
+extern "C" __global__
+void mandelbrot_kernel_float32(const complex<float>* initial_grid,
+                               int* output_iterations, int max_iterations,
+                               int width, int height, int cardioid_check,
+                               int periodicity_check) {
+    mandelbrot_pixel<float>(initial_grid, output_iterations, max_iterations,
+                            width, height, cardioid_check, periodicity_check);
+}
+"""
+KERNEL_NAMES = {
+    np.dtype(np.float64): "mandelbrot_kernel",
+    np.dtype(np.float32): "mandelbrot_kernel_float32",
+}
 
 
 def pixel_to_complex_cpu(x: int, y: int, state: AppState) -> complex:
@@ -13,37 +98,84 @@ def pixel_to_complex_cpu(x: int, y: int, state: AppState) -> complex:
         x (int): The x-coordinate of the pixel.
         y (int): The y-coordinate of the pixel.
         state (AppState): The application state containing view parameters like
-                          width and height.
+                          width, height, center and scale.
 
     Returns:
         complex: The corresponding complex number for the given pixel.
     """
     centered_x = x - (state.width / 2)
     centered_y = y - (state.height / 2)
-    scaled_x = centered_x / state.width * 4
-    scaled_y = centered_y / state.height * 4
+    scaled_x = centered_x / state.width * state.scale + state.center.real
+    scaled_y = centered_y / state.height * state.scale + state.center.imag
 
     return complex(scaled_x, scaled_y)
 
 
-def calculate_fractal_cpu(coordinate: complex, max_iterations: int) -> int:
+def in_cardioid_or_bulb(coordinate: complex) -> bool:
+    """Checks whether a point lies inside the main cardioid or the period-2 bulb.
+
+    Both regions are known analytically to be part of the Mandelbrot set, so
+    their points can be assigned the maximum iteration count without iterating.
+    Points on the boundary itself are not matched.
+
+    Args:
+        coordinate (complex): The point on the complex plane to test.
+
+    Returns:
+        bool: True if the point is strictly inside either region.
+    """
+    shifted_real = coordinate.real - 0.25
+    imag_squared = coordinate.imag * coordinate.imag
+    q = shifted_real * shifted_real + imag_squared
+    in_cardioid = q * (q + shifted_real) < 0.25 * imag_squared
+
+    bulb_real = coordinate.real + 1.0
+    in_bulb = bulb_real * bulb_real + imag_squared < 0.0625
+
+    return in_cardioid or in_bulb
+
+
+def calculate_fractal_cpu(
+    coordinate: complex,
+    max_iterations: int,
+    cardioid_check: bool = False,
+    periodicity_check: bool = False,
+) -> int:
     """Calculates the Mandelbrot set iteration count for a single complex number.
 
     Args:
         coordinate (complex): The specific point on the complex plane to test.
         max_iterations (int): The limit of iterations to perform before stopping.
+        cardioid_check (bool): Skips points inside the main cardioid or the
+                               period-2 bulb, see `in_cardioid_or_bulb`.
+        periodicity_check (bool): Stops as soon as the orbit returns exactly to
+                                  a value saved at a power-of-two iteration,
+                                  because such an orbit repeats forever.
 
     Returns:
         int: The final iteration count. A count equal to max_iterations implies
-             the point is likely within the Mandelbrot set.
+             the point is likely within the Mandelbrot set. The short-circuits
+             never change the result.
     """
+    if cardioid_check and in_cardioid_or_bulb(coordinate):
+        return max_iterations
+
     z = 0
     iterations = 0
+    saved_z = 0
+    next_checkpoint = 1
 
     while abs(z) <= 2 and iterations < max_iterations:
         z = z * z + coordinate
         iterations += 1
 
+        if periodicity_check:
+            if z == saved_z:
+                return max_iterations
+            if iterations == next_checkpoint:
+                saved_z = z
+                next_checkpoint *= 2
+
     return iterations
 
 
@@ -69,75 +201,879 @@ def colorer_cpu(current_iterations: int, max_iterations: int) -> tuple[int, int,
     return (red, green, blue)
 
 
-def calculate_fractal_gpu(state: AppState) -> NDArray[np.int32]:
-    """Generates the complete grid of Mandelbrot set iteration counts on the GPU.
+def calculate_fractal_python(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of Mandelbrot set iteration counts one pixel at a time.
 
-    Uses a custom CUDA kernel to perform the calculation in parallel for all
-    pixels, based on the provided application state.
+    Plain Python reference renderer built on `pixel_to_complex_cpu` and
+    `calculate_fractal_cpu`, with the same interface as the vectorized engines.
+    Honors the escape-time short-circuits enabled in the state.
 
     Args:
         state (AppState): The application state containing all parameters for the
                           render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
 
     Returns:
         NDArray[np.int32]: A 2D NumPy array containing the final iteration count
-                           for every pixel.
+                           for every pixel in the requested region.
     """
-    mandelbrot_kernel_code = r"""
-    #include <cupy/complex.cuh>
+    if row_end is None:
+        row_end = state.height
+    if column_end is None:
+        column_end = state.width
 
-    extern "C" __global__
-    void mandelbrot_kernel(const complex<double>* initial_grid, int* output_iterations,
-                            int max_iterations, int width, int height) {
+    computed_rows, row_sources = mirrored_rows(state, row_start, row_end)
+    iteration_grid = np.empty(
+        (len(computed_rows), column_end - column_start), dtype=np.int32
+    )
+    for index, row in enumerate(computed_rows):
+        y = row_start + int(row)
+        for x in range(column_start, column_end):
+            coordinate = pixel_to_complex_cpu(x, y, state)
+            iteration_grid[index, x - column_start] = calculate_fractal_cpu(
+                coordinate,
+                state.quality,
+                cardioid_check=state.cardioid_check,
+                periodicity_check=state.periodicity_check,
+            )
 
-        int x = blockDim.x * blockIdx.x + threadIdx.x;
-        int y = blockDim.y * blockIdx.y + threadIdx.y;
+    profiling.count_iterations(iteration_grid)
+    return iteration_grid[row_sources]
 
-        if (x >= width || y >= height) {
-            return;
-        }
 
-        int index = y * width + x;
+def real_axis_cpu(
+    state: AppState, column_start: int = 0, column_end: Optional[int] = None
+) -> NDArray[np.float64]:
+    """Maps a range of pixel columns to their real coordinates.
 
-        complex<double> c = initial_grid[index];
-        complex<double> z = 0;
-        int n = 0;
+    Args:
+        state (AppState): The application state containing view parameters like
+                          width, center and scale.
+        column_start (int): The first pixel column (inclusive).
+        column_end (Optional[int]): The last pixel column (exclusive). Defaults
+                                    to the full width of the view.
 
-        while (abs(z) <= 2.0 && n < max_iterations) {
-            z = z * z + c;
-            n++;
-        }
-        output_iterations[index] = n;
+    Returns:
+        NDArray[np.float64]: The real part shared by every pixel of each column,
+                             matching `pixel_to_complex_cpu`.
+    """
+    if column_end is None:
+        column_end = state.width
+
+    centered_columns = np.arange(column_start, column_end) - (state.width / 2)
+    return centered_columns / state.width * state.scale + state.center.real
+
+
+def imaginary_axis_cpu(
+    state: AppState, row_start: int = 0, row_end: Optional[int] = None
+) -> NDArray[np.float64]:
+    """Maps a range of pixel rows to their imaginary coordinates.
+
+    Args:
+        state (AppState): The application state containing view parameters like
+                          height, center and scale.
+        row_start (int): The first pixel row (inclusive).
+        row_end (Optional[int]): The last pixel row (exclusive). Defaults to the
+                                 full height of the view.
+
+    Returns:
+        NDArray[np.float64]: The imaginary part shared by every pixel of each
+                             row, matching `pixel_to_complex_cpu`.
+    """
+    if row_end is None:
+        row_end = state.height
+
+    centered_rows = np.arange(row_start, row_end) - (state.height / 2)
+    return centered_rows / state.height * state.scale + state.center.imag
+
+
+def mirrored_rows(
+    state: AppState, row_start: int = 0, row_end: Optional[int] = None
+) -> tuple[NDArray[np.intp], NDArray[np.intp]]:
+    """Finds the rows of a band that only need to be calculated once.
+
+    The orbit of a point's complex conjugate is the exact mirror image of its
+    own orbit, so both escape after the same number of iterations. When
+    `state.mirror_symmetry` is enabled, every row whose imaginary coordinate is
+    the exact negation of another row's in the same band is copied from that
+    row instead of being calculated.
+
+    Args:
+        state (AppState): The application state containing view parameters like
+                          height, center, scale and the mirror_symmetry toggle.
+        row_start (int): The first pixel row of the band (inclusive).
+        row_end (Optional[int]): The last pixel row of the band (exclusive).
+                                 Defaults to the full height of the view.
+
+    Returns:
+        tuple[NDArray[np.intp], NDArray[np.intp]]: The band-relative indices of
+            the rows to calculate, and for every row of the band the position
+            in that list of the row holding its values. Indexing the calculated
+            rows with the second array produces the full band.
+    """
+    imaginary_axis = imaginary_axis_cpu(state, row_start, row_end)
+    all_rows = np.arange(imaginary_axis.size)
+
+    if not state.mirror_symmetry:
+        return all_rows, all_rows
+
+    upper_rows = {value: row for row, value in enumerate(imaginary_axis) if value >= 0}
+    mirror_of = {
+        row: upper_rows[-value]
+        for row, value in enumerate(imaginary_axis)
+        if value < 0 and -value in upper_rows
     }
+
+    computed_rows = np.array(
+        [row for row in all_rows if row not in mirror_of], dtype=np.intp
+    )
+    position = {int(row): index for index, row in enumerate(computed_rows)}
+    row_sources = np.array(
+        [position[mirror_of.get(row, row)] for row in range(all_rows.size)],
+        dtype=np.intp,
+    )
+
+    return computed_rows, row_sources
+
+
+def pixel_grid_cpu(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.complex128]:
+    """Maps a rectangular region of pixels to their points on the complex plane.
+
+    Vectorized counterpart of `pixel_to_complex_cpu`, producing the exact same
+    coordinate for every pixel in the region.
+
+    Args:
+        state (AppState): The application state containing view parameters like
+                          width, height, center and scale.
+        row_start (int): The first pixel row of the region (inclusive).
+        row_end (Optional[int]): The last pixel row of the region (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column of the region (inclusive).
+        column_end (Optional[int]): The last pixel column of the region
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.complex128]: A 2D array of shape (rows, columns) holding the
+                                complex coordinate of every pixel in the region.
+    """
+    real_axis = real_axis_cpu(state, column_start, column_end)
+    imaginary_axis = imaginary_axis_cpu(state, row_start, row_end)
+
+    grid = np.empty((imaginary_axis.size, real_axis.size), dtype=np.complex128)
+    grid.real = real_axis[np.newaxis, :]
+    grid.imag = imaginary_axis[:, np.newaxis]
+
+    return grid
+
+
+def float_dtype(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> np.dtype:
+    """Picks the floating-point type that a render of a region needs.
+
+    Follows `state.precision`. With "auto", single precision is chosen when
+    neighbouring pixels lie at least `FLOAT32_MIN_PIXEL_ULPS` float32 steps
+    apart at the largest value an orbit of the region reaches: the farthest
+    coordinate of the region or the escape radius. Rounding errors then stay
+    far below a pixel and only change the counts of scattered pixels on the
+    boundary of the set, where the count is chaotic anyway. Deeper views
+    fall back to double precision.
+
+    Args:
+        state (AppState): The application state describing the view.
+        row_start (int): The first pixel row of the region (inclusive).
+        row_end (Optional[int]): The last pixel row of the region (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column of the region (inclusive).
+        column_end (Optional[int]): The last pixel column of the region
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        np.dtype: float32 or float64.
+
+    Raises:
+        ValueError: If the state's precision is not one of `state.PRECISIONS`.
+    """
+    if state.precision == "float64":
+        return np.dtype(np.float64)
+    if state.precision == "float32":
+        return np.dtype(np.float32)
+    if state.precision != "auto":
+        raise ValueError(
+            f"Unknown precision '{state.precision}'. "
+            f"Choose from: {', '.join(PRECISIONS)}."
+        )
+
+    if row_end is None:
+        row_end = state.height
+    if column_end is None:
+        column_end = state.width
+
+    real_bounds = real_axis_cpu(state, column_start, column_end)[[0, -1]]
+    imaginary_bounds = imaginary_axis_cpu(state, row_start, row_end)[[0, -1]]
+    magnitude = max(
+        ESCAPE_RADIUS,
+        float(np.hypot(np.abs(real_bounds).max(), np.abs(imaginary_bounds).max())),
+    )
+    pixel_spacing = state.scale / max(state.width, state.height)
+
+    if pixel_spacing >= FLOAT32_MIN_PIXEL_ULPS * np.spacing(np.float32(magnitude)):
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def calculate_points_numpy(
+    coordinates: NDArray[np.complex128],
+    max_iterations: int,
+    cardioid_check: bool = False,
+    periodicity_check: bool = False,
+    dtype: np.dtype = np.dtype(np.float64),
+) -> NDArray[np.int32]:
+    """Calculates Mandelbrot set iteration counts for an array of complex numbers.
+
+    Iterates every point at once with NumPy arrays. After each step the points
+    that escaped are recorded and compacted out of the working set, so escaped
+    pixels stop costing work while the remaining ones keep iterating.
+
+    Args:
+        coordinates (NDArray[np.complex128]): The points on the complex plane to
+                                              test, in any shape.
+        max_iterations (int): The limit of iterations to perform before stopping.
+        cardioid_check (bool): Removes points inside the main cardioid or the
+                               period-2 bulb before iterating.
+        periodicity_check (bool): Removes points whose orbit returns exactly to
+                                  a value saved at a power-of-two iteration.
+        dtype (np.dtype): The floating-point type to iterate in. float32 halves
+                          the memory traffic and doubles the SIMD width.
+
+    Returns:
+        NDArray[np.int32]: An array of the same shape as `coordinates` holding the
+                           final iteration count of each point, matching
+                           `calculate_fractal_cpu` with the same options in
+                           float64.
+    """
+    flat_coordinates = np.ravel(coordinates)
+    iterations = np.full(flat_coordinates.shape, max_iterations, dtype=np.int32)
+
+    active_indices = np.arange(flat_coordinates.size)
+    c_real = flat_coordinates.real.astype(dtype)
+    c_imag = flat_coordinates.imag.astype(dtype)
+
+    if cardioid_check:
+        outside = ~in_cardioid_or_bulb_numpy(c_real, c_imag)
+        active_indices = active_indices[outside]
+        c_real = c_real[outside]
+        c_imag = c_imag[outside]
+
+    z_real = np.zeros_like(c_real)
+    z_imag = np.zeros_like(c_imag)
+    z_real_squared = np.zeros_like(c_real)
+    z_imag_squared = np.zeros_like(c_imag)
+    saved_real = np.zeros_like(c_real)
+    saved_imag = np.zeros_like(c_imag)
+    next_checkpoint = 1
+
+    for iteration in range(1, max_iterations + 1):
+        if active_indices.size == 0:
+            break
+
+        np.multiply(z_real, z_imag, out=z_imag)
+        z_imag *= 2
+        z_imag += c_imag
+        np.subtract(z_real_squared, z_imag_squared, out=z_real)
+        z_real += c_real
+
+        np.multiply(z_real, z_real, out=z_real_squared)
+        np.multiply(z_imag, z_imag, out=z_imag_squared)
+        escaped = (z_real_squared + z_imag_squared) > 4.0
+        finished = escaped
+
+        if periodicity_check:
+            finished = escaped | ((z_real == saved_real) & (z_imag == saved_imag))
+
+        if finished.any():
+            iterations[active_indices[escaped]] = iteration
+            still_active = ~finished
+            active_indices = active_indices[still_active]
+            c_real = c_real[still_active]
+            c_imag = c_imag[still_active]
+            z_real = z_real[still_active]
+            z_imag = z_imag[still_active]
+            z_real_squared = z_real_squared[still_active]
+            z_imag_squared = z_imag_squared[still_active]
+            if periodicity_check:
+                saved_real = saved_real[still_active]
+                saved_imag = saved_imag[still_active]
+
+        if periodicity_check and iteration == next_checkpoint:
+            saved_real = z_real.copy()
+            saved_imag = z_imag.copy()
+            next_checkpoint *= 2
+
+    profiling.count_iterations(iterations)
+    return iterations.reshape(np.shape(coordinates))
+
+
+def in_cardioid_or_bulb_numpy(
+    real: NDArray[np.float64], imag: NDArray[np.float64]
+) -> NDArray[np.bool_]:
+    """Vectorized counterpart of `in_cardioid_or_bulb`.
+
+    Args:
+        real (NDArray[np.float64]): The real parts of the points to test.
+        imag (NDArray[np.float64]): The imaginary parts of the points to test.
+
+    Returns:
+        NDArray[np.bool_]: True for every point strictly inside the main
+                           cardioid or the period-2 bulb.
+    """
+    shifted_real = real - 0.25
+    imag_squared = imag * imag
+    q = shifted_real * shifted_real + imag_squared
+    in_cardioid = q * (q + shifted_real) < 0.25 * imag_squared
+
+    bulb_real = real + 1.0
+    in_bulb = bulb_real * bulb_real + imag_squared < 0.0625
+
+    return in_cardioid | in_bulb
+
+
+def calculate_fractal_numpy(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of Mandelbrot set iteration counts on the CPU with NumPy.
+
+    Vectorized CPU counterpart of `calculate_fractal_gpu`. Can compute either the
+    full view or any rectangular region of it, such as a band of rows or a tile,
+    which lets callers draw partial results while the rest of the image is still
+    being calculated. Honors the escape-time short-circuits enabled in the state
+    and iterates in the floating-point type its precision picks for the region.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    computed_rows, row_sources = mirrored_rows(state, row_start, row_end)
+    with profiling.span("numpy.grid"):
+        coordinate_grid = pixel_grid_cpu(
+            state, row_start, row_end, column_start, column_end
+        )[computed_rows]
+    dtype = float_dtype(state, row_start, row_end, column_start, column_end)
+    profiling.count(f"{dtype.name}_pixels", coordinate_grid.size)
+    with profiling.span("numpy.iterate"):
+        iteration_grid = calculate_points_numpy(
+            coordinate_grid,
+            state.quality,
+            cardioid_check=state.cardioid_check,
+            periodicity_check=state.periodicity_check,
+            dtype=dtype,
+        )
+    return iteration_grid[row_sources]
+
+
+def render_subdivided(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+    min_size: int = SUBDIVISION_MIN_SIZE,
+) -> tuple[NDArray[np.int32], float]:
+    """Generates iteration counts by Mariani-Silver rectangle subdivision.
+
+    Only the border pixels of each rectangle are calculated. If the whole
+    border shares one iteration count, the interior is filled with it;
+    otherwise the rectangle is split into four that reuse the border already
+    calculated. Rectangles at the same depth are processed together, so each
+    level costs a single call to `calculate_points_numpy`.
+
+    Filling is exact for the continuous set: the points that survive n
+    iterations form a region without holes that contains c = 0, so a border
+    inside it encloses only points that survive too, and a border outside it
+    encloses no point of it unless the rectangle contains c = 0, which is never
+    filled. Features thinner than a pixel that cross a border between two
+    samples can still be missed.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+        min_size (int): Rectangles with a side of at most this many pixels are
+                        calculated in full instead of being subdivided.
+
+    Returns:
+        tuple[NDArray[np.int32], float]: The iteration counts of the requested
+            region, and the fraction of its pixels that were actually calculated.
+    """
+    if row_end is None:
+        row_end = state.height
+    if column_end is None:
+        column_end = state.width
+
+    real_axis = real_axis_cpu(state, column_start, column_end)
+    imaginary_axis = imaginary_axis_cpu(state, row_start, row_end)
+    height, width = imaginary_axis.size, real_axis.size
+    iteration_grid = np.full((height, width), -1, dtype=np.int32)
+    if height == 0 or width == 0:
+        return iteration_grid, 0.0
+    calculated_pixels = 0
+
+    def calculate_pixels(rows: NDArray[np.intp], columns: NDArray[np.intp]) -> None:
+        """Calculates the given pixels, skipping any that already have a value."""
+        nonlocal calculated_pixels
+        pending = iteration_grid[rows, columns] < 0
+        rows, columns = rows[pending], columns[pending]
+        # Rectangles at the same depth share edges, so drop duplicate pixels.
+        flat_indices = np.unique(rows * width + columns)
+        rows, columns = flat_indices // width, flat_indices % width
+        calculated_pixels += flat_indices.size
+        coordinates = np.empty(rows.size, dtype=np.complex128)
+        coordinates.real = real_axis[columns]
+        coordinates.imag = imaginary_axis[rows]
+        iteration_grid[rows, columns] = calculate_points_numpy(
+            coordinates,
+            state.quality,
+            cardioid_check=state.cardioid_check,
+            periodicity_check=state.periodicity_check,
+        )
+
+    # Rectangles are (top, left, bottom, right) with inclusive edges.
+    rectangles = [(0, 0, height - 1, width - 1)]
+    while rectangles:
+        small, large = [], []
+        for top, left, bottom, right in rectangles:
+            if min(bottom - top, right - left) < min_size:
+                small.append((top, left, bottom, right))
+            else:
+                large.append((top, left, bottom, right))
+
+        if small:
+            rows, columns = zip(
+                *(
+                    np.mgrid[top : bottom + 1, left : right + 1].reshape(2, -1)
+                    for top, left, bottom, right in small
+                )
+            )
+            calculate_pixels(np.concatenate(rows), np.concatenate(columns))
+        if not large:
+            break
+
+        borders = [_rectangle_border(rectangle) for rectangle in large]
+        calculate_pixels(
+            np.concatenate([rows for rows, _ in borders]),
+            np.concatenate([columns for _, columns in borders]),
+        )
+
+        rectangles = []
+        for (top, left, bottom, right), (rows, columns) in zip(large, borders):
+            border_values = iteration_grid[rows, columns]
+            value = border_values[0]
+            contains_origin = (
+                real_axis[left] <= 0 <= real_axis[right]
+                and imaginary_axis[top] <= 0 <= imaginary_axis[bottom]
+            )
+
+            if (border_values == value).all() and (
+                value == state.quality or not contains_origin
+            ):
+                iteration_grid[top + 1 : bottom, left + 1 : right] = value
+            else:
+                middle_row, middle_column = (top + bottom) // 2, (left + right) // 2
+                rectangles.extend(
+                    [
+                        (top, left, middle_row, middle_column),
+                        (top, middle_column, middle_row, right),
+                        (middle_row, left, bottom, middle_column),
+                        (middle_row, middle_column, bottom, right),
+                    ]
+                )
+
+    return iteration_grid, calculated_pixels / (height * width)
+
+
+def _rectangle_border(
+    rectangle: tuple[int, int, int, int],
+) -> tuple[NDArray[np.intp], NDArray[np.intp]]:
+    """Lists the pixels on the edge of a rectangle.
+
+    Args:
+        rectangle (tuple[int, int, int, int]): The (top, left, bottom, right)
+                                               rectangle, with inclusive edges.
+
+    Returns:
+        tuple[NDArray[np.intp], NDArray[np.intp]]: The row and column of every
+            border pixel, corners included once.
     """
-    real_axis = np.linspace(-2.0, 2.0, state.width, dtype=np.float64)
-    imaginary_axis = np.linspace(-2.0, 2.0, state.height, dtype=np.float64)
-    x_grid, y_grid = np.meshgrid(real_axis, imaginary_axis)
-    cpu_gridbase = x_grid + (y_grid * 1j)
+    top, left, bottom, right = rectangle
+    columns = np.arange(left, right + 1)
+    inner_rows = np.arange(top + 1, bottom)
 
-    gpu_gridbase: NDArray[cp.complex128] = cp.asarray(cpu_gridbase)  # type: ignore
-    gpu_iterations: NDArray[cp.int32] = cp.zeros(  # type: ignore
-        gpu_gridbase.shape, dtype=cp.int32  # type: ignore
+    rows = np.concatenate(
+        [
+            np.full(columns.size, top),
+            np.full(columns.size, bottom),
+            inner_rows,
+            inner_rows,
+        ]
+    )
+    columns = np.concatenate(
+        [
+            columns,
+            columns,
+            np.full(inner_rows.size, left),
+            np.full(inner_rows.size, right),
+        ]
     )
+    return rows, columns
+
+
+def calculate_fractal_subdivided(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of iteration counts with `render_subdivided`.
+
+    Wraps the subdivision renderer in the same interface as the other engines.
 
-    mandelbrot_kernel: RawKernel = cp.RawKernel(  # type: ignore
-        mandelbrot_kernel_code, "mandelbrot_kernel"
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    iteration_grid, _ = render_subdivided(
+        state, row_start, row_end, column_start, column_end
     )
+    return iteration_grid
+
+
+def calculate_fractal_gpu(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of Mandelbrot set iteration counts on the GPU.
+
+    Uses a custom CUDA kernel to perform the calculation in parallel for all
+    pixels, based on the provided application state. Can compute either the full
+    view or any rectangular region of it, and honors the escape-time
+    short-circuits enabled in the state. The kernel runs in the floating-point
+    type the state's precision picks for the region; single precision is far
+    faster on consumer GPUs and halves the upload. CuPy is imported on the
+    first call, so machines without a GPU never pay for it.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    import cupy as cp
+    from cupy import RawKernel  # type: ignore
+
+    computed_rows, row_sources = mirrored_rows(state, row_start, row_end)
+    dtype = float_dtype(state, row_start, row_end, column_start, column_end)
+    with profiling.span("gpu.grid"):
+        cpu_gridbase = pixel_grid_cpu(
+            state, row_start, row_end, column_start, column_end
+        )[computed_rows].astype(np.result_type(dtype, np.complex64))
+    region_height, region_width = cpu_gridbase.shape
+    profiling.count(f"{dtype.name}_pixels", cpu_gridbase.size)
+
+    with profiling.span("gpu.upload"):
+        gpu_gridbase: NDArray[cp.complex128] = cp.asarray(cpu_gridbase)  # type: ignore
+        gpu_iterations: NDArray[cp.int32] = cp.zeros(  # type: ignore
+            gpu_gridbase.shape, dtype=cp.int32  # type: ignore
+        )
+        if profiling.enabled():
+            cp.cuda.get_current_stream().synchronize()  # type: ignore
+
+    with profiling.span("gpu.compile"):
+        mandelbrot_kernel: RawKernel = cp.RawKernel(  # type: ignore
+            MANDELBROT_KERNEL_CODE, KERNEL_NAMES[dtype]
+        )
+        mandelbrot_kernel.compile()
 
     threads_per_block = (16, 16)
-    blocks_per_grid_x = (state.width + threads_per_block[0] - 1) // threads_per_block[0]
-    blocks_per_grid_y = (state.height + threads_per_block[1] - 1) // threads_per_block[
+    blocks_per_grid_x = (region_width + threads_per_block[0] - 1) // threads_per_block[
+        0
+    ]
+    blocks_per_grid_y = (region_height + threads_per_block[1] - 1) // threads_per_block[
         1
     ]
     blocks_per_grid = (blocks_per_grid_x, blocks_per_grid_y)
 
-    mandelbrot_kernel(
-        blocks_per_grid,
-        threads_per_block,
-        (gpu_gridbase, gpu_iterations, state.quality, state.width, state.height),
+    with profiling.span("gpu.kernel"):
+        mandelbrot_kernel(
+            blocks_per_grid,
+            threads_per_block,
+            (
+                gpu_gridbase,
+                gpu_iterations,
+                state.quality,
+                region_width,
+                region_height,
+                int(state.cardioid_check),
+                int(state.periodicity_check),
+            ),
+        )
+        if profiling.enabled():
+            cp.cuda.get_current_stream().synchronize()  # type: ignore
+
+    with profiling.span("gpu.download"):
+        iteration_grid = cp.asnumpy(gpu_iterations)  # type: ignore
+
+    profiling.count_iterations(iteration_grid)
+    profiling.count("bytes_transferred", cpu_gridbase.nbytes + iteration_grid.nbytes)
+    return iteration_grid[row_sources]
+
+
+def calculate_points_gpu(
+    coordinates: NDArray[np.complex128],
+    max_iterations: int,
+    cardioid_check: bool = False,
+    periodicity_check: bool = False,
+    dtype: np.dtype = np.dtype(np.float64),
+) -> NDArray[np.int32]:
+    """Calculates iteration counts for an array of complex numbers on the GPU.
+
+    GPU counterpart of `calculate_points_numpy`, for points that do not lie on
+    the pixel grid of a view, such as the subsamples of anti-aliasing. Runs the
+    kernel of `calculate_fractal_gpu` over the points as a single row.
+
+    Args:
+        coordinates (NDArray[np.complex128]): The points on the complex plane to
+                                              test, in any shape.
+        max_iterations (int): The limit of iterations to perform before stopping.
+        cardioid_check (bool): Skips points inside the main cardioid or the
+                               period-2 bulb.
+        periodicity_check (bool): Stops points whose orbit returns exactly to a
+                                  value saved at a power-of-two iteration.
+        dtype (np.dtype): The floating-point type to iterate in.
+
+    Returns:
+        NDArray[np.int32]: An array of the same shape as `coordinates` holding the
+                           final iteration count of each point.
+    """
+    import cupy as cp
+    from cupy import RawKernel  # type: ignore
+
+    dtype = np.dtype(dtype)
+    flat_coordinates = np.ascontiguousarray(
+        np.ravel(coordinates), dtype=np.result_type(dtype, np.complex64)
+    )
+    point_count = flat_coordinates.size
+    if point_count == 0:
+        return np.zeros(np.shape(coordinates), dtype=np.int32)
+
+    with profiling.span("gpu.upload"):
+        gpu_points: NDArray[cp.complex128] = cp.asarray(flat_coordinates)  # type: ignore
+        gpu_iterations: NDArray[cp.int32] = cp.zeros(  # type: ignore
+            point_count, dtype=cp.int32  # type: ignore
+        )
+
+    with profiling.span("gpu.compile"):
+        mandelbrot_kernel: RawKernel = cp.RawKernel(  # type: ignore
+            MANDELBROT_KERNEL_CODE, KERNEL_NAMES[dtype]
+        )
+        mandelbrot_kernel.compile()
+
+    blocks_per_grid = (
+        (point_count + POINTS_THREADS_PER_BLOCK - 1) // POINTS_THREADS_PER_BLOCK,
+        1,
     )
+    with profiling.span("gpu.kernel"):
+        mandelbrot_kernel(
+            blocks_per_grid,
+            (POINTS_THREADS_PER_BLOCK, 1),
+            (
+                gpu_points,
+                gpu_iterations,
+                max_iterations,
+                point_count,
+                1,
+                int(cardioid_check),
+                int(periodicity_check),
+            ),
+        )
+
+    with profiling.span("gpu.download"):
+        iterations = cp.asnumpy(gpu_iterations)  # type: ignore
+
+    profiling.count_iterations(iterations)
+    profiling.count("bytes_transferred", flat_coordinates.nbytes + iterations.nbytes)
+    return iterations.reshape(np.shape(coordinates))
+
+
+def exposed_regions(width: int, height: int, dx: int, dy: int) -> list[Tile]:
+    """Lists the regions of a view that a pan leaves without any data.
+
+    Args:
+        width (int): The width of the view in pixels.
+        height (int): The height of the view in pixels.
+        dx (int): The horizontal pan distance, in pixels.
+        dy (int): The vertical pan distance, in pixels.
+
+    Returns:
+        list[Tile]: Non-overlapping (column_start, row_start, column_end, row_end)
+                    regions that must be calculated after the pan. The whole view
+                    is returned when the pan moves past its edge.
+    """
+    if abs(dx) >= width or abs(dy) >= height:
+        return [(0, 0, width, height)]
+
+    regions = []
+    kept_column_start, kept_column_end = max(-dx, 0), width - max(dx, 0)
+
+    if dx > 0:
+        regions.append((kept_column_end, 0, width, height))
+    elif dx < 0:
+        regions.append((0, 0, kept_column_start, height))
+
+    if dy > 0:
+        regions.append((kept_column_start, height - dy, kept_column_end, height))
+    elif dy < 0:
+        regions.append((kept_column_start, 0, kept_column_end, -dy))
+
+    return regions
+
+
+def shift_iteration_grid(
+    iteration_grid: NDArray[np.int32], dx: int, dy: int
+) -> NDArray[np.int32]:
+    """Moves already calculated iteration counts to their place after a pan.
+
+    Args:
+        iteration_grid (NDArray[np.int32]): The iteration counts of the view
+                                            before the pan.
+        dx (int): The horizontal pan distance, in pixels.
+        dy (int): The vertical pan distance, in pixels.
+
+    Returns:
+        NDArray[np.int32]: A new grid where pixel (x, y) holds the old value of
+                           pixel (x + dx, y + dy). Pixels listed by
+                           `exposed_regions` are left at zero.
+    """
+    height, width = iteration_grid.shape
+    shifted_grid = np.zeros_like(iteration_grid)
+
+    if abs(dx) >= width or abs(dy) >= height:
+        return shifted_grid
+
+    shifted_grid[
+        max(-dy, 0) : height - max(dy, 0), max(-dx, 0) : width - max(dx, 0)
+    ] = iteration_grid[
+        max(dy, 0) : height - max(-dy, 0), max(dx, 0) : width - max(-dx, 0)
+    ]
+
+    return shifted_grid
+
+
+def pan_fractal(
+    iteration_grid: NDArray[np.int32],
+    state: AppState,
+    dx: int,
+    dy: int,
+    calculate_region: Callable[..., NDArray[np.int32]] = calculate_fractal_numpy,
+) -> NDArray[np.int32]:
+    """Pans the viewport and recalculates only the newly exposed pixels.
+
+    Shifted pixels keep the counts calculated for their previous coordinates,
+    which can differ from a fresh render of the panned view by the rounding of
+    the new viewport centre.
+
+    Args:
+        iteration_grid (NDArray[np.int32]): The iteration counts of the view
+                                            before the pan.
+        state (AppState): The application state, which is panned in place.
+        dx (int): The horizontal pan distance, in pixels.
+        dy (int): The vertical pan distance, in pixels.
+        calculate_region (Callable[..., NDArray[np.int32]]): The engine function
+            used for the exposed regions, called with the same arguments as
+            `calculate_fractal_numpy`. Defaults to the NumPy engine.
+
+    Returns:
+        NDArray[np.int32]: The iteration counts of the view after the pan.
+    """
+    state.pan(dx, dy)
+    panned_grid = shift_iteration_grid(iteration_grid, dx, dy)
+
+    for column_start, row_start, column_end, row_end in exposed_regions(
+        state.width, state.height, dx, dy
+    ):
+        panned_grid[row_start:row_end, column_start:column_end] = calculate_region(
+            state, row_start, row_end, column_start, column_end
+        )
 
-    return cp.asnumpy(gpu_iterations)  # type: ignore
+    return panned_grid
 
 
 def colorer_gpu(
@@ -1,10 +1,44 @@
 #!/usr/bin/env python3
+import argparse
+import numpy as np
 import pygame
+import time
+from numpy.typing import NDArray
+from typing import Optional
 from state import AppState
-from engine import calculate_fractal_gpu, colorer_gpu
+from antialias import antialias, points_calculator
+from engine import pan_fractal
+from backends import Backend, add_backend_argument, get_backend
+from colorizer import Colorizer, add_palette_argument
+from iteration_store import save_iterations
+from precision import add_precision_arguments, precision_from_arguments
+from profiling import OverlaySink, add_profiling_arguments, close_sinks
+from profiling import sinks_from_arguments
+from resumable import auto_quality
+from tile_cache import DEFAULT_CACHE_MEGABYTES, add_cache_arguments
+from tile_cache import cache_from_arguments
 
+PAN_STEP = 64
+ZOOM_FACTOR = 1.5
+PAN_KEYS = {
+    pygame.K_LEFT: (-PAN_STEP, 0),
+    pygame.K_RIGHT: (PAN_STEP, 0),
+    pygame.K_UP: (0, -PAN_STEP),
+    pygame.K_DOWN: (0, PAN_STEP),
+}
+QUALITY_KEYS = {pygame.K_PAGEUP: 2.0, pygame.K_PAGEDOWN: 0.5}
+AUTO_QUALITY_KEY = pygame.K_a
+ANTIALIAS_KEY = pygame.K_s
+SAVE_KEY = pygame.K_w
 
-def calculate_and_draw(state: AppState, window: pygame.Surface) -> None:
+
+def calculate_and_draw(
+    state: AppState,
+    window: pygame.Surface,
+    backend: Backend,
+    colorizer: Colorizer,
+    overlay: Optional[OverlaySink] = None,
+) -> NDArray[np.int32]:
     """Handles the full process of rendering the fractal with the GPU and
     updating the screen.
 
@@ -17,29 +51,137 @@ def calculate_and_draw(state: AppState, window: pygame.Surface) -> None:
                           and render quality.
         window (pygame.Surface): The main Pygame window where the final fractal
                                  will be drawn.
+        backend (Backend): The rendering backend that calculates the fractal.
+        colorizer (Colorizer): Colors the iteration counts into the window.
+        overlay (Optional[OverlaySink]): The profiling overlay to reset for the
+                                         new frame and draw over it.
+
+    Returns:
+        NDArray[np.int32]: The iteration counts that were drawn, kept so that a
+                           later pan can reuse them.
     """
-    iteration_grid = calculate_fractal_gpu(state)
-    finished_image = colorer_gpu(iteration_grid, state.quality)
-    window.blit(finished_image, (0, 0))
+    if overlay is not None:
+        overlay.reset()
+    iteration_grid = backend.calculate(state)
+    draw_iterations(iteration_grid, state, window, colorizer, overlay)
+    return iteration_grid
+
+
+def pan_and_draw(
+    state: AppState,
+    window: pygame.Surface,
+    iteration_grid: NDArray[np.int32],
+    dx: int,
+    dy: int,
+    backend: Backend,
+    colorizer: Colorizer,
+    overlay: Optional[OverlaySink] = None,
+) -> NDArray[np.int32]:
+    """Pans the view and draws it, calculating only the newly exposed strips.
+
+    Args:
+        state (AppState): The application's current settings, which are panned
+                          in place.
+        window (pygame.Surface): The main Pygame window where the final fractal
+                                 will be drawn.
+        iteration_grid (NDArray[np.int32]): The iteration counts of the view
+                                            before the pan.
+        dx (int): The horizontal pan distance, in pixels.
+        dy (int): The vertical pan distance, in pixels.
+        backend (Backend): The rendering backend that calculates the exposed
+                           strips.
+        colorizer (Colorizer): Colors the iteration counts into the window.
+        overlay (Optional[OverlaySink]): The profiling overlay to reset for the
+                                         new frame and draw over it.
+
+    Returns:
+        NDArray[np.int32]: The iteration counts of the view after the pan.
+    """
+    if overlay is not None:
+        overlay.reset()
+    iteration_grid = pan_fractal(
+        iteration_grid, state, dx, dy, calculate_region=backend.calculate
+    )
+    draw_iterations(iteration_grid, state, window, colorizer, overlay)
+    return iteration_grid
+
+
+def draw_iterations(
+    iteration_grid: NDArray[np.int32],
+    state: AppState,
+    window: pygame.Surface,
+    colorizer: Colorizer,
+    overlay: Optional[OverlaySink] = None,
+) -> None:
+    """Colors a grid of iteration counts straight into the window and shows it.
+
+    Args:
+        iteration_grid (NDArray[np.int32]): The iteration counts to draw.
+        state (AppState): The application's current settings.
+        window (pygame.Surface): The main Pygame window to draw on.
+        colorizer (Colorizer): Colors the iteration counts into the window.
+        overlay (Optional[OverlaySink]): The profiling overlay to draw on top.
+    """
+    colorizer.draw(iteration_grid, state.quality, window)
+    if overlay is not None:
+        overlay.draw(window)
     pygame.display.flip()
 
 
+def argument_parser() -> argparse.ArgumentParser:
+    """Builds the command-line parser of the GPU demo.
+
+    Returns:
+        argparse.ArgumentParser: The parser of every option of the program.
+    """
+    parser = argparse.ArgumentParser(description="Instant GPU fractal renderer.")
+    add_backend_argument(parser, default="cuda")
+    add_cache_arguments(parser, default=DEFAULT_CACHE_MEGABYTES)
+    add_palette_argument(parser)
+    add_precision_arguments(parser, default="float64")
+    add_profiling_arguments(parser, overlay=True)
+    return parser
+
+
 def main():
     """Initializes Pygame and runs the main event loop for the GPU visualizer.
 
-    Performs an initial, full-frame render using the GPU-accelerated helper
-    function. An efficient, event-driven loop then waits for user input to
-    handle window closing, resizing, and refresh events, re-rendering only
-    when necessary.
+    Performs an initial, full-frame render using the selected backend, which
+    is the GPU unless it is unavailable or another one is requested. An
+    efficient, event-driven loop then waits for user input to handle window
+    closing, resizing, refresh, pan, zoom and quality events, re-rendering only
+    when necessary. Panning with the arrow keys reuses the iteration counts
+    that are still on screen, and tiles of views seen before are served from
+    the tile cache. Pressing A raises the quality until the boundary stops
+    changing, which the resumable backend does for only the extra iterations.
+    Pressing S smooths the edges of the view by supersampling only the pixels
+    that differ from their neighbours, on the same engine as the backend.
+    Pressing W saves the iteration counts of the view, so it can be recolored
+    or exported later with `iteration_store.py` without rendering it again.
     """
+    parser = argument_parser()
+    arguments = parser.parse_args()
+    backend, precision_statistics = precision_from_arguments(
+        parser, arguments, get_backend(arguments.backend)
+    )
+    backend, cache = cache_from_arguments(arguments, backend)
+    colorizer = Colorizer(arguments.palette)
+    overlay = sinks_from_arguments(arguments)
+
     pygame.display.init()
-    app_state = AppState(width=640, height=480, quality=2500)
+    app_state = AppState(
+        width=640, height=480, quality=2500, precision=arguments.precision
+    )
     app_window = pygame.display.set_mode(
         (app_state.width, app_state.height), pygame.RESIZABLE
     )
-    pygame.display.set_caption("Fractal Visualizer: GPU Rendering in Parallel")
+    pygame.display.set_caption(
+        f"Fractal Visualizer: Rendering in Parallel ({backend.name})"
+    )
 
-    calculate_and_draw(app_state, app_window)
+    iteration_grid = calculate_and_draw(
+        app_state, app_window, backend, colorizer, overlay
+    )
 
     app_running = True
     while app_running:
@@ -54,14 +196,82 @@ def main():
                 (app_state.width, app_state.height), pygame.RESIZABLE
             )
 
-            calculate_and_draw(app_state, app_window)
+            iteration_grid = calculate_and_draw(
+                app_state, app_window, backend, colorizer, overlay
+            )
 
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
             app_window.fill((0, 0, 0))
             pygame.display.flip()
 
-            calculate_and_draw(app_state, app_window)
+            iteration_grid = calculate_and_draw(
+                app_state, app_window, backend, colorizer, overlay
+            )
+
+        elif event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+            dx, dy = PAN_KEYS[event.key]
+            iteration_grid = pan_and_draw(
+                app_state,
+                app_window,
+                iteration_grid,
+                dx,
+                dy,
+                backend,
+                colorizer,
+                overlay,
+            )
+
+        elif event.type == pygame.MOUSEWHEEL:
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            app_state.zoom_at(mouse_x, mouse_y, ZOOM_FACTOR**event.y)
+
+            iteration_grid = calculate_and_draw(
+                app_state, app_window, backend, colorizer, overlay
+            )
+
+        elif event.type == pygame.KEYDOWN and event.key in QUALITY_KEYS:
+            app_state.quality = max(
+                1, round(app_state.quality * QUALITY_KEYS[event.key])
+            )
+
+            iteration_grid = calculate_and_draw(
+                app_state, app_window, backend, colorizer, overlay
+            )
+
+        elif event.type == pygame.KEYDOWN and event.key == AUTO_QUALITY_KEY:
+            iteration_grid = auto_quality(
+                app_state,
+                backend.calculate,
+                on_step=lambda step_grid: draw_iterations(
+                    step_grid, app_state, app_window, colorizer, overlay
+                ),
+            )
+            print(f"Auto quality settled at {app_state.quality} iterations")
+
+        elif event.type == pygame.KEYDOWN and event.key == ANTIALIAS_KEY:
+            colors, antialias_statistics = antialias(
+                app_state,
+                iteration_grid,
+                points_calculator(backend),
+                palette=arguments.palette,
+            )
+            pygame.surfarray.blit_array(app_window, colors.transpose(1, 0, 2))
+            if overlay is not None:
+                overlay.draw(app_window)
+            pygame.display.flip()
+            print(f"Anti-aliasing: {antialias_statistics}")
+
+        elif event.type == pygame.KEYDOWN and event.key == SAVE_KEY:
+            path = time.strftime("view_%Y%m%d_%H%M%S.itr")
+            file_bytes = save_iterations(path, iteration_grid, app_state)
+            print(f"Iteration counts saved to {path} ({file_bytes:,} bytes)")
 
+    if precision_statistics is not None:
+        print(f"Precision: {precision_statistics}")
+    if cache is not None:
+        print(f"Tile cache: {cache.statistics}")
+        cache.clear()
+    close_sinks()
     pygame.quit()
 
 
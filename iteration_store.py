@@ -0,0 +1,563 @@
+import argparse
+import functools
+import json
+import mmap
+import numpy as np
+import os
+import pygame
+import struct
+import sys
+import zlib
+from numpy.typing import NDArray
+from typing import Iterator, Optional
+from state import AppState
+from engine import Tile
+from colorizer import add_palette_argument, palette_colors
+
+MAGIC = b"FRACITER"
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_COMPRESSION_LEVEL = 6
+DEFAULT_IMAGE_TILE_SIZE = 1024
+COMPRESSIONS = ["zlib", "none"]
+
+# The file starts with the magic bytes and the length of a JSON header, and
+# ends with the offset of the chunk index.
+PREFIX = struct.Struct("<8sQ")
+TRAILER = struct.Struct("<Q")
+
+
+def narrowest_dtype(max_iterations: int) -> np.dtype:
+    """Finds the smallest unsigned integer type that holds every count.
+
+    Args:
+        max_iterations (int): The iteration limit, the largest possible count.
+
+    Returns:
+        np.dtype: uint8, uint16 or uint32.
+
+    Raises:
+        ValueError: If the limit does not fit in 32 bits.
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_iterations <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+
+    raise ValueError(f"An iteration limit of {max_iterations} does not fit 32 bits.")
+
+
+class IterationWriter:
+    """Writes iteration counts to a chunked, compressed file, band by band.
+
+    The counts are stored in the narrowest type that fits the iteration limit
+    of `state` and cut into `chunk_size` squares. Each chunk is byte-shuffled,
+    so the mostly identical high bytes of neighbouring counts sit together,
+    and compressed on its own, which lets readers decompress only the chunks
+    of a region. Rows must be written in order from the top. At most one row
+    of chunks is buffered, so a view far larger than memory can be written.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        state: AppState,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        compression: str = "zlib",
+        level: int = DEFAULT_COMPRESSION_LEVEL,
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{compression}'. "
+                f"Choose from: {', '.join(COMPRESSIONS)}."
+            )
+        self.state = state
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.level = level
+        self.dtype = narrowest_dtype(state.quality)
+        self.rows_written = 0
+        self._pending_rows: list[NDArray] = []
+        self._pending_count = 0
+        self._index = np.zeros(
+            (-(-state.height // chunk_size), -(-state.width // chunk_size), 2),
+            dtype="<u8",
+        )
+
+        header = json.dumps(
+            {
+                "format": FORMAT_VERSION,
+                "state": state.to_dict(),
+                "dtype": self.dtype.str,
+                "shape": [state.height, state.width],
+                "chunk_size": chunk_size,
+                "compression": compression,
+            }
+        ).encode()
+        self._file = open(path, "wb")
+        self._file.write(PREFIX.pack(MAGIC, len(header)) + header)
+
+    def write_rows(self, rows: NDArray) -> None:
+        """Appends the next rows of the view.
+
+        Args:
+            rows (NDArray): A (rows, width) array of iteration counts.
+        """
+        self._pending_rows.append(np.asarray(rows).astype(self.dtype, copy=False))
+        self._pending_count += len(rows)
+        while self._pending_count >= self.chunk_size:
+            self._write_chunk_row(self.chunk_size)
+
+    def close(self) -> None:
+        """Writes the remaining rows and the chunk index, and closes the file.
+
+        Raises:
+            ValueError: If fewer rows than the height of the view were written.
+        """
+        if self._file.closed:
+            return
+
+        try:
+            if self._pending_count:
+                self._write_chunk_row(self._pending_count)
+            if self.rows_written != self.state.height:
+                raise ValueError(
+                    f"{self.rows_written} of {self.state.height} rows were written."
+                )
+            index_offset = self._file.tell()
+            self._file.write(self._index.tobytes() + TRAILER.pack(index_offset))
+        finally:
+            self._file.close()
+
+    def __enter__(self) -> "IterationWriter":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def _write_chunk_row(self, row_count: int) -> None:
+        """Compresses and writes the first `row_count` buffered rows."""
+        buffered = np.concatenate(self._pending_rows)
+        band, rest = buffered[:row_count], buffered[row_count:]
+        self._pending_rows = [rest] if len(rest) else []
+        self._pending_count = len(rest)
+
+        chunk_row = self.rows_written // self.chunk_size
+        for chunk_column, column_start in enumerate(
+            range(0, self.state.width, self.chunk_size)
+        ):
+            chunk = band[:, column_start : column_start + self.chunk_size]
+            shuffled = (
+                np.ascontiguousarray(chunk)
+                .view(np.uint8)
+                .reshape(-1, self.dtype.itemsize)
+                .T.tobytes()
+            )
+            if self.compression == "zlib":
+                shuffled = zlib.compress(shuffled, self.level)
+
+            self._index[chunk_row, chunk_column] = (self._file.tell(), len(shuffled))
+            self._file.write(shuffled)
+
+        self.rows_written += row_count
+
+
+def save_iterations(
+    path: str,
+    iteration_grid: NDArray,
+    state: AppState,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    compression: str = "zlib",
+) -> int:
+    """Saves the iteration counts of a view with its viewport and quality.
+
+    Args:
+        path (str): The file to write.
+        iteration_grid (NDArray): The (height, width) counts. A memory-mapped
+                                  array is read one row of chunks at a time.
+        state (AppState): The view the counts were calculated for.
+        chunk_size (int): The edge length of a chunk in pixels.
+        compression (str): One of `COMPRESSIONS`.
+
+    Returns:
+        int: The size of the file in bytes.
+    """
+    with IterationWriter(path, state, chunk_size, compression) as writer:
+        for row_start in range(0, state.height, chunk_size):
+            writer.write_rows(iteration_grid[row_start : row_start + chunk_size])
+
+    return os.path.getsize(path)
+
+
+class IterationFile:
+    """Reads any region of a file written by `IterationWriter`.
+
+    The file is memory-mapped and only the chunks that overlap a requested
+    region are decompressed, so reading a crop of a gigapixel render touches
+    a small part of the file. The most recent two rows of decompressed chunks
+    are cached, which makes reading a region band by band decompress every
+    chunk once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = PREFIX.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not an iteration file.")
+        header = json.loads(self._map[PREFIX.size : PREFIX.size + header_length])
+
+        self.state = AppState.from_dict(header["state"])
+        self.dtype = np.dtype(header["dtype"])
+        self.chunk_size: int = header["chunk_size"]
+        self.compression: str = header["compression"]
+        self.height, self.width = header["shape"]
+
+        chunk_rows = -(-self.height // self.chunk_size)
+        chunk_columns = -(-self.width // self.chunk_size)
+        (index_offset,) = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+        self._index = np.frombuffer(
+            self._map[index_offset : index_offset + chunk_rows * chunk_columns * 16],
+            dtype="<u8",
+        ).reshape(chunk_rows, chunk_columns, 2)
+        self._chunk = functools.lru_cache(maxsize=2 * chunk_columns)(self._read_chunk)
+
+    @property
+    def quality(self) -> int:
+        """The iteration limit the counts were calculated with."""
+        return self.state.quality
+
+    def read(
+        self,
+        row_start: int = 0,
+        row_end: Optional[int] = None,
+        column_start: int = 0,
+        column_end: Optional[int] = None,
+    ) -> NDArray:
+        """Reads the counts of a region, decompressing only the chunks it covers.
+
+        Args:
+            row_start (int): The first row (inclusive).
+            row_end (Optional[int]): The last row (exclusive). Defaults to the
+                                     height of the view.
+            column_start (int): The first column (inclusive).
+            column_end (Optional[int]): The last column (exclusive). Defaults to
+                                        the width of the view.
+
+        Returns:
+            NDArray: The counts, in the narrow type the file stores.
+        """
+        row_end = self.height if row_end is None else min(row_end, self.height)
+        column_end = self.width if column_end is None else min(column_end, self.width)
+        region = np.empty((row_end - row_start, column_end - column_start), self.dtype)
+
+        size = self.chunk_size
+        for chunk_row in range(row_start // size, -(-row_end // size)):
+            for chunk_column in range(column_start // size, -(-column_end // size)):
+                chunk = self._chunk(chunk_row, chunk_column)
+                top, left = chunk_row * size, chunk_column * size
+                rows = slice(max(row_start, top), min(row_end, top + size))
+                columns = slice(max(column_start, left), min(column_end, left + size))
+                region[
+                    rows.start - row_start : rows.stop - row_start,
+                    columns.start - column_start : columns.stop - column_start,
+                ] = chunk[
+                    rows.start - top : rows.stop - top,
+                    columns.start - left : columns.stop - left,
+                ]
+
+        return region
+
+    def bands(
+        self, region: Optional[Tile] = None, rows: Optional[int] = None
+    ) -> Iterator[tuple[int, NDArray]]:
+        """Reads a region band by band from the top.
+
+        Args:
+            region (Optional[Tile]): The (column_start, row_start, column_end,
+                                     row_end) region. Defaults to the whole
+                                     view.
+            rows (Optional[int]): The rows per band. Defaults to the chunk size.
+
+        Yields:
+            tuple[int, NDArray]: The first row of each band and its counts.
+        """
+        column_start, row_start, column_end, row_end = region or (
+            0,
+            0,
+            self.width,
+            self.height,
+        )
+        rows = rows or self.chunk_size
+        for band_start in range(row_start, row_end, rows):
+            band_end = min(band_start + rows, row_end)
+            yield band_start, self.read(band_start, band_end, column_start, column_end)
+
+    def close(self) -> None:
+        """Unmaps and closes the file."""
+        if hasattr(self, "_chunk"):
+            self._chunk.cache_clear()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "IterationFile":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def _read_chunk(self, chunk_row: int, chunk_column: int) -> NDArray:
+        """Decompresses one chunk and undoes the byte shuffle."""
+        offset, length = (int(value) for value in self._index[chunk_row, chunk_column])
+        data = self._map[offset : offset + length]
+        if self.compression == "zlib":
+            data = zlib.decompress(data)
+
+        rows = min(self.chunk_size, self.height - chunk_row * self.chunk_size)
+        columns = min(self.chunk_size, self.width - chunk_column * self.chunk_size)
+        return (
+            np.frombuffer(data, dtype=np.uint8)
+            .reshape(self.dtype.itemsize, -1)
+            .T.copy()
+            .view(self.dtype)
+            .reshape(rows, columns)
+        )
+
+
+def colorize_region(
+    iteration_file: IterationFile,
+    palette: str = "classic",
+    region: Optional[Tile] = None,
+    downscale: int = 1,
+) -> NDArray[np.uint8]:
+    """Colors a stored region without calculating any iterations.
+
+    Reads the region band by band. With a `downscale` above 1 every square of
+    `downscale` pixels is averaged into one, after coloring, so a gigapixel
+    render can be previewed through a small image; partial squares at the
+    right and bottom edges are left out.
+
+    Args:
+        iteration_file (IterationFile): The stored render.
+        palette (str): The color palette, one of `colorizer.PALETTES`.
+        region (Optional[Tile]): The (column_start, row_start, column_end,
+                                 row_end) region. Defaults to the whole view.
+        downscale (int): The number of pixels along each axis averaged into one.
+
+    Returns:
+        NDArray[np.uint8]: The (height, width, 3) RGB colors.
+    """
+    column_start, row_start, column_end, row_end = region or (
+        0,
+        0,
+        iteration_file.width,
+        iteration_file.height,
+    )
+    colors = palette_colors(iteration_file.quality, palette)
+    height = (row_end - row_start) // downscale
+    width = (column_end - column_start) // downscale
+    image = np.empty((height, width, 3), dtype=np.uint8)
+
+    band_rows = max(1, iteration_file.chunk_size // downscale) * downscale
+    whole_squares = (
+        column_start,
+        row_start,
+        column_start + width * downscale,
+        row_start + height * downscale,
+    )
+    for band_start, band in iteration_file.bands(whole_squares, band_rows):
+        band_colors = colors[band]
+        if downscale > 1:
+            band_colors = (
+                band_colors.reshape(-1, downscale, width, downscale, 3)
+                .mean(axis=(1, 3))
+                .round()
+                .astype(np.uint8)
+            )
+        output_row = (band_start - row_start) // downscale
+        image[output_row : output_row + len(band_colors)] = band_colors
+
+    return image
+
+
+def export_image(
+    iteration_file: IterationFile,
+    path: str,
+    palette: str = "classic",
+    region: Optional[Tile] = None,
+    downscale: int = 1,
+) -> tuple[int, int]:
+    """Recolors, crops or downscales a stored render into one image file.
+
+    Args:
+        iteration_file (IterationFile): The stored render.
+        path (str): The image to write, in any format Pygame can save.
+        palette (str): The color palette, one of `colorizer.PALETTES`.
+        region (Optional[Tile]): The region to export. Defaults to the whole
+                                 view.
+        downscale (int): The number of pixels along each axis averaged into one.
+
+    Returns:
+        tuple[int, int]: The width and height of the image.
+    """
+    image = colorize_region(iteration_file, palette, region, downscale)
+    pygame.image.save(pygame.surfarray.make_surface(image.transpose(1, 0, 2)), path)
+    return image.shape[1], image.shape[0]
+
+
+def export_tiles(
+    iteration_file: IterationFile,
+    output_directory: str,
+    palette: str = "classic",
+    tile_size: int = DEFAULT_IMAGE_TILE_SIZE,
+) -> list[str]:
+    """Recolors a stored render of any size into a grid of PNG tiles.
+
+    Args:
+        iteration_file (IterationFile): The stored render.
+        output_directory (str): The directory for the tiles, created if needed.
+                                Tiles are named `tile_<row>_<column>.png` like
+                                those of `streaming.write_image_tiles`.
+        palette (str): The color palette, one of `colorizer.PALETTES`.
+        tile_size (int): The edge length of a tile in pixels.
+
+    Returns:
+        list[str]: The paths of the tiles written, row by row.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+
+    paths = []
+    for tile_row, row_start in enumerate(range(0, iteration_file.height, tile_size)):
+        for tile_column, column_start in enumerate(
+            range(0, iteration_file.width, tile_size)
+        ):
+            path = os.path.join(
+                output_directory, f"tile_{tile_row:04d}_{tile_column:04d}.png"
+            )
+            region = (
+                column_start,
+                row_start,
+                min(column_start + tile_size, iteration_file.width),
+                min(row_start + tile_size, iteration_file.height),
+            )
+            export_image(iteration_file, path, palette, region)
+            paths.append(path)
+
+    return paths
+
+
+def info_command(arguments: argparse.Namespace) -> int:
+    """Prints the metadata and compression of a stored render.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "info" command.
+
+    Returns:
+        int: The exit status.
+    """
+    with IterationFile(arguments.input) as iteration_file:
+        state = iteration_file.state
+        file_bytes = os.path.getsize(arguments.input)
+        int32_bytes = iteration_file.width * iteration_file.height * 4
+        print(
+            f"{iteration_file.width}x{iteration_file.height} pixels at "
+            f"{state.quality} iterations, centre {state.center_real} "
+            f"{state.center_imag}, scale {state.scale}\n"
+            f"{iteration_file.dtype} counts in {iteration_file.chunk_size}-pixel "
+            f"{iteration_file.compression} chunks: {file_bytes:,} bytes, "
+            f"{file_bytes / int32_bytes:.1%} of raw int32"
+        )
+
+    return 0
+
+
+def export_command(arguments: argparse.Namespace) -> int:
+    """Writes an image or tiles from a stored render.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "export" command.
+
+    Returns:
+        int: The exit status.
+    """
+    with IterationFile(arguments.input) as iteration_file:
+        if arguments.tiles:
+            paths = export_tiles(
+                iteration_file, arguments.output, arguments.palette, arguments.tiles
+            )
+            print(f"{len(paths)} tiles written to {arguments.output}")
+        else:
+            width, height = export_image(
+                iteration_file,
+                arguments.output,
+                arguments.palette,
+                tuple(arguments.crop) if arguments.crop else None,
+                arguments.downscale,
+            )
+            print(f"{width}x{height} image written to {arguments.output}")
+
+    return 0
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses the command-line options of the iteration store.
+
+    Returns:
+        argparse.Namespace: The chosen command and its options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Inspects and recolors stored iteration counts."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info_parser = commands.add_parser("info", help="describe a stored render")
+    info_parser.set_defaults(handler=info_command)
+    info_parser.add_argument("input", help="iteration file")
+
+    export_parser = commands.add_parser(
+        "export", help="recolor, crop or downscale a stored render"
+    )
+    export_parser.set_defaults(handler=export_command)
+    export_parser.add_argument("input", help="iteration file")
+    export_parser.add_argument(
+        "--output", required=True, help="image file, or directory with --tiles"
+    )
+    export_parser.add_argument(
+        "--crop",
+        nargs=4,
+        type=int,
+        metavar=("LEFT", "TOP", "RIGHT", "BOTTOM"),
+        help="export only this region, in pixels",
+    )
+    export_parser.add_argument(
+        "--downscale",
+        type=int,
+        default=1,
+        help="average NxN pixels into one (default: 1)",
+    )
+    export_parser.add_argument(
+        "--tiles",
+        type=int,
+        metavar="SIZE",
+        help="write SIZExSIZE PNG tiles of the full view instead",
+    )
+    add_palette_argument(export_parser)
+
+    return parser.parse_args()
+
+
+def main():
+    """Runs the requested command of the iteration store.
+
+    "info" prints the viewport, quality and compression of a stored render.
+    "export" colors it with any palette into an image, optionally cropped or
+    downscaled, or into a grid of tiles, without calculating any iterations.
+    """
+    arguments = parse_arguments()
+    sys.exit(arguments.handler(arguments))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import numba
+import numpy as np
+import profiling
+import threading
+from numpy.typing import NDArray
+from typing import Optional
+from state import AppState
+from engine import imaginary_axis_cpu, mirrored_rows, real_axis_cpu
+
+_kernel_lock = threading.Lock()
+
+
+@numba.njit(parallel=True, cache=True, fastmath={"nnan", "ninf", "nsz"})
+def mandelbrot_kernel(
+    real_axis: NDArray[np.float64],
+    imaginary_axis: NDArray[np.float64],
+    row_order: NDArray[np.intp],
+    max_iterations: int,
+    cardioid_check: bool,
+    periodicity_check: bool,
+) -> NDArray[np.int32]:
+    """Calculates the iteration counts of a grid of pixels on every CPU core.
+
+    The per-pixel loop of the CUDA `mandelbrot_kernel`, compiled by Numba. Rows
+    are shared out between the cores and every pixel keeps its orbit in
+    scalar registers, so no temporary arrays are written. The arithmetic is
+    that of `engine.calculate_points_numpy`, step for step, so the counts are
+    identical.
+
+    Args:
+        real_axis (NDArray[np.float64]): The real coordinate of every column.
+        imaginary_axis (NDArray[np.float64]): The imaginary coordinate of every
+                                              row.
+        row_order (NDArray[np.intp]): The order in which rows are handed out.
+                                      Each core takes a contiguous run of it.
+        max_iterations (int): The limit of iterations to perform before stopping.
+        cardioid_check (bool): Skips points inside the main cardioid or the
+                               period-2 bulb.
+        periodicity_check (bool): Stops points whose orbit returns exactly to a
+                                  value saved at a power-of-two iteration.
+
+    Returns:
+        NDArray[np.int32]: The (rows, columns) iteration counts.
+    """
+    iterations = np.empty((imaginary_axis.size, real_axis.size), dtype=np.int32)
+
+    for index in numba.prange(row_order.size):
+        row = row_order[index]
+        c_imag = imaginary_axis[row]
+
+        for column in range(real_axis.size):
+            c_real = real_axis[column]
+            iterations[row, column] = max_iterations
+
+            if cardioid_check:
+                shifted_real = c_real - 0.25
+                imag_squared = c_imag * c_imag
+                q = shifted_real * shifted_real + imag_squared
+                bulb_real = c_real + 1.0
+                if (
+                    q * (q + shifted_real) < 0.25 * imag_squared
+                    or bulb_real * bulb_real + imag_squared < 0.0625
+                ):
+                    continue
+
+            z_real = 0.0
+            z_imag = 0.0
+            z_real_squared = 0.0
+            z_imag_squared = 0.0
+            saved_real = 0.0
+            saved_imag = 0.0
+            next_checkpoint = 1
+
+            for iteration in range(1, max_iterations + 1):
+                z_imag = z_real * z_imag * 2.0 + c_imag
+                z_real = z_real_squared - z_imag_squared + c_real
+                z_real_squared = z_real * z_real
+                z_imag_squared = z_imag * z_imag
+
+                if z_real_squared + z_imag_squared > 4.0:
+                    iterations[row, column] = iteration
+                    break
+
+                if periodicity_check:
+                    if z_real == saved_real and z_imag == saved_imag:
+                        break
+                    if iteration == next_checkpoint:
+                        saved_real = z_real
+                        saved_imag = z_imag
+                        next_checkpoint *= 2
+
+    return iterations
+
+
+def interleaved_rows(rows: int, threads: int) -> NDArray[np.intp]:
+    """Orders rows so that every thread's contiguous share is spread out.
+
+    Numba hands each thread a contiguous run of a parallel loop. Rows near the
+    set are far more expensive than the rest, so rows are dealt out like
+    cards: the first run holds rows 0, threads, 2 * threads and so on.
+
+    Args:
+        rows (int): The number of rows.
+        threads (int): The number of threads sharing them.
+
+    Returns:
+        NDArray[np.intp]: A permutation of the row indices.
+    """
+    return np.concatenate(
+        [np.arange(first, rows, threads, dtype=np.intp) for first in range(threads)]
+    )
+
+
+def calculate_fractal_jit(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of Mandelbrot set iteration counts with a compiled kernel.
+
+    CPU counterpart of `calculate_fractal_gpu` running the same per-pixel loop
+    on every core. The kernel is compiled on the first call and cached on disk
+    next to this module (or in `NUMBA_CACHE_DIR`), so later launches load it
+    instead of compiling. Calls from several threads take turns, since each
+    call already uses every core. Honors the escape-time short-circuits
+    enabled in the state.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    computed_rows, row_sources = mirrored_rows(state, row_start, row_end)
+    real_axis = real_axis_cpu(state, column_start, column_end)
+    imaginary_axis = imaginary_axis_cpu(state, row_start, row_end)[computed_rows]
+    row_order = interleaved_rows(imaginary_axis.size, numba.get_num_threads())
+
+    with _kernel_lock:
+        if not mandelbrot_kernel.signatures:
+            with profiling.span("jit.compile"):
+                mandelbrot_kernel(
+                    real_axis[:1], imaginary_axis[:1], row_order[:1], 1, False, False
+                )
+
+        with profiling.span("jit.kernel"):
+            iteration_grid = mandelbrot_kernel(
+                real_axis,
+                imaginary_axis,
+                row_order,
+                state.quality,
+                state.cardioid_check,
+                state.periodicity_check,
+            )
+
+    profiling.count_iterations(iteration_grid)
+    return iteration_grid[row_sources]
@@ -0,0 +1,480 @@
+import atexit
+import multiprocessing
+import multiprocessing.pool
+import numpy as np
+import os
+import profiling
+import queue
+import threading
+from multiprocessing import shared_memory
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from engine import Tile, calculate_fractal_numpy, calculate_points_numpy
+from engine import imaginary_axis_cpu, mirrored_rows, real_axis_cpu
+
+DEFAULT_TILE_SIZE = 64
+COST_PROBE_SAMPLES = 4
+COST_PROBE_MAX_ITERATIONS = 256
+TASKS_IN_FLIGHT_PER_WORKER = 2
+
+_attached_buffers: dict[str, tuple[shared_memory.SharedMemory, NDArray[np.int32]]] = {}
+_worker_pools: dict[int, multiprocessing.pool.Pool] = {}
+_worker_pools_lock = threading.Lock()
+
+
+def split_into_tiles(width: int, height: int, tile_size: int) -> list[Tile]:
+    """Splits a view into square tiles, clipping the last row and column.
+
+    Args:
+        width (int): The width of the view in pixels.
+        height (int): The height of the view in pixels.
+        tile_size (int): The edge length of a full tile in pixels.
+
+    Returns:
+        list[Tile]: A list of (column_start, row_start, column_end, row_end)
+                    tuples covering every pixel exactly once.
+    """
+    return split_region_into_tiles((0, 0, width, height), tile_size)
+
+
+def split_region_into_tiles(region: Tile, tile_size: int) -> list[Tile]:
+    """Splits a rectangular region of a view into square tiles.
+
+    Args:
+        region (Tile): The (column_start, row_start, column_end, row_end) region.
+        tile_size (int): The edge length of a full tile in pixels.
+
+    Returns:
+        list[Tile]: A list of tiles covering every pixel of the region exactly
+                    once, clipped at the region's right and bottom edges.
+    """
+    column_start, row_start, column_end, row_end = region
+    return [
+        (x, y, min(x + tile_size, column_end), min(y + tile_size, row_end))
+        for y in range(row_start, row_end, tile_size)
+        for x in range(column_start, column_end, tile_size)
+    ]
+
+
+def estimate_tile_costs(state: AppState, tiles: list[Tile]) -> list[int]:
+    """Estimates the relative cost of every tile with a coarse, capped probe.
+
+    Samples a small lattice of points in each tile with a reduced iteration
+    limit. Tiles on the set boundary or inside it run to the cap and therefore
+    report the highest cost.
+
+    Args:
+        state (AppState): The application state describing the view.
+        tiles (list[Tile]): The tiles to estimate.
+
+    Returns:
+        list[int]: The summed probe iteration count for each tile.
+    """
+    probe_iterations = min(state.quality, COST_PROBE_MAX_ITERATIONS)
+    real_axis = real_axis_cpu(state)
+    imaginary_axis = imaginary_axis_cpu(state)
+
+    probe_points = np.empty((len(tiles), COST_PROBE_SAMPLES**2), dtype=np.complex128)
+    for index, (column_start, row_start, column_end, row_end) in enumerate(tiles):
+        rows = np.linspace(row_start, row_end - 1, COST_PROBE_SAMPLES).astype(int)
+        columns = np.linspace(column_start, column_end - 1, COST_PROBE_SAMPLES)
+        columns = columns.astype(int)
+        probe_points[index].real = np.tile(real_axis[columns], COST_PROBE_SAMPLES)
+        probe_points[index].imag = np.repeat(imaginary_axis[rows], COST_PROBE_SAMPLES)
+
+    probe_results = calculate_points_numpy(probe_points, probe_iterations)
+    return probe_results.sum(axis=1).tolist()
+
+
+def row_runs(rows: NDArray[np.intp]) -> list[tuple[int, int]]:
+    """Groups sorted row indices into runs of consecutive rows.
+
+    Args:
+        rows (NDArray[np.intp]): Row indices in increasing order.
+
+    Returns:
+        list[tuple[int, int]]: (row_start, row_end) pairs, with row_end exclusive.
+    """
+    runs: list[tuple[int, int]] = []
+    for row in rows.tolist():
+        if runs and runs[-1][1] == row:
+            runs[-1] = (runs[-1][0], row + 1)
+        else:
+            runs.append((row, row + 1))
+
+    return runs
+
+
+def split_mirrored_region(
+    state: AppState, region: Tile
+) -> tuple[list[Tile], list[Tile], NDArray[np.intp], NDArray[np.intp]]:
+    """Separates the rows of a region that are calculated from mirrored ones.
+
+    Args:
+        state (AppState): The application state describing the view.
+        region (Tile): The (column_start, row_start, column_end, row_end) region.
+
+    Returns:
+        tuple[list[Tile], list[Tile], NDArray[np.intp], NDArray[np.intp]]: The
+            sub-regions to calculate, the sub-regions copied from their mirror
+            rows afterwards, and the row indices returned by
+            `engine.mirrored_rows` for the region.
+    """
+    column_start, row_start, column_end, row_end = region
+    computed_rows, row_sources = mirrored_rows(state, row_start, row_end)
+    copied_rows = np.setdiff1d(np.arange(row_end - row_start), computed_rows)
+
+    computed_regions = [
+        (column_start, row_start + start, column_end, row_start + end)
+        for start, end in row_runs(computed_rows)
+    ]
+    copied_regions = [
+        (column_start, row_start + start, column_end, row_start + end)
+        for start, end in row_runs(copied_rows)
+    ]
+
+    return computed_regions, copied_regions, computed_rows, row_sources
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """Selects how worker processes are started.
+
+    Workers are never forked straight from the application, which runs render
+    threads and has SDL's signal handlers installed; a forked copy of it could
+    deadlock or ignore the termination of an abandoned render. A fork server,
+    which starts from a clean interpreter, is used where the platform has one.
+
+    Returns:
+        multiprocessing.context.BaseContext: The context used to create pools.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+
+    return multiprocessing.get_context("spawn")
+
+
+def worker_pool(workers: Optional[int] = None) -> multiprocessing.pool.Pool:
+    """Returns the persistent pool of worker processes, starting it on first use.
+
+    Starting worker processes takes far longer than rendering a small tile, so
+    every render with the same number of workers shares one pool for the
+    lifetime of the application. The pools are terminated at exit.
+
+    Args:
+        workers (Optional[int]): The number of worker processes. Defaults to the
+                                 number of CPU cores.
+
+    Returns:
+        multiprocessing.pool.Pool: The pool with that many workers.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with _worker_pools_lock:
+        if workers not in _worker_pools:
+            _worker_pools[workers] = _pool_context().Pool(processes=workers)
+
+        return _worker_pools[workers]
+
+
+@atexit.register
+def close_worker_pools() -> None:
+    """Terminates every persistent worker pool."""
+    with _worker_pools_lock:
+        for pool in _worker_pools.values():
+            pool.terminate()
+        _worker_pools.clear()
+
+
+def _attach_buffer(buffer_name: str, shape: tuple[int, int]) -> NDArray[np.int32]:
+    """Attaches a worker process to the shared iteration buffer of a render.
+
+    The most recent attachment is kept open so that consecutive tiles of the
+    same render do not reopen the shared memory block.
+
+    Args:
+        buffer_name (str): The name of the shared memory block.
+        shape (tuple[int, int]): The (height, width) shape of the buffer.
+
+    Returns:
+        NDArray[np.int32]: An array view backed by the shared memory block.
+    """
+    if buffer_name not in _attached_buffers:
+        for previous_buffer, _ in _attached_buffers.values():
+            previous_buffer.close()
+        _attached_buffers.clear()
+
+        shared_buffer = shared_memory.SharedMemory(name=buffer_name)
+        array = np.ndarray(shape, dtype=np.int32, buffer=shared_buffer.buf)
+        _attached_buffers[buffer_name] = (shared_buffer, array)
+
+    return _attached_buffers[buffer_name][1]
+
+
+def _render_tile(
+    buffer_name: str,
+    shape: tuple[int, int],
+    origin: tuple[int, int],
+    state: AppState,
+    tile: Tile,
+) -> Tile:
+    """Calculates one tile in a worker process and stores it in shared memory.
+
+    Only the tile coordinates travel back to the parent process; the iteration
+    counts are written straight into the shared buffer.
+
+    Args:
+        buffer_name (str): The name of the shared memory block.
+        shape (tuple[int, int]): The (height, width) shape of the buffer.
+        origin (tuple[int, int]): The (column, row) pixel of the view at the
+                                  buffer's top-left corner.
+        state (AppState): The application state describing the view.
+        tile (Tile): The (column_start, row_start, column_end, row_end) region.
+
+    Returns:
+        Tile: The tile that was completed.
+    """
+    column_start, row_start, column_end, row_end = tile
+    origin_column, origin_row = origin
+    iteration_buffer = _attach_buffer(buffer_name, shape)
+    iteration_buffer[
+        row_start - origin_row : row_end - origin_row,
+        column_start - origin_column : column_end - origin_column,
+    ] = calculate_fractal_numpy(state, row_start, row_end, column_start, column_end)
+    return tile
+
+
+def region_bounds(regions: list[Tile]) -> Tile:
+    """Finds the smallest rectangle containing every region.
+
+    Args:
+        regions (list[Tile]): The regions, which must not be empty.
+
+    Returns:
+        Tile: The (column_start, row_start, column_end, row_end) bounding box.
+    """
+    return (
+        min(region[0] for region in regions),
+        min(region[1] for region in regions),
+        max(region[2] for region in regions),
+        max(region[3] for region in regions),
+    )
+
+
+def render_tiled_bounds(
+    state: AppState,
+    regions: list[Tile],
+    workers: Optional[int] = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    on_tile: Optional[Callable[[Tile, NDArray[np.int32]], None]] = None,
+    stop_event: Optional[threading.Event] = None,
+) -> NDArray[np.int32]:
+    """Generates the iteration counts of some regions with worker processes.
+
+    Does the work of `render_tiled`, but the shared buffer and the returned
+    grid only cover the bounding box of the regions, so rendering one band of
+    a very large view needs memory for that band alone.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        regions (list[Tile]): The regions of the view to render.
+        workers (Optional[int]): The number of worker processes. Defaults to the
+                                 number of CPU cores.
+        tile_size (int): The edge length of a tile in pixels.
+        on_tile (Optional[Callable[[Tile, NDArray[np.int32]], None]]): Called in
+            the calling thread with each completed tile and its iteration counts,
+            as for `render_tiled`.
+        stop_event (Optional[threading.Event]): A signal to abandon the render.
+
+    Returns:
+        NDArray[np.int32]: The iteration counts of the bounding box given by
+                           `region_bounds(regions)`. Pixels outside `regions`
+                           and tiles skipped because of a stop request are
+                           left at zero.
+    """
+    origin_column, origin_row, bounds_column_end, bounds_row_end = region_bounds(
+        regions
+    )
+    shape = (bounds_row_end - origin_row, bounds_column_end - origin_column)
+
+    def local_view(buffer: NDArray[np.int32], tile: Tile) -> NDArray[np.int32]:
+        """Selects a region of the view, in view coordinates, from the buffer."""
+        column_start, row_start, column_end, row_end = tile
+        return buffer[
+            row_start - origin_row : row_end - origin_row,
+            column_start - origin_column : column_end - origin_column,
+        ]
+
+    split_regions = [split_mirrored_region(state, region) for region in regions]
+    tiles = [
+        tile
+        for computed_regions, _, _, _ in split_regions
+        for computed_region in computed_regions
+        for tile in split_region_into_tiles(computed_region, tile_size)
+    ]
+    if not tiles:
+        return np.zeros(shape, dtype=np.int32)
+    tile_costs = estimate_tile_costs(state, tiles)
+    ordered_tiles = [
+        tile for _, tile in sorted(zip(tile_costs, tiles), key=lambda pair: -pair[0])
+    ]
+
+    shared_buffer = shared_memory.SharedMemory(
+        create=True, size=max(shape[0] * shape[1], 1) * 4
+    )
+    try:
+        iteration_buffer = np.ndarray(shape, dtype=np.int32, buffer=shared_buffer.buf)
+        iteration_buffer.fill(0)
+        origin = (origin_column, origin_row)
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        pool = worker_pool(workers)
+        completed_tiles: queue.SimpleQueue = queue.SimpleQueue()
+        pending_tiles = iter(ordered_tiles)
+
+        def submit_next_tile() -> int:
+            """Hands the next pending tile to the pool, if any are left."""
+            tile = next(pending_tiles, None)
+            if tile is None:
+                return 0
+            pool.apply_async(
+                _render_tile,
+                (shared_buffer.name, shape, origin, state, tile),
+                callback=completed_tiles.put,
+                error_callback=completed_tiles.put,
+            )
+            return 1
+
+        tiles_in_flight = sum(
+            submit_next_tile() for _ in range(TASKS_IN_FLIGHT_PER_WORKER * workers)
+        )
+        error: Optional[BaseException] = None
+        while tiles_in_flight:
+            tile = completed_tiles.get()
+            tiles_in_flight -= 1
+            if isinstance(tile, BaseException):
+                error = tile
+            if error is not None or (stop_event is not None and stop_event.is_set()):
+                continue
+
+            iteration_tile = local_view(iteration_buffer, tile)
+            profiling.count_iterations(iteration_tile)
+            if on_tile is not None:
+                on_tile(tile, iteration_tile)
+            tiles_in_flight += submit_next_tile()
+
+        if error is not None:
+            raise error
+        if stop_event is not None and stop_event.is_set():
+            return iteration_buffer.copy()
+
+        for region, (_, copied_regions, computed_rows, row_sources) in zip(
+            regions, split_regions
+        ):
+            if not copied_regions:
+                continue
+
+            region_view = local_view(iteration_buffer, region)
+            region_view[:] = region_view[computed_rows][row_sources]
+
+            for copied_region in copied_regions:
+                if on_tile is not None:
+                    on_tile(copied_region, local_view(iteration_buffer, copied_region))
+
+        return iteration_buffer.copy()
+    finally:
+        shared_buffer.close()
+        shared_buffer.unlink()
+
+
+def render_tiled(
+    state: AppState,
+    workers: Optional[int] = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    on_tile: Optional[Callable[[Tile, NDArray[np.int32]], None]] = None,
+    stop_event: Optional[threading.Event] = None,
+    regions: Optional[list[Tile]] = None,
+) -> NDArray[np.int32]:
+    """Generates the grid of iteration counts with a pool of worker processes.
+
+    The view is split into tiles that are handed out a few at a time to the
+    persistent `worker_pool`, so an idle worker always picks up the next
+    pending tile. Tiles are ordered by their estimated cost, which sends the
+    expensive tiles near the set boundary out first and leaves the cheap ones
+    to fill in at the end. Workers write into a shared memory buffer, so no
+    iteration data is pickled. With mirror symmetry enabled, rows mirrored
+    across the real axis within a region are copied once all tiles are done
+    instead of being handed out.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        workers (Optional[int]): The number of worker processes. Defaults to the
+                                 number of CPU cores.
+        tile_size (int): The edge length of a tile in pixels.
+        on_tile (Optional[Callable[[Tile, NDArray[np.int32]], None]]): Called in
+            the calling thread with each completed tile and its iteration counts.
+            The counts are a view into the shared buffer and are only valid for
+            the duration of the call.
+        stop_event (Optional[threading.Event]): A signal to abandon the render.
+            Pending tiles are dropped; the few already handed out finish.
+        regions (Optional[list[Tile]]): Restricts the render to these regions of
+            the view, such as the strips exposed by a pan. Defaults to the whole
+            view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel. Pixels outside `regions` and tiles
+                           skipped because of a stop request are left at zero.
+    """
+    iteration_grid = np.zeros((state.height, state.width), dtype=np.int32)
+    if regions is None:
+        regions = [(0, 0, state.width, state.height)]
+    if not regions:
+        return iteration_grid
+
+    column_start, row_start, column_end, row_end = region_bounds(regions)
+    iteration_grid[row_start:row_end, column_start:column_end] = render_tiled_bounds(
+        state, regions, workers, tile_size, on_tile, stop_event
+    )
+    return iteration_grid
+
+
+def calculate_fractal_tiled(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of iteration counts for a region with worker processes.
+
+    Wraps `render_tiled_bounds` in the same interface as the single-process
+    engines so it can be used wherever they are, for example by `pan_fractal`.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    if row_end is None:
+        row_end = state.height
+    if column_end is None:
+        column_end = state.width
+
+    return render_tiled_bounds(state, [(column_start, row_start, column_end, row_end)])
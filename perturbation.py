@@ -0,0 +1,430 @@
+import numpy as np
+import profiling
+import threading
+from decimal import Decimal, localcontext
+from numpy.typing import NDArray
+from typing import Optional
+from state import AppState, center_digits
+
+SERIES_TOLERANCE = 1e-12
+
+_reference_cache: dict[tuple, tuple[NDArray[np.complex128], int, tuple]] = {}
+_reference_cache_lock = threading.Lock()
+
+
+def reference_orbit(
+    center_real: Decimal, center_imag: Decimal, max_iterations: int, digits: int
+) -> NDArray[np.complex128]:
+    """Iterates the centre of the view in arbitrary precision.
+
+    Args:
+        center_real (Decimal): The real coordinate of the reference point.
+        center_imag (Decimal): The imaginary coordinate of the reference point.
+        max_iterations (int): The limit of iterations to perform.
+        digits (int): The number of significant digits to iterate with.
+
+    Returns:
+        NDArray[np.complex128]: The orbit Z_0 = 0, Z_1, ... rounded to double
+                                precision, ending at max_iterations or at the
+                                first value that escapes.
+    """
+    orbit = [0j]
+    with localcontext() as context:
+        context.prec = digits
+        z_real = z_imag = Decimal(0)
+        escape_radius_squared = Decimal(4)
+
+        for _ in range(max_iterations):
+            z_real, z_imag = (
+                z_real * z_real - z_imag * z_imag + center_real,
+                2 * z_real * z_imag + center_imag,
+            )
+            orbit.append(complex(float(z_real), float(z_imag)))
+            if z_real * z_real + z_imag * z_imag > escape_radius_squared:
+                break
+
+    return np.array(orbit, dtype=np.complex128)
+
+
+def series_approximation(
+    orbit: NDArray[np.complex128], radius: float
+) -> tuple[int, tuple[complex, complex, complex]]:
+    """Finds how many iterations a truncated series can skip for a view.
+
+    The offset of a pixel's orbit from the reference is approximated as
+    A_n dc + B_n dc^2 + C_n dc^3, where dc is the pixel's offset from the
+    reference point. The iterations are skipped while the cubic term stays
+    negligible next to the linear one for every pixel within `radius`.
+
+    Args:
+        orbit (NDArray[np.complex128]): The reference orbit.
+        radius (float): The largest distance of a pixel from the reference.
+
+    Returns:
+        tuple[int, tuple[complex, complex, complex]]: The number of iterations
+            to skip and the coefficients A, B and C at that iteration.
+    """
+    a = b = c = 0j
+    skip, coefficients = 0, (a, b, c)
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        for n in range(orbit.size - 2):
+            twice_z = 2 * orbit[n]
+            a, b, c = twice_z * a + 1, twice_z * b + a * a, twice_z * c + 2 * a * b
+
+            if not (np.isfinite(a) and np.isfinite(b) and np.isfinite(c)):
+                break
+            if abs(c) * radius * radius >= SERIES_TOLERANCE * abs(a):
+                break
+            skip, coefficients = n + 1, (a, b, c)
+
+    return skip, coefficients
+
+
+def calculate_points_perturbation(
+    offsets: NDArray[np.complex128],
+    orbit: NDArray[np.complex128],
+    max_iterations: int,
+    skip: int = 0,
+    coefficients: tuple[complex, complex, complex] = (0j, 0j, 0j),
+) -> NDArray[np.int32]:
+    """Calculates iteration counts as double-precision offsets from a reference.
+
+    Each point c = C + dc is iterated as its offset dz from the reference orbit
+    Z, with dz' = 2 Z dz + dz^2 + dc, which stays accurate in double precision
+    however deep the view is. Whenever a point's orbit comes closer to zero
+    than its offset, or the reference orbit ends, the point is rebased onto
+    the start of the reference orbit; this removes the glitches where the
+    offset would otherwise lose its precision. Points are compacted out of the
+    working set as they escape, as in `engine.calculate_points_numpy`.
+
+    Args:
+        offsets (NDArray[np.complex128]): The offsets dc of the points from the
+                                          reference point, in any shape.
+        orbit (NDArray[np.complex128]): The reference orbit from
+                                        `reference_orbit`.
+        max_iterations (int): The limit of iterations to perform before stopping.
+        skip (int): The number of iterations to take from the series
+                    approximation instead of iterating.
+        coefficients (tuple[complex, complex, complex]): The series coefficients
+                                                         at iteration `skip`.
+
+    Returns:
+        NDArray[np.int32]: An array of the same shape as `offsets` holding the
+                           final iteration count of each point.
+    """
+    flat_offsets = np.ravel(offsets).astype(np.complex128)
+    iterations = np.full(flat_offsets.shape, max_iterations, dtype=np.int32)
+    last_reference = orbit.size - 1
+
+    active_indices = np.arange(flat_offsets.size)
+    dc = flat_offsets
+    dz = np.zeros_like(dc)
+    reference_index = np.zeros(dc.shape, dtype=np.intp)
+
+    if skip > 0:
+        a, b, c = coefficients
+        dz = dc * (a + dc * (b + dc * c))
+        z = orbit[skip] + dz
+        escaped_early = (z.real * z.real + z.imag * z.imag) > 4.0
+
+        if escaped_early.any():
+            iterations[active_indices[escaped_early]] = calculate_points_perturbation(
+                dc[escaped_early], orbit, max_iterations
+            )
+            kept = ~escaped_early
+            active_indices, dc, dz = active_indices[kept], dc[kept], dz[kept]
+            reference_index = reference_index[kept]
+        reference_index[:] = skip
+
+    reference = orbit[reference_index]
+    for iteration in range(skip + 1, max_iterations + 1):
+        if active_indices.size == 0:
+            break
+
+        dz *= 2 * reference + dz
+        dz += dc
+        reference_index += 1
+        reference = orbit[reference_index]
+        z = reference + dz
+        magnitude_squared = z.real * z.real + z.imag * z.imag
+
+        escaped = magnitude_squared > 4.0
+        if escaped.any():
+            iterations[active_indices[escaped]] = iteration
+            still_active = ~escaped
+            active_indices = active_indices[still_active]
+            dc = dc[still_active]
+            dz = dz[still_active]
+            z = z[still_active]
+            reference = reference[still_active]
+            reference_index = reference_index[still_active]
+            magnitude_squared = magnitude_squared[still_active]
+
+        rebase = (reference_index == last_reference) | (
+            magnitude_squared < dz.real * dz.real + dz.imag * dz.imag
+        )
+        if rebase.any():
+            dz[rebase] = z[rebase]
+            reference[rebase] = 0
+            reference_index[rebase] = 0
+
+    return iterations.reshape(np.shape(offsets))
+
+
+def pixel_offsets(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.complex128]:
+    """Maps a region of pixels to their offsets from the centre of the view.
+
+    Args:
+        state (AppState): The application state containing view parameters like
+                          width, height and scale.
+        row_start (int): The first pixel row (inclusive).
+        row_end (Optional[int]): The last pixel row (exclusive). Defaults to the
+                                 full height of the view.
+        column_start (int): The first pixel column (inclusive).
+        column_end (Optional[int]): The last pixel column (exclusive). Defaults
+                                    to the full width of the view.
+
+    Returns:
+        NDArray[np.complex128]: The offset of every pixel from the centre, the
+                                same distances that `engine.pixel_grid_cpu`
+                                adds to the centre.
+    """
+    if row_end is None:
+        row_end = state.height
+    if column_end is None:
+        column_end = state.width
+
+    columns = np.arange(column_start, column_end) - (state.width / 2)
+    rows = np.arange(row_start, row_end) - (state.height / 2)
+
+    offsets = np.empty((rows.size, columns.size), dtype=np.complex128)
+    offsets.real = (columns / state.width * state.scale)[np.newaxis, :]
+    offsets.imag = (rows / state.height * state.scale)[:, np.newaxis]
+
+    return offsets
+
+
+def prepare_reference(
+    state: AppState,
+) -> tuple[NDArray[np.complex128], int, tuple[complex, complex, complex]]:
+    """Calculates, or reuses, the reference orbit and series of a view.
+
+    The most recent view is remembered, so rendering it band by band or tile
+    by tile iterates the reference only once, even from several threads.
+
+    Args:
+        state (AppState): The application state describing the view.
+
+    Returns:
+        tuple[NDArray[np.complex128], int, tuple[complex, complex, complex]]:
+            The reference orbit, the number of iterations the series skips,
+            and its coefficients.
+    """
+    key = (
+        state.center_real,
+        state.center_imag,
+        state.scale,
+        state.width,
+        state.height,
+        state.quality,
+    )
+    with _reference_cache_lock:
+        reference = _reference_cache.get(key)
+        if reference is None:
+            with profiling.span("perturbation.reference"):
+                orbit = reference_orbit(
+                    state.center_real,
+                    state.center_imag,
+                    state.quality,
+                    center_digits(state.scale),
+                )
+            radius = abs(complex(state.scale, state.scale)) / 2
+            with profiling.span("perturbation.series"):
+                series = series_approximation(orbit, radius)
+            reference = (orbit, *series)
+            _reference_cache.clear()
+            _reference_cache[key] = reference
+
+    return reference
+
+
+def calculate_fractal_perturbation(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of iteration counts for deep zooms on the CPU.
+
+    Iterates only the centre of the view in arbitrary precision and every
+    pixel as a double-precision offset from it, so views far smaller than the
+    1e-13 limit of `engine.calculate_fractal_numpy` render at close to its
+    speed. Offsets are stored as doubles, which limits the scale to about
+    1e-300. The escape-time short-circuits are not applied.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    orbit, skip, coefficients = prepare_reference(state)
+    offsets = pixel_offsets(state, row_start, row_end, column_start, column_end)
+    with profiling.span("perturbation.iterate"):
+        iteration_grid = calculate_points_perturbation(
+            offsets, orbit, state.quality, skip, coefficients
+        )
+
+    profiling.count_iterations(iteration_grid)
+    return iteration_grid
+
+
+def calculate_fractal_perturbation_gpu(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of iteration counts for deep zooms on the GPU.
+
+    CUDA counterpart of `calculate_fractal_perturbation`. The reference orbit
+    and series are prepared on the CPU and every pixel iterates its offset,
+    with the same rebasing, in its own GPU thread. CuPy is imported on the
+    first call.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    import cupy as cp
+    from cupy import RawKernel  # type: ignore
+
+    perturbation_kernel_code = r"""
+    #include <cupy/complex.cuh>
+
+    extern "C" __global__
+    void perturbation_kernel(const complex<double>* offsets, int* output_iterations,
+                             const complex<double>* orbit, int orbit_length,
+                             const complex<double>* coefficients, int skip,
+                             int max_iterations, int width, int height) {
+
+        int x = blockDim.x * blockIdx.x + threadIdx.x;
+        int y = blockDim.y * blockIdx.y + threadIdx.y;
+
+        if (x >= width || y >= height) {
+            return;
+        }
+
+        int index = y * width + x;
+
+        complex<double> dc = offsets[index];
+        complex<double> dz = 0;
+        int n = 0;
+        int m = 0;
+
+        if (skip > 0) {
+            dz = dc * (coefficients[0] + dc * (coefficients[1] + dc * coefficients[2]));
+            if (norm(orbit[skip] + dz) <= 4.0) {
+                n = skip;
+                m = skip;
+            } else {
+                dz = 0;
+            }
+        }
+
+        while (n < max_iterations) {
+            dz = 2.0 * orbit[m] * dz + dz * dz + dc;
+            m++;
+            n++;
+
+            complex<double> z = orbit[m] + dz;
+            if (norm(z) > 4.0) {
+                break;
+            }
+            if (m == orbit_length - 1 || norm(z) < norm(dz)) {
+                dz = z;
+                m = 0;
+            }
+        }
+        output_iterations[index] = n;
+    }
+    """
+    orbit, skip, coefficients = prepare_reference(state)
+    cpu_offsets = pixel_offsets(state, row_start, row_end, column_start, column_end)
+    region_height, region_width = cpu_offsets.shape
+
+    gpu_offsets: NDArray[cp.complex128] = cp.asarray(cpu_offsets)  # type: ignore
+    gpu_orbit: NDArray[cp.complex128] = cp.asarray(orbit)  # type: ignore
+    gpu_coefficients: NDArray[cp.complex128] = cp.asarray(  # type: ignore
+        np.array(coefficients, dtype=np.complex128)
+    )
+    gpu_iterations: NDArray[cp.int32] = cp.zeros(  # type: ignore
+        gpu_offsets.shape, dtype=cp.int32  # type: ignore
+    )
+
+    perturbation_kernel: RawKernel = cp.RawKernel(  # type: ignore
+        perturbation_kernel_code, "perturbation_kernel"
+    )
+
+    threads_per_block = (16, 16)
+    blocks_per_grid = (
+        (region_width + threads_per_block[0] - 1) // threads_per_block[0],
+        (region_height + threads_per_block[1] - 1) // threads_per_block[1],
+    )
+
+    with profiling.span("gpu.kernel"):
+        perturbation_kernel(
+            blocks_per_grid,
+            threads_per_block,
+            (
+                gpu_offsets,
+                gpu_iterations,
+                gpu_orbit,
+                orbit.size,
+                gpu_coefficients,
+                skip,
+                state.quality,
+                region_width,
+                region_height,
+            ),
+        )
+        if profiling.enabled():
+            cp.cuda.get_current_stream().synchronize()  # type: ignore
+
+    with profiling.span("gpu.download"):
+        iteration_grid = cp.asnumpy(gpu_iterations)  # type: ignore
+
+    profiling.count_iterations(iteration_grid)
+    profiling.count(
+        "bytes_transferred", cpu_offsets.nbytes + orbit.nbytes + iteration_grid.nbytes
+    )
+    return iteration_grid
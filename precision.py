@@ -0,0 +1,189 @@
+import argparse
+import numpy as np
+import warnings
+from numpy.typing import NDArray
+from typing import Optional
+from state import PRECISIONS, AppState
+from engine import float_dtype
+from backends import Backend
+
+REFERENCE_PRECISION = "float64"
+PRECISION_BACKENDS = ["numpy", "multiprocess", "cuda"]
+
+
+class PrecisionStatistics:
+    """Counts the pixels where a reduced-precision render differs from float64."""
+
+    def __init__(self):
+        self.pixels = 0
+        self.reduced_pixels = 0
+        self.mismatched_pixels = 0
+        self.largest_difference = 0
+
+    @property
+    def mismatch_fraction(self) -> float:
+        """The fraction of reduced-precision pixels whose count differed."""
+        return (
+            self.mismatched_pixels / self.reduced_pixels if self.reduced_pixels else 0.0
+        )
+
+    def add(
+        self,
+        iteration_grid: NDArray[np.int32],
+        reference_grid: Optional[NDArray[np.int32]],
+    ) -> None:
+        """Compares a region rendered at the view's precision with float64.
+
+        Args:
+            iteration_grid (NDArray[np.int32]): The counts as rendered.
+            reference_grid (Optional[NDArray[np.int32]]): The float64 counts of
+                the same region, or None if the region was rendered in float64.
+        """
+        self.pixels += iteration_grid.size
+        if reference_grid is None:
+            return
+
+        difference = np.abs(iteration_grid.astype(np.int64) - reference_grid)
+        self.reduced_pixels += iteration_grid.size
+        self.mismatched_pixels += int(np.count_nonzero(difference))
+        self.largest_difference = max(self.largest_difference, int(difference.max()))
+
+    def __str__(self) -> str:
+        return (
+            f"{self.reduced_pixels:,} of {self.pixels:,} pixels in reduced "
+            f"precision, {self.mismatched_pixels:,} "
+            f"({self.mismatch_fraction:.3%}) differ from float64 by up to "
+            f"{self.largest_difference:,} iterations"
+        )
+
+
+def reference_state(state: AppState) -> AppState:
+    """Copies a view with its precision pinned to float64.
+
+    Args:
+        state (AppState): The view to copy.
+
+    Returns:
+        AppState: A new state with the same view and settings, in float64.
+    """
+    reference = state.with_size(state.width, state.height)
+    reference.precision = REFERENCE_PRECISION
+    return reference
+
+
+def validating_backend(backend: Backend, statistics: PrecisionStatistics) -> Backend:
+    """Checks every region a backend renders against a float64 render.
+
+    Regions the precision policy renders in float64 anyway are only counted.
+    The others are rendered a second time in float64, which makes validation
+    a diagnostic mode rather than a fast one, and views are calculated band
+    by band even if the backend has its own renderer.
+
+    Args:
+        backend (Backend): The backend to validate.
+        statistics (PrecisionStatistics): Collects the comparisons.
+
+    Returns:
+        Backend: A backend with the same name that returns the counts at the
+                 view's precision.
+    """
+
+    def calculate(
+        state: AppState,
+        row_start: int = 0,
+        row_end: Optional[int] = None,
+        column_start: int = 0,
+        column_end: Optional[int] = None,
+    ) -> NDArray[np.int32]:
+        """Calculates a region of the view and compares it with float64."""
+        iteration_grid = backend.calculate(
+            state, row_start, row_end, column_start, column_end
+        )
+
+        reference_grid = None
+        dtype = float_dtype(state, row_start, row_end, column_start, column_end)
+        if dtype != np.float64:
+            reference_grid = backend.calculate(
+                reference_state(state), row_start, row_end, column_start, column_end
+            )
+
+        statistics.add(iteration_grid, reference_grid)
+        return iteration_grid
+
+    return Backend(
+        backend.name,
+        f"{backend.description}, validated against float64",
+        lambda: calculate,
+        probe=backend.is_available,
+    )
+
+
+def add_precision_arguments(parser: argparse.ArgumentParser, default: str) -> None:
+    """Adds the standard floating-point precision options to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+        default (str): The precision used when the option is not given, one of
+                       `state.PRECISIONS`.
+    """
+    parser.add_argument(
+        "--precision",
+        choices=PRECISIONS,
+        default=default,
+        help="floating-point type of the numpy, multiprocess and cuda backends; "
+        "auto uses float32 wherever it is precise enough, and the other "
+        f"backends only accept float64 (default: {default})",
+    )
+    parser.add_argument(
+        "--validate-precision",
+        action="store_true",
+        help="also render every reduced-precision region in float64 and "
+        "report the pixels that differ",
+    )
+
+
+def precision_from_arguments(
+    parser: argparse.ArgumentParser, arguments: argparse.Namespace, backend: Backend
+) -> tuple[Backend, Optional[PrecisionStatistics]]:
+    """Wraps a backend in the validation requested on the command line.
+
+    A reduced precision needs one of `PRECISION_BACKENDS`. Asking for another
+    backend is reported as a usage error. If the requested backend, or "auto"
+    or "cpu", fell back to one that always iterates in float64, a warning is
+    issued and `arguments.precision` is reset to float64 instead.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser that reports usage errors.
+        arguments (argparse.Namespace): Options parsed with
+                                        `add_precision_arguments` and
+                                        `backends.add_backend_argument`.
+        backend (Backend): The backend to validate, as returned by
+                           `backends.get_backend`.
+
+    Returns:
+        tuple[Backend, Optional[PrecisionStatistics]]: The backend to render
+            with, and the statistics, or None if validation is disabled.
+    """
+    if (
+        arguments.precision != REFERENCE_PRECISION
+        and backend.name not in PRECISION_BACKENDS
+    ):
+        if arguments.backend not in ("auto", "cpu", *PRECISION_BACKENDS):
+            parser.error(
+                f"backend '{arguments.backend}' does not support precision "
+                f"'{arguments.precision}'. Choose a backend from: "
+                f"{', '.join(PRECISION_BACKENDS)}."
+            )
+        warnings.warn(
+            f"Backend '{backend.name}' does not support precision "
+            f"'{arguments.precision}', using {REFERENCE_PRECISION}.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        arguments.precision = REFERENCE_PRECISION
+
+    if not arguments.validate_precision:
+        return backend, None
+
+    statistics = PrecisionStatistics()
+    return validating_backend(backend, statistics), statistics
@@ -0,0 +1,204 @@
+import argparse
+import math
+import profiling
+import pygame
+import threading
+import time
+from typing import Optional
+from profiling import OverlaySink
+
+DEFAULT_FRAME_RATE = 60
+MAX_DIRTY_RECTANGLES = 64
+PRESENT_EVENT = pygame.event.custom_type()
+
+Layer = tuple[pygame.Surface, tuple[int, int], threading.Lock]
+
+
+class PresenterStatistics:
+    """Counts the frames a presenter showed and the pixels it copied."""
+
+    def __init__(self):
+        self.frames = 0
+        self.rectangles = 0
+        self.presented_pixels = 0
+        self.window_pixels = 0
+
+    @property
+    def fraction_presented(self) -> float:
+        """The pixels copied as a fraction of flipping the whole window."""
+        return self.presented_pixels / self.window_pixels if self.window_pixels else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.frames} frames, {self.rectangles} dirty rectangles, "
+            f"{self.fraction_presented:.1%} of the pixels of full-window flips"
+        )
+
+
+class Presenter:
+    """Shows off-screen render surfaces only where and when they changed.
+
+    Render threads color finished tiles into off-screen surfaces in bulk and
+    call `mark_dirty` with the window area of each. The first mark after a
+    frame posts a `PRESENT_EVENT`, so a main loop blocked in `wait_for_events`
+    wakes up for new pixels as well as for input and sleeps otherwise. Each
+    call to `present` copies only the dirty rectangles to the window and
+    updates only those parts of the display, at most `frame_rate` times a
+    second; tiles finished in between are batched into the next frame.
+    """
+
+    def __init__(self, window: pygame.Surface, frame_rate: float = DEFAULT_FRAME_RATE):
+        if not frame_rate > 0:
+            raise ValueError(f"Invalid frame rate '{frame_rate}'. Use a positive rate.")
+        self.window = window
+        self.frame_interval = 1 / frame_rate
+        self.statistics = PresenterStatistics()
+        self._dirty: list[pygame.Rect] = []
+        self._lock = threading.Lock()
+        self._next_frame = 0.0
+        self._overlay_rect: Optional[pygame.Rect] = None
+
+    def set_window(self, window: pygame.Surface) -> None:
+        """Switches to a new display surface, such as after a resize.
+
+        Args:
+            window (pygame.Surface): The surface returned by
+                                     `pygame.display.set_mode`.
+        """
+        self.window = window
+        self._overlay_rect = None
+        self.mark_all_dirty()
+
+    def mark_dirty(self, rect: pygame.Rect) -> None:
+        """Records that an area of the window has new pixels to show.
+
+        Safe to call from any thread.
+
+        Args:
+            rect (pygame.Rect): The changed area, in window coordinates.
+        """
+        with self._lock:
+            first_mark = not self._dirty
+            self._dirty.append(pygame.Rect(rect))
+
+        if first_mark:
+            pygame.event.post(pygame.event.Event(PRESENT_EVENT))
+
+    def mark_all_dirty(self) -> None:
+        """Records that the whole window has to be shown again."""
+        self.mark_dirty(self.window.get_rect())
+
+    def wait_for_events(self) -> list[pygame.event.Event]:
+        """Sleeps until there is input to handle or a frame to present.
+
+        Returns:
+            list[pygame.event.Event]: The pending events, possibly none when
+                                      the next frame is due.
+        """
+        with self._lock:
+            dirty = bool(self._dirty)
+
+        if not dirty:
+            first_event = pygame.event.wait()
+        else:
+            timeout = self._next_frame - time.perf_counter()
+            if timeout <= 0:
+                return pygame.event.get()
+            first_event = pygame.event.wait(math.ceil(timeout * 1000))
+
+        events = [first_event] if first_event.type != pygame.NOEVENT else []
+        return events + pygame.event.get()
+
+    def present(
+        self, layers: list[Layer], overlay: Optional[OverlaySink] = None
+    ) -> bool:
+        """Copies the dirty areas of the layers to the window and shows them.
+
+        Args:
+            layers (list[Layer]): The (surface, position, lock) of every
+                                  off-screen surface, with the window position
+                                  of its top-left corner and the lock its
+                                  render threads hold while drawing on it.
+            overlay (Optional[OverlaySink]): The profiling overlay, redrawn over
+                                             the layers in every frame.
+
+        Returns:
+            bool: True if a frame was presented, False if nothing changed or
+                  the frame rate does not allow another frame yet.
+        """
+        now = time.perf_counter()
+        if now < self._next_frame:
+            return False
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, []
+        if not dirty:
+            return False
+
+        if overlay is not None and self._overlay_rect is not None:
+            dirty.append(self._overlay_rect)
+        window_rect = self.window.get_rect()
+        dirty = [rect.clip(window_rect) for rect in dirty]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        if len(dirty) > MAX_DIRTY_RECTANGLES:
+            dirty = [dirty[0].unionall(dirty[1:])]
+
+        with profiling.span("present"):
+            for surface, position, lock in layers:
+                layer_rect = surface.get_rect(topleft=position)
+                with lock:
+                    for rect in dirty:
+                        area = rect.clip(layer_rect)
+                        if area.width and area.height:
+                            source = area.move(-position[0], -position[1])
+                            self.window.blit(surface, area, source)
+
+            if overlay is not None:
+                self._overlay_rect = overlay.draw(self.window)
+                dirty.append(self._overlay_rect)
+            pygame.display.update(dirty)
+
+        self.statistics.frames += 1
+        self.statistics.rectangles += len(dirty)
+        self.statistics.presented_pixels += sum(rect.w * rect.h for rect in dirty)
+        self.statistics.window_pixels += window_rect.w * window_rect.h
+        self._next_frame = now + self.frame_interval
+        return True
+
+
+def parse_frame_rate(frame_rate: str) -> float:
+    """Parses a frame rate given on the command line.
+
+    Args:
+        frame_rate (str): The most frames per second, such as "30".
+
+    Returns:
+        float: The frame rate.
+
+    Raises:
+        argparse.ArgumentTypeError: If the text is not a positive number.
+    """
+    try:
+        rate = float(frame_rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid frame rate '{frame_rate}'. Use a positive number, such as 30."
+        ) from None
+    if not rate > 0:
+        raise argparse.ArgumentTypeError(f"Invalid frame rate '{frame_rate}'.")
+
+    return rate
+
+
+def add_presenter_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the standard display presentation options to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+    """
+    parser.add_argument(
+        "--max-fps",
+        type=parse_frame_rate,
+        default=DEFAULT_FRAME_RATE,
+        help=f"most frames presented per second (default: {DEFAULT_FRAME_RATE})",
+    )
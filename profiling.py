@@ -0,0 +1,335 @@
+import argparse
+import contextlib
+import json
+import numpy as np
+import os
+import pygame
+import sys
+import threading
+import time
+from numpy.typing import NDArray
+from typing import Optional, TextIO
+
+PROFILE_SINKS = ["log", "trace", "overlay"]
+DEFAULT_TRACE_FILE = "trace.json"
+OVERLAY_FONT_SIZE = 18
+
+_sinks: list["Sink"] = []
+_disabled_span = contextlib.nullcontext()
+_epoch = time.perf_counter()
+
+
+class Sink:
+    """Receives the spans and counters recorded while it is registered.
+
+    Sinks are called from whichever thread recorded the span or counter, so
+    implementations must be thread-safe.
+    """
+
+    def record_span(self, name: str, start: float, duration: float) -> None:
+        """Receives a finished span.
+
+        Args:
+            name (str): The span name, such as "gpu.kernel".
+            start (float): The `time.perf_counter` value when the span began.
+            duration (float): The length of the span in seconds.
+        """
+
+    def record_count(self, name: str, amount: int, timestamp: float) -> None:
+        """Receives an increment of a counter.
+
+        Args:
+            name (str): The counter name, such as "pixels".
+            amount (int): The amount added to the counter.
+            timestamp (float): The `time.perf_counter` value of the increment.
+        """
+
+    def close(self) -> None:
+        """Flushes anything the sink buffered. Called when it is removed."""
+
+
+class _Span:
+    """Times a block of code and reports it to every registered sink."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception_info) -> None:
+        duration = time.perf_counter() - self.start
+        for sink in _sinks:
+            sink.record_span(self.name, self.start, duration)
+
+
+def enabled() -> bool:
+    """Checks whether any sink is registered.
+
+    Instrumented code uses this to skip work that only feeds a counter, such
+    as summing an iteration grid.
+
+    Returns:
+        bool: True if spans and counters are being recorded.
+    """
+    return bool(_sinks)
+
+
+def span(name: str) -> contextlib.AbstractContextManager:
+    """Times the enclosed block as a named span.
+
+    Without registered sinks this returns a shared no-op context manager, so
+    instrumentation left in place costs one function call.
+
+    Args:
+        name (str): The span name, such as "gpu.kernel".
+
+    Returns:
+        contextlib.AbstractContextManager: The context manager to enter.
+    """
+    if not _sinks:
+        return _disabled_span
+
+    return _Span(name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds to a named counter, such as "pixels" or "cache_hits".
+
+    Args:
+        name (str): The counter name.
+        amount (int): The amount to add.
+    """
+    if not _sinks:
+        return
+
+    timestamp = time.perf_counter()
+    for sink in _sinks:
+        sink.record_count(name, amount, timestamp)
+
+
+def count_iterations(iteration_grid: NDArray[np.int32]) -> None:
+    """Adds a freshly calculated grid to the "pixels" and "iterations" counters.
+
+    Args:
+        iteration_grid (NDArray[np.int32]): The iteration counts just calculated.
+    """
+    if not _sinks:
+        return
+
+    count("pixels", iteration_grid.size)
+    count("iterations", int(iteration_grid.sum(dtype=np.int64)))
+
+
+def add_sink(sink: Sink) -> None:
+    """Starts sending spans and counters to a sink.
+
+    Args:
+        sink (Sink): The sink to register.
+    """
+    _sinks.append(sink)
+
+
+def remove_sink(sink: Sink) -> None:
+    """Stops sending spans and counters to a sink and closes it.
+
+    Args:
+        sink (Sink): A registered sink.
+    """
+    _sinks.remove(sink)
+    sink.close()
+
+
+def close_sinks() -> None:
+    """Removes and closes every registered sink."""
+    while _sinks:
+        remove_sink(_sinks[-1])
+
+
+class LogSink(Sink):
+    """Prints every span as it finishes and the counter totals when closed."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream if stream is not None else sys.stderr
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record_span(self, name: str, start: float, duration: float) -> None:
+        with self._lock:
+            print(f"[profile] {name}: {duration * 1000:.3f} ms", file=self.stream)
+
+    def record_count(self, name: str, amount: int, timestamp: float) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def close(self) -> None:
+        with self._lock:
+            for name, total in sorted(self.counters.items()):
+                print(f"[profile] {name}: {total}", file=self.stream)
+
+
+class ChromeTraceSink(Sink):
+    """Collects spans and counters into a Chrome trace file.
+
+    The file is written when the sink is closed and can be opened in
+    chrome://tracing or Perfetto, which lay out the spans of every thread on
+    a timeline and plot the running total of every counter.
+    """
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE):
+        self.path = path
+        self.events: list[dict] = []
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record_span(self, name: str, start: float, duration: float) -> None:
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - _epoch) * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def record_count(self, name: str, amount: int, timestamp: float) -> None:
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + amount
+            self.events.append(
+                {
+                    "name": name,
+                    "ph": "C",
+                    "ts": (timestamp - _epoch) * 1e6,
+                    "pid": os.getpid(),
+                    "args": {name: total},
+                }
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            with open(self.path, "w") as trace_file:
+                json.dump(
+                    {"traceEvents": self.events, "displayTimeUnit": "ms"}, trace_file
+                )
+
+
+class OverlaySink(Sink):
+    """Keeps the latest timings of a frame for drawing over the fractal.
+
+    Spans are summed per name and counters are totalled until `reset` is
+    called, which the applications do whenever they start a new render.
+    """
+
+    def __init__(self):
+        self.spans: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._font: Optional[pygame.font.Font] = None
+
+    def record_span(self, name: str, start: float, duration: float) -> None:
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def record_count(self, name: str, amount: int, timestamp: float) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self) -> None:
+        """Clears the timings of the previous frame."""
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def lines(self) -> list[str]:
+        """Formats the current timings, one span or counter per line.
+
+        Returns:
+            list[str]: The spans in milliseconds, then the counters.
+        """
+        with self._lock:
+            span_lines = [
+                f"{name}: {duration * 1000:.2f} ms"
+                for name, duration in sorted(self.spans.items())
+            ]
+            counter_lines = [
+                f"{name}: {total:,}" for name, total in sorted(self.counters.items())
+            ]
+
+        return span_lines + counter_lines
+
+    def draw(
+        self, surface: pygame.Surface, position: tuple[int, int] = (8, 8)
+    ) -> pygame.Rect:
+        """Draws the current timings onto a surface.
+
+        Args:
+            surface (pygame.Surface): The surface to draw on, usually the window.
+            position (tuple[int, int]): The top-left corner of the text.
+
+        Returns:
+            pygame.Rect: The area of the surface the text covers.
+        """
+        if self._font is None:
+            pygame.font.init()
+            self._font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+
+        x, y = position
+        covered = pygame.Rect(x, y, 0, 0)
+        for line in self.lines():
+            text = self._font.render(line, True, (255, 255, 255), (0, 0, 0))
+            covered.union_ip(surface.blit(text, (x, y)))
+            y += text.get_height()
+
+        return covered
+
+
+def add_profiling_arguments(
+    parser: argparse.ArgumentParser, overlay: bool = False
+) -> None:
+    """Adds the standard `--profile` and `--trace-file` options to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+        overlay (bool): Whether the application can draw the on-screen overlay.
+    """
+    choices = [sink for sink in PROFILE_SINKS if overlay or sink != "overlay"]
+    parser.add_argument(
+        "--profile",
+        action="append",
+        choices=choices,
+        default=[],
+        help="record spans and counters to this sink (repeatable)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=DEFAULT_TRACE_FILE,
+        help=f"Chrome trace written by --profile trace (default: {DEFAULT_TRACE_FILE})",
+    )
+
+
+def sinks_from_arguments(arguments: argparse.Namespace) -> Optional[OverlaySink]:
+    """Registers the sinks requested with `add_profiling_arguments`.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command-line options.
+
+    Returns:
+        Optional[OverlaySink]: The overlay to draw, or None if it was not
+                               requested.
+    """
+    overlay = None
+    if "log" in arguments.profile:
+        add_sink(LogSink())
+    if "trace" in arguments.profile:
+        add_sink(ChromeTraceSink(arguments.trace_file))
+    if "overlay" in arguments.profile:
+        overlay = OverlaySink()
+        add_sink(overlay)
+
+    return overlay
@@ -0,0 +1,113 @@
+import numpy as np
+import threading
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from engine import Tile, calculate_points_numpy, imaginary_axis_cpu
+from engine import mirrored_rows, real_axis_cpu
+
+PROGRESSIVE_STRIDES = (4, 2, 1)
+SAMPLE_ROWS_PER_BAND = 32
+
+
+def sample_anchors(start: int, end: int, stride: int) -> NDArray[np.intp]:
+    """Maps every pixel of a range to the sample that stands in for it.
+
+    Args:
+        start (int): The first pixel of the range (inclusive).
+        end (int): The last pixel of the range (exclusive).
+        stride (int): The distance between two samples, in pixels.
+
+    Returns:
+        NDArray[np.intp]: For every pixel, the index of the sample at the start
+                          of its block of `stride` pixels.
+    """
+    pixels = np.arange(start, end)
+    return start + (pixels - start) // stride * stride
+
+
+def render_progressive(
+    state: AppState,
+    on_tile: Optional[Callable[[Tile, NDArray[np.int32]], None]] = None,
+    stop_event: Optional[threading.Event] = None,
+    regions: Optional[list[Tile]] = None,
+    strides: tuple[int, ...] = PROGRESSIVE_STRIDES,
+) -> NDArray[np.int32]:
+    """Generates the grid of iteration counts in interlaced coarse-to-fine passes.
+
+    Each pass samples one pixel in every `stride` x `stride` block and reports
+    the samples scaled up to blocks, so the first pass gives a full-frame
+    preview from a sixteenth of the work and later passes sharpen it. A pixel
+    sampled by an earlier pass is never calculated again, so the passes
+    together calculate every pixel exactly once, the same work as a single
+    full render. With mirror symmetry enabled, samples in mirrored rows are
+    taken from their mirror row as well.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        on_tile (Optional[Callable[[Tile, NDArray[np.int32]], None]]): Called
+            with each band of every pass and its iteration counts, with every
+            pixel showing the sample of its block.
+        stop_event (Optional[threading.Event]): A signal to abandon the render.
+        regions (Optional[list[Tile]]): Restricts the render to these regions of
+            the view. Defaults to the whole view.
+        strides (tuple[int, ...]): The sample spacing of each pass, from coarse
+                                   to fine. The last pass must have a stride of 1.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel. Pixels outside `regions` are left at
+                           zero, and pixels not reached because of a stop
+                           request keep their coarser preview or zero.
+    """
+    iteration_grid = np.zeros((state.height, state.width), dtype=np.int32)
+    sample_grid = np.zeros_like(iteration_grid)
+    calculated = np.zeros(iteration_grid.shape, dtype=bool)
+    real_axis = real_axis_cpu(state)
+    imaginary_axis = imaginary_axis_cpu(state)
+    if regions is None:
+        regions = [(0, 0, state.width, state.height)]
+
+    for stride in strides:
+        band_height = SAMPLE_ROWS_PER_BAND * stride
+
+        for column_start, region_row_start, column_end, region_row_end in regions:
+            computed_rows, row_sources = mirrored_rows(
+                state, region_row_start, region_row_end
+            )
+            source_rows = region_row_start + computed_rows[row_sources]
+            anchor_columns = sample_anchors(column_start, column_end, stride)
+            sample_columns = np.unique(anchor_columns)
+
+            for row_start in range(region_row_start, region_row_end, band_height):
+                if stop_event is not None and stop_event.is_set():
+                    return iteration_grid
+
+                row_end = min(row_start + band_height, region_row_end)
+                anchor_rows = source_rows[
+                    sample_anchors(row_start, row_end, stride) - region_row_start
+                ]
+                sample_rows = np.unique(anchor_rows)
+
+                pending_rows, pending_columns = np.nonzero(
+                    ~calculated[np.ix_(sample_rows, sample_columns)]
+                )
+                rows = sample_rows[pending_rows]
+                columns = sample_columns[pending_columns]
+                coordinates = real_axis[columns] + 1j * imaginary_axis[rows]
+                sample_grid[rows, columns] = calculate_points_numpy(
+                    coordinates,
+                    state.quality,
+                    cardioid_check=state.cardioid_check,
+                    periodicity_check=state.periodicity_check,
+                )
+                calculated[rows, columns] = True
+
+                band = sample_grid[np.ix_(anchor_rows, anchor_columns)]
+                iteration_grid[row_start:row_end, column_start:column_end] = band
+
+                if on_tile is not None:
+                    on_tile((column_start, row_start, column_end, row_end), band)
+
+    return iteration_grid
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import profiling
+import pygame
+import queue
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Optional
+from state import AppState
+from antialias import AntialiasStatistics, add_antialias_arguments, antialias
+from antialias import DEFAULT_EDGE_THRESHOLD, points_calculator
+from colorizer import Colorizer, add_palette_argument
+from precision import add_precision_arguments, precision_from_arguments
+from profiling import add_profiling_arguments, close_sinks, sinks_from_arguments
+from backends import Backend, add_backend_argument, get_backend
+
+DEFAULT_QUEUE_SIZE = 4
+IMAGE_FORMATS = ["png", "raw"]
+STAGES = ["compute", "colorize", "encode"]
+QUEUE_POLL_SECONDS = 0.1
+
+
+class BatchStatistics:
+    """Measures the throughput of a batch render and the load of each stage."""
+
+    def __init__(self):
+        self.frames = 0
+        self.elapsed_seconds = 0.0
+        self.busy_seconds = {stage: 0.0 for stage in STAGES}
+        self.antialias: Optional[AntialiasStatistics] = None
+
+    @property
+    def frames_per_second(self) -> float:
+        """The number of frames written per second of wall-clock time."""
+        return self.frames / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def utilization(self, stage: str) -> float:
+        """Calculates the fraction of the render a stage spent working.
+
+        Args:
+            stage (str): One of `STAGES`.
+
+        Returns:
+            float: The stage's busy time divided by the total render time.
+        """
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.busy_seconds[stage] / self.elapsed_seconds
+
+    def __str__(self) -> str:
+        stage_loads = ", ".join(
+            f"{stage} {self.utilization(stage):.0%}" for stage in STAGES
+        )
+        return (
+            f"{self.frames} frames in {self.elapsed_seconds:.2f} s "
+            f"({self.frames_per_second:.2f} frames/s); utilization: {stage_loads}"
+        )
+
+
+def interpolate_frames(
+    state: AppState,
+    frames: int,
+    end_scale: Optional[float] = None,
+    end_quality: Optional[int] = None,
+) -> list[AppState]:
+    """Builds the states of a zoom path and/or a quality sweep.
+
+    The scale changes geometrically, so every frame zooms in by the same
+    factor, and the quality changes linearly.
+
+    Args:
+        state (AppState): The first frame.
+        frames (int): The number of frames, including the first and last.
+        end_scale (Optional[float]): The scale of the last frame. Defaults to
+                                     the scale of the first frame.
+        end_quality (Optional[int]): The quality of the last frame. Defaults to
+                                     the quality of the first frame.
+
+    Returns:
+        list[AppState]: One state per frame.
+    """
+    if end_scale is None:
+        end_scale = state.scale
+    if end_quality is None:
+        end_quality = state.quality
+
+    frame_states = []
+    for index in range(frames):
+        progress = index / (frames - 1) if frames > 1 else 0.0
+        frame_state = state.with_size(state.width, state.height)
+        frame_state.scale = state.scale * (end_scale / state.scale) ** progress
+        frame_state.quality = round(
+            state.quality + (end_quality - state.quality) * progress
+        )
+        frame_states.append(frame_state)
+
+    return frame_states
+
+
+def _put(stage_queue: queue.Queue, item: Any, failed: threading.Event) -> bool:
+    """Puts an item on a bounded queue unless another stage has failed.
+
+    Args:
+        stage_queue (queue.Queue): The queue feeding the next stage.
+        item (Any): The item to hand over.
+        failed (threading.Event): Set when any stage raised an exception.
+
+    Returns:
+        bool: True if the item was queued, False if the pipeline failed first.
+    """
+    while not failed.is_set():
+        try:
+            stage_queue.put(item, timeout=QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+def _get(stage_queue: queue.Queue, failed: threading.Event) -> Any:
+    """Takes the next item from a queue unless another stage has failed.
+
+    Args:
+        stage_queue (queue.Queue): The queue feeding this stage.
+        failed (threading.Event): Set when any stage raised an exception.
+
+    Returns:
+        Any: The next item, or None at the end of the batch or on failure.
+    """
+    while not failed.is_set():
+        try:
+            return stage_queue.get(timeout=QUEUE_POLL_SECONDS)
+        except queue.Empty:
+            continue
+
+    return None
+
+
+def render_frames(
+    frame_states: list[AppState],
+    backend: Backend,
+    output_directory: str,
+    image_format: str = "png",
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    palette: str = "classic",
+    antialias_subsamples: int = 0,
+    edge_threshold: int = DEFAULT_EDGE_THRESHOLD,
+    sample_budget: Optional[int] = None,
+) -> BatchStatistics:
+    """Renders frames to image files through a three-stage pipeline.
+
+    The calling thread calculates iteration counts with the backend while one
+    thread colors the previous frames and another encodes and writes them.
+    The stages are connected by bounded queues, so a slow encoder only stalls
+    the backend once `queue_size` frames are waiting, and finished iteration
+    grids never pile up in memory. The colorize stage draws into a ring of
+    `queue_size + 2` persistent surfaces, enough for a full image queue plus
+    the frames being colored and encoded, so no surface is allocated per frame.
+    With anti-aliasing the colorize stage also supersamples the edge pixels of
+    every frame, on the CPU or the GPU to match the backend.
+
+    Args:
+        frame_states (list[AppState]): The state of each frame, in order.
+        backend (Backend): The rendering backend that calculates the frames.
+        output_directory (str): The directory to write the frames to. It is
+                                created if needed.
+        image_format (str): "png" for compressed images, or "raw" for packed
+                            24-bit RGB rows.
+        queue_size (int): The most frames waiting between two stages.
+        palette (str): The color palette, one of `colorizer.PALETTES`.
+        antialias_subsamples (int): The samples along each axis of an edge
+                                    pixel, or 0 to disable anti-aliasing.
+        edge_threshold (int): The color difference that marks an edge pixel.
+        sample_budget (Optional[int]): The most extra samples per frame.
+
+    Returns:
+        BatchStatistics: The frame rate and the utilization of every stage.
+
+    Raises:
+        ValueError: If the image format or palette is not supported.
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(
+            f"Unknown image format '{image_format}'. "
+            f"Choose from: {', '.join(IMAGE_FORMATS)}."
+        )
+    colorizer = Colorizer(palette)
+    os.makedirs(output_directory, exist_ok=True)
+
+    statistics = BatchStatistics()
+    if antialias_subsamples:
+        calculate_points = points_calculator(backend)
+        statistics.antialias = AntialiasStatistics(0, antialias_subsamples)
+    iteration_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    image_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    failed = threading.Event()
+    errors: list[BaseException] = []
+
+    def colorize() -> None:
+        """Colors every calculated frame until the end-of-batch marker."""
+        surfaces: list[pygame.Surface] = []
+        try:
+            while (item := _get(iteration_queue, failed)) is not None:
+                start_time = time.perf_counter()
+                index, frame_state, iteration_grid = item
+                height, width = iteration_grid.shape
+                ring_index = index % (queue_size + 2)
+                if ring_index == len(surfaces):
+                    surfaces.append(pygame.Surface((width, height), depth=32))
+                image = surfaces[ring_index]
+                if image.get_size() != (width, height):
+                    image = surfaces[ring_index] = pygame.Surface(
+                        (width, height), depth=32
+                    )
+                if statistics.antialias is None:
+                    colorizer.draw(iteration_grid, frame_state.quality, image)
+                else:
+                    colors, frame_statistics = antialias(
+                        frame_state,
+                        iteration_grid,
+                        calculate_points,
+                        palette=palette,
+                        subsamples=antialias_subsamples,
+                        threshold=edge_threshold,
+                        sample_budget=sample_budget,
+                    )
+                    pygame.surfarray.blit_array(image, colors.transpose(1, 0, 2))
+                    statistics.antialias.add(frame_statistics)
+                statistics.busy_seconds["colorize"] += time.perf_counter() - start_time
+
+                if not _put(image_queue, (index, image), failed):
+                    break
+        except BaseException as error:
+            errors.append(error)
+            failed.set()
+        finally:
+            _put(image_queue, None, failed)
+
+    def encode() -> None:
+        """Writes every colored frame until the end-of-batch marker."""
+        try:
+            while (item := _get(image_queue, failed)) is not None:
+                start_time = time.perf_counter()
+                index, image = item
+                path = os.path.join(
+                    output_directory, f"frame_{index:05d}.{image_format}"
+                )
+                with profiling.span("encode"):
+                    if image_format == "png":
+                        pygame.image.save(image, path)
+                    else:
+                        with open(path, "wb") as raw_file:
+                            raw_file.write(pygame.image.tobytes(image, "RGB"))
+                statistics.busy_seconds["encode"] += time.perf_counter() - start_time
+                statistics.frames += 1
+        except BaseException as error:
+            errors.append(error)
+            failed.set()
+
+    stage_threads = [
+        threading.Thread(target=colorize, daemon=True),
+        threading.Thread(target=encode, daemon=True),
+    ]
+    start_time = time.perf_counter()
+    for stage_thread in stage_threads:
+        stage_thread.start()
+
+    try:
+        for index, frame_state in enumerate(frame_states):
+            compute_start = time.perf_counter()
+            iteration_grid = backend.calculate(frame_state)
+            statistics.busy_seconds["compute"] += time.perf_counter() - compute_start
+
+            if not _put(iteration_queue, (index, frame_state, iteration_grid), failed):
+                break
+    except BaseException:
+        failed.set()
+        raise
+    finally:
+        _put(iteration_queue, None, failed)
+        for stage_thread in stage_threads:
+            stage_thread.join()
+        statistics.elapsed_seconds = time.perf_counter() - start_time
+
+    if errors:
+        raise errors[0]
+
+    return statistics
+
+
+def argument_parser() -> argparse.ArgumentParser:
+    """Builds the command-line parser of the batch renderer.
+
+    Returns:
+        argparse.ArgumentParser: The parser of every option of the program.
+    """
+    parser = argparse.ArgumentParser(
+        description="Headless renderer for zoom paths and parameter sweeps."
+    )
+    add_backend_argument(parser, default="auto")
+    parser.add_argument("--output", default="frames", help="output directory")
+    parser.add_argument("--format", choices=IMAGE_FORMATS, default="png")
+    parser.add_argument("--frames", type=int, default=1, help="number of frames")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--quality", type=int, default=2500)
+    parser.add_argument("--end-quality", type=int, default=None)
+    parser.add_argument(
+        "--center",
+        nargs=2,
+        type=Decimal,
+        default=[Decimal(0), Decimal(0)],
+        metavar=("REAL", "IMAG"),
+        help="centre of the view, with as many digits as the zoom needs",
+    )
+    parser.add_argument("--scale", type=float, default=4.0)
+    parser.add_argument("--end-scale", type=float, default=None)
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"frames buffered between stages (default: {DEFAULT_QUEUE_SIZE})",
+    )
+    add_palette_argument(parser)
+    add_antialias_arguments(parser)
+    add_precision_arguments(parser, default="float64")
+    add_profiling_arguments(parser)
+    return parser
+
+
+def main():
+    """Renders the requested frames without opening a window.
+
+    Interpolates the zoom path and quality sweep described on the command
+    line, writes one image per frame and prints the frame rate and the
+    utilization of the compute, colorize and encode stages.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    parser = argument_parser()
+    arguments = parser.parse_args()
+    backend, precision_statistics = precision_from_arguments(
+        parser, arguments, get_backend(arguments.backend)
+    )
+    sinks_from_arguments(arguments)
+
+    first_frame = AppState(
+        width=arguments.width,
+        height=arguments.height,
+        quality=arguments.quality,
+        scale=arguments.scale,
+        precision=arguments.precision,
+    )
+    first_frame.set_precise_center(*arguments.center)
+    frame_states = interpolate_frames(
+        first_frame, arguments.frames, arguments.end_scale, arguments.end_quality
+    )
+
+    statistics = render_frames(
+        frame_states,
+        backend,
+        arguments.output,
+        image_format=arguments.format,
+        queue_size=arguments.queue_size,
+        palette=arguments.palette,
+        antialias_subsamples=arguments.antialias,
+        edge_threshold=arguments.edge_threshold,
+        sample_budget=arguments.sample_budget,
+    )
+    close_sinks()
+    print(f"Batch rendering ({backend.name}): {statistics}")
+    if statistics.antialias is not None:
+        print(f"Anti-aliasing: {statistics.antialias}")
+    if precision_statistics is not None:
+        print(f"Precision: {precision_statistics}")
+
+
+if __name__ == "__main__":
+    main()
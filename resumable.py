@@ -0,0 +1,320 @@
+import numpy as np
+import profiling
+import threading
+from collections import OrderedDict
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from engine import Tile, in_cardioid_or_bulb_numpy, mirrored_rows, pixel_grid_cpu
+
+MAX_RESUMABLE_PIXELS = 8_000_000
+AUTO_QUALITY_FACTOR = 2
+AUTO_QUALITY_THRESHOLD = 0.001
+MAX_AUTO_QUALITY = 100_000
+
+_iteration_states: OrderedDict[tuple, "IterationState"] = OrderedDict()
+_iteration_states_lock = threading.Lock()
+
+
+class IterationState:
+    """The escape-time progress of every point of a region, kept between limits.
+
+    Points that escaped keep only their iteration count. Points that have not
+    escaped yet keep their orbit in compact arrays, so raising the iteration
+    limit continues them from where they stopped instead of from z = 0, and
+    lowering it needs no work at all. Every point still iterating has done the
+    same number of iterations, `limit`.
+
+    `counts` holds, for every point, its escape iteration, 0 while it is still
+    iterating, or -1 once it is known never to escape (inside the main
+    cardioid or period-2 bulb, or caught in a cycle by the periodicity check).
+
+    Threads sharing a state hold `lock` while advancing it and reading its
+    counts.
+    """
+
+    def __init__(
+        self,
+        coordinates: NDArray[np.complex128],
+        cardioid_check: bool = False,
+        periodicity_check: bool = False,
+    ):
+        self.shape = np.shape(coordinates)
+        self.periodicity_check = periodicity_check
+        self.limit = 0
+
+        flat_coordinates = np.ravel(coordinates)
+        self.counts = np.zeros(flat_coordinates.size, dtype=np.int32)
+        self.active_indices = np.arange(flat_coordinates.size)
+        self.c_real = flat_coordinates.real.astype(np.float64)
+        self.c_imag = flat_coordinates.imag.astype(np.float64)
+        self.z_real = np.zeros_like(self.c_real)
+        self.z_imag = np.zeros_like(self.c_imag)
+        self.saved_real = np.zeros_like(self.c_real)
+        self.saved_imag = np.zeros_like(self.c_imag)
+        self.next_checkpoint = 1
+        self.lock = threading.Lock()
+
+        if cardioid_check:
+            inside = in_cardioid_or_bulb_numpy(self.c_real, self.c_imag)
+            self.counts[self.active_indices[inside]] = -1
+            self._keep(~inside)
+
+    @property
+    def active_points(self) -> int:
+        """The number of points that are still iterating."""
+        return self.active_indices.size
+
+    def _keep(self, still_active: NDArray[np.bool_]) -> None:
+        """Compacts the per-point arrays down to the points still iterating.
+
+        Args:
+            still_active (NDArray[np.bool_]): Which active points to keep.
+        """
+        self.active_indices = self.active_indices[still_active]
+        self.c_real = self.c_real[still_active]
+        self.c_imag = self.c_imag[still_active]
+        self.z_real = self.z_real[still_active]
+        self.z_imag = self.z_imag[still_active]
+        if self.periodicity_check:
+            self.saved_real = self.saved_real[still_active]
+            self.saved_imag = self.saved_imag[still_active]
+
+    def advance(self, max_iterations: int) -> None:
+        """Iterates the points that have not escaped up to a new limit.
+
+        Performs exactly the arithmetic of `engine.calculate_points_numpy`, so
+        the counts match a render started from scratch at the new limit. A
+        limit at or below the current one does nothing.
+
+        Args:
+            max_iterations (int): The new iteration limit.
+        """
+        if max_iterations <= self.limit:
+            return
+
+        profiling.count("pixels", self.active_points)
+        z_real_squared = self.z_real * self.z_real
+        z_imag_squared = self.z_imag * self.z_imag
+
+        for iteration in range(self.limit + 1, max_iterations + 1):
+            if self.active_indices.size == 0:
+                break
+
+            np.multiply(self.z_real, self.z_imag, out=self.z_imag)
+            self.z_imag *= 2
+            self.z_imag += self.c_imag
+            np.subtract(z_real_squared, z_imag_squared, out=self.z_real)
+            self.z_real += self.c_real
+
+            np.multiply(self.z_real, self.z_real, out=z_real_squared)
+            np.multiply(self.z_imag, self.z_imag, out=z_imag_squared)
+            escaped = (z_real_squared + z_imag_squared) > 4.0
+            finished = escaped
+
+            if self.periodicity_check:
+                cycled = (self.z_real == self.saved_real) & (
+                    self.z_imag == self.saved_imag
+                )
+                finished = escaped | cycled
+
+            if finished.any():
+                self.counts[self.active_indices[escaped]] = iteration
+                if self.periodicity_check:
+                    self.counts[self.active_indices[cycled & ~escaped]] = -1
+                still_active = ~finished
+                self._keep(still_active)
+                z_real_squared = z_real_squared[still_active]
+                z_imag_squared = z_imag_squared[still_active]
+
+            if self.periodicity_check and iteration == self.next_checkpoint:
+                self.saved_real = self.z_real.copy()
+                self.saved_imag = self.z_imag.copy()
+                self.next_checkpoint *= 2
+
+        self.limit = max_iterations
+
+    def iteration_grid(self, max_iterations: int) -> NDArray[np.int32]:
+        """Builds the iteration counts of the region at a limit already reached.
+
+        Args:
+            max_iterations (int): The iteration limit, at most `limit`.
+
+        Returns:
+            NDArray[np.int32]: The counts, shaped like the coordinates, with
+                               every point that did not escape within the
+                               limit set to it.
+        """
+        iterations = self.counts.copy()
+        iterations[(iterations <= 0) | (iterations > max_iterations)] = max_iterations
+        return iterations.reshape(self.shape)
+
+
+def calculate_fractal_resumable(
+    state: AppState,
+    row_start: int = 0,
+    row_end: Optional[int] = None,
+    column_start: int = 0,
+    column_end: Optional[int] = None,
+) -> NDArray[np.int32]:
+    """Generates a grid of iteration counts, resuming earlier limits of the view.
+
+    The iteration state of the most recently used regions is remembered, up
+    to `MAX_RESUMABLE_PIXELS` pixels in total. Asking for the same region of
+    the same view again with a higher quality iterates only the points that
+    had not escaped, for the extra iterations alone; a lower quality is
+    answered without iterating. Honors the escape-time short-circuits enabled
+    in the state.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        row_start (int): The first pixel row to calculate (inclusive).
+        row_end (Optional[int]): The last pixel row to calculate (exclusive).
+                                 Defaults to the full height of the view.
+        column_start (int): The first pixel column to calculate (inclusive).
+        column_end (Optional[int]): The last pixel column to calculate
+                                    (exclusive). Defaults to the full width of
+                                    the view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel in the requested region.
+    """
+    if row_end is None:
+        row_end = state.height
+    if column_end is None:
+        column_end = state.width
+
+    computed_rows, row_sources = mirrored_rows(state, row_start, row_end)
+    key = (
+        state.center_real,
+        state.center_imag,
+        state.scale,
+        state.width,
+        state.height,
+        state.cardioid_check,
+        state.periodicity_check,
+        state.mirror_symmetry,
+        (column_start, row_start, column_end, row_end),
+    )
+
+    with _iteration_states_lock:
+        iteration_state = _iteration_states.get(key)
+        if iteration_state is not None:
+            _iteration_states.move_to_end(key)
+
+    if iteration_state is None:
+        coordinates = pixel_grid_cpu(
+            state, row_start, row_end, column_start, column_end
+        )[computed_rows]
+        new_state = IterationState(
+            coordinates, state.cardioid_check, state.periodicity_check
+        )
+        with _iteration_states_lock:
+            iteration_state = _iteration_states.setdefault(key, new_state)
+            _iteration_states.move_to_end(key)
+            kept_pixels = sum(kept.counts.size for kept in _iteration_states.values())
+            while kept_pixels > MAX_RESUMABLE_PIXELS and len(_iteration_states) > 1:
+                _, evicted = _iteration_states.popitem(last=False)
+                kept_pixels -= evicted.counts.size
+
+    with iteration_state.lock:
+        with profiling.span("resumable.advance"):
+            iteration_state.advance(state.quality)
+        iteration_grid = iteration_state.iteration_grid(state.quality)
+
+    return iteration_grid[row_sources]
+
+
+def render_resumable(
+    state: AppState,
+    on_tile: Optional[Callable[[Tile, NDArray[np.int32]], None]] = None,
+    stop_event: Optional[threading.Event] = None,
+    regions: Optional[list[Tile]] = None,
+) -> NDArray[np.int32]:
+    """Renders each region in one piece, so its iteration state is kept whole.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        on_tile (Optional[Callable[[Tile, NDArray[np.int32]], None]]): Called
+            with each completed region and its iteration counts.
+        stop_event (Optional[threading.Event]): A signal to abandon the render
+            before the next region.
+        regions (Optional[list[Tile]]): Restricts the render to these regions of
+            the view. Defaults to the whole view.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel. Pixels outside `regions` are left at
+                           zero.
+    """
+    iteration_grid = np.zeros((state.height, state.width), dtype=np.int32)
+    if regions is None:
+        regions = [(0, 0, state.width, state.height)]
+
+    for region in regions:
+        if stop_event is not None and stop_event.is_set():
+            break
+
+        column_start, row_start, column_end, row_end = region
+        iteration_region = calculate_fractal_resumable(
+            state, row_start, row_end, column_start, column_end
+        )
+        iteration_grid[row_start:row_end, column_start:column_end] = iteration_region
+        if on_tile is not None:
+            on_tile(region, iteration_region)
+
+    return iteration_grid
+
+
+def auto_quality(
+    state: AppState,
+    calculate: Callable[[AppState], NDArray[np.int32]],
+    max_quality: int = MAX_AUTO_QUALITY,
+    threshold: float = AUTO_QUALITY_THRESHOLD,
+    factor: int = AUTO_QUALITY_FACTOR,
+    on_step: Optional[Callable[[NDArray[np.int32]], None]] = None,
+) -> NDArray[np.int32]:
+    """Raises the quality of a view until its boundary stops changing.
+
+    The view is calculated at its current quality, and the quality is then
+    multiplied by `factor` for as long as more than `threshold` of the pixels
+    escape within the extra iterations. With `calculate_fractal_resumable`
+    every step costs only its extra iterations.
+
+    Args:
+        state (AppState): The view. Its quality is raised in place.
+        calculate (Callable[[AppState], NDArray[np.int32]]): Calculates the
+            whole view, such as `Backend.calculate`.
+        max_quality (int): The highest quality to try.
+        threshold (float): The fraction of pixels that must still change for
+                           the quality to be raised again.
+        factor (int): The factor the quality grows by in each step.
+        on_step (Optional[Callable[[NDArray[np.int32]], None]]): Called with
+                                                                 the counts of
+                                                                 every step.
+
+    Returns:
+        NDArray[np.int32]: The iteration counts at the final quality.
+    """
+    iteration_grid = calculate(state)
+    if on_step is not None:
+        on_step(iteration_grid)
+
+    while state.quality < max_quality:
+        previous_quality = state.quality
+        state.quality = min(max_quality, previous_quality * factor)
+        previous_grid = iteration_grid
+        iteration_grid = calculate(state)
+        if on_step is not None:
+            on_step(iteration_grid)
+
+        newly_escaped = (previous_grid == previous_quality) & (
+            iteration_grid < state.quality
+        )
+        if newly_escaped.mean() <= threshold:
+            break
+
+    return iteration_grid
@@ -0,0 +1,403 @@
+import argparse
+import numpy as np
+import threading
+import time
+import warnings
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from engine import Tile
+from backends import Backend
+from parallel import split_region_into_tiles
+
+DEFAULT_SCHEDULER_TILE_SIZE = 128
+DEFAULT_DEBOUNCE_SECONDS = 0.15
+
+
+class SchedulerStatistics:
+    """Counts the jobs and tiles of a render scheduler and its responsiveness."""
+
+    def __init__(self):
+        self.jobs = 0
+        self.tiles_drawn = 0
+        self.tiles_dropped = 0
+        self.first_pixel_seconds: list[float] = []
+
+    @property
+    def latest_first_pixel_seconds(self) -> float:
+        """The input-to-first-pixel latency of the most recent job that drew."""
+        return self.first_pixel_seconds[-1] if self.first_pixel_seconds else 0.0
+
+    @property
+    def mean_first_pixel_seconds(self) -> float:
+        """The mean input-to-first-pixel latency over every job that drew."""
+        if not self.first_pixel_seconds:
+            return 0.0
+
+        return sum(self.first_pixel_seconds) / len(self.first_pixel_seconds)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.jobs} jobs, {self.tiles_drawn} tiles drawn, "
+            f"{self.tiles_dropped} stale tiles dropped, first pixel after "
+            f"{self.mean_first_pixel_seconds * 1000:.1f} ms on average "
+            f"({self.latest_first_pixel_seconds * 1000:.1f} ms last)"
+        )
+
+
+class RenderJob:
+    """One generation of work: a snapshot of the view and its ordered tiles."""
+
+    def __init__(
+        self,
+        generation: int,
+        state: AppState,
+        tiles: list[Tile],
+        on_tile: Callable[[Tile, NDArray[np.int32]], None],
+        on_done: Optional[Callable[[float], None]],
+        submitted: float,
+        start_after: float,
+    ):
+        self.generation = generation
+        self.state = state
+        self.pending_tiles = tiles
+        self.on_tile = on_tile
+        self.on_done = on_done
+        self.submitted = submitted
+        self.start_after = start_after
+        self.started: Optional[float] = None
+        self.tiles_in_progress = 0
+        self.pieces_drawing = 0
+        self.drew = False
+        self.stop_event = threading.Event()
+
+
+def order_tiles(tiles: list[Tile], focus: tuple[float, float]) -> list[Tile]:
+    """Orders tiles so the ones closest to a point of interest come first.
+
+    Args:
+        tiles (list[Tile]): The tiles to order.
+        focus (tuple[float, float]): The (x, y) pixel the user is looking at,
+                                     such as the centre of the view or the
+                                     cursor of a zoom.
+
+    Returns:
+        list[Tile]: The tiles, nearest to the focus first.
+    """
+    focus_x, focus_y = focus
+
+    def distance(tile: Tile) -> float:
+        """The squared distance from the focus to the tile's centre."""
+        column_start, row_start, column_end, row_end = tile
+        return ((column_start + column_end) / 2 - focus_x) ** 2 + (
+            (row_start + row_end) / 2 - focus_y
+        ) ** 2
+
+    return sorted(tiles, key=distance)
+
+
+class RenderScheduler:
+    """A long-lived pool of render threads that always works on the newest view.
+
+    Every call to `submit` starts a new generation. Tiles of older generations
+    that have not started are dropped, tiles already being calculated are
+    asked to stop through their job's stop event and are discarded when they
+    finish. `submit` and `cancel` wait for pieces of the old generation that
+    are already being drawn, so stale work never reaches the screen after
+    they return and never competes with the current view for more than one
+    tile per worker. Submissions marked as
+    debounced, such as those of a window being dragged to a new size, only
+    start once no newer submission has arrived for `debounce_seconds`.
+
+    Tiles of `tile_size` pixels are rendered nearest to the focus of the view
+    first, one per worker thread at a time, each calculated in a single call.
+    With a `tile_size` of None every region is calculated whole in a single
+    call instead, which suits the GPU. Backends with a renderer of their own,
+    such as the coarse-to-fine progressive one, always get whole regions, so
+    their passes span the view instead of sharpening a few tiles at a time.
+    """
+
+    def __init__(
+        self,
+        backend: Backend,
+        workers: int = 1,
+        tile_size: Optional[int] = DEFAULT_SCHEDULER_TILE_SIZE,
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+    ):
+        self.backend = backend
+        self.tile_size = tile_size
+        self.debounce_seconds = debounce_seconds
+        self.statistics = SchedulerStatistics()
+        self.generation = 0
+        self._job: Optional[RenderJob] = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """Whether the current generation still has tiles to calculate."""
+        with self._condition:
+            job = self._job
+            return job is not None and bool(job.pending_tiles or job.tiles_in_progress)
+
+    def submit(
+        self,
+        state: AppState,
+        on_tile: Callable[[Tile, NDArray[np.int32]], None],
+        regions: Optional[list[Tile]] = None,
+        focus: Optional[tuple[float, float]] = None,
+        debounce: bool = False,
+        on_done: Optional[Callable[[float], None]] = None,
+    ) -> int:
+        """Replaces whatever is being rendered with a new view.
+
+        Waits for the pieces of the previous generation that are being drawn,
+        so none of them is drawn once this returns.
+
+        Args:
+            state (AppState): The view to render. A snapshot is taken, so later
+                              pans and zooms do not affect it.
+            on_tile (Callable[[Tile, NDArray[np.int32]], None]): Called from a
+                worker thread with each finished piece of the view, never for
+                a stale generation.
+            regions (Optional[list[Tile]]): Restricts the render to these
+                regions of the view. Defaults to the whole view.
+            focus (Optional[tuple[float, float]]): The pixel whose tiles are
+                rendered first. Defaults to the centre of the view.
+            debounce (bool): Whether to wait for `debounce_seconds` without a
+                newer submission before starting.
+            on_done (Optional[Callable[[float], None]]): Called from a worker
+                thread once every tile of this generation has been drawn, with
+                the seconds from the start of its first tile to the end of its
+                last.
+
+        Returns:
+            int: The generation of the new job.
+        """
+        snapshot = state.with_size(state.width, state.height)
+        if regions is None:
+            regions = [(0, 0, state.width, state.height)]
+        if focus is None:
+            focus = (state.width / 2, state.height / 2)
+
+        if self.tile_size is None or self.backend.has_renderer:
+            tiles = list(regions)
+        else:
+            tiles = [
+                tile
+                for region in regions
+                for tile in split_region_into_tiles(region, self.tile_size)
+            ]
+
+        submitted = time.perf_counter()
+        start_after = submitted + self.debounce_seconds if debounce else submitted
+
+        with self._condition:
+            self._cancel()
+            self.generation += 1
+            self.statistics.jobs += 1
+            self._job = RenderJob(
+                self.generation,
+                snapshot,
+                order_tiles(tiles, focus),
+                on_tile,
+                on_done,
+                submitted,
+                start_after,
+            )
+            self._condition.notify_all()
+            return self.generation
+
+    def cancel(self) -> None:
+        """Drops the current job. None of its tiles are drawn afterwards."""
+        with self._condition:
+            self._cancel()
+
+    def _cancel(self) -> None:
+        """Drops the current job while holding the scheduler's lock.
+
+        Waits for the pieces of the job that are being drawn, so none of them
+        lands on the screen once the caller moves on. Must not be called from
+        a worker's `on_tile`.
+        """
+        job = self._job
+        if job is not None:
+            self.statistics.tiles_dropped += len(job.pending_tiles)
+            job.pending_tiles = []
+            job.stop_event.set()
+            self._job = None
+            self._condition.wait_for(lambda: not job.pieces_drawing)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the current generation to finish.
+
+        Args:
+            timeout (Optional[float]): The longest time to wait in seconds.
+
+        Returns:
+            bool: True if the scheduler is idle.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._job is None
+                or not (self._job.pending_tiles or self._job.tiles_in_progress),
+                timeout,
+            )
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Drops the current job and stops the worker threads.
+
+        Args:
+            timeout (float): The longest time to wait for each thread.
+        """
+        with self._condition:
+            self._cancel()
+            self._closed = True
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _next_tile(self) -> Optional[tuple[RenderJob, Tile]]:
+        """Waits for a tile of the current generation that is due to start.
+
+        Returns:
+            Optional[tuple[RenderJob, Tile]]: The job and its tile, or None once
+                                              the scheduler is closed.
+        """
+        with self._condition:
+            while not self._closed:
+                job = self._job
+                if job is None or not job.pending_tiles:
+                    self._condition.wait()
+                    continue
+
+                delay = job.start_after - time.perf_counter()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                if job.started is None:
+                    job.started = time.perf_counter()
+                job.tiles_in_progress += 1
+                return job, job.pending_tiles.pop(0)
+
+            return None
+
+    def _work(self) -> None:
+        """Runs in every worker thread, rendering tiles of the newest job."""
+        while True:
+            next_tile = self._next_tile()
+            if next_tile is None:
+                return
+
+            job, tile = next_tile
+
+            def draw_piece(piece: Tile, iteration_piece: NDArray[np.int32]) -> None:
+                """Draws a finished piece unless its generation is stale.
+
+                The piece is drawn outside the scheduler's lock, so workers
+                draw in parallel, and counted as drawing until it is done, so
+                `submit` and `cancel` wait for it instead of letting it land
+                after they return.
+                """
+                with self._condition:
+                    if self._job is not job:
+                        self.statistics.tiles_dropped += 1
+                        return
+                    if not job.drew:
+                        job.drew = True
+                        self.statistics.first_pixel_seconds.append(
+                            time.perf_counter() - job.submitted
+                        )
+                    self.statistics.tiles_drawn += 1
+                    job.pieces_drawing += 1
+
+                try:
+                    job.on_tile(piece, iteration_piece)
+                finally:
+                    with self._condition:
+                        job.pieces_drawing -= 1
+                        self._condition.notify_all()
+
+            try:
+                if self.backend.has_renderer:
+                    self.backend.render(
+                        job.state,
+                        on_tile=draw_piece,
+                        stop_event=job.stop_event,
+                        regions=[tile],
+                    )
+                else:
+                    column_start, row_start, column_end, row_end = tile
+                    iteration_tile = self.backend.calculate(
+                        job.state, row_start, row_end, column_start, column_end
+                    )
+                    draw_piece(tile, iteration_tile)
+            except Exception as error:
+                warnings.warn(f"Rendering tile {tile} failed: {error}", RuntimeWarning)
+            finally:
+                with self._condition:
+                    job.tiles_in_progress -= 1
+                    finished = (
+                        self._job is job
+                        and not job.pending_tiles
+                        and not job.tiles_in_progress
+                    )
+                    self._condition.notify_all()
+
+            if finished and job.on_done is not None:
+                job.on_done(time.perf_counter() - job.started)
+
+
+def add_scheduler_arguments(parser: argparse.ArgumentParser, default: int) -> None:
+    """Adds the standard render scheduler options to a command-line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+        default (int): The number of render threads when the option is not
+                       given.
+    """
+    parser.add_argument(
+        "--render-threads",
+        type=int,
+        default=default,
+        help=f"render threads of the scheduler (default: {default})",
+    )
+    parser.add_argument(
+        "--debounce-ms",
+        type=float,
+        default=DEFAULT_DEBOUNCE_SECONDS * 1000,
+        help="how long a resize waits for the next one before rendering "
+        f"(default: {DEFAULT_DEBOUNCE_SECONDS * 1000:.0f})",
+    )
+
+
+def scheduler_from_arguments(
+    arguments: argparse.Namespace,
+    backend: Backend,
+    tile_size: Optional[int] = DEFAULT_SCHEDULER_TILE_SIZE,
+) -> RenderScheduler:
+    """Starts the render scheduler requested on the command line.
+
+    Args:
+        arguments (argparse.Namespace): Options parsed with
+                                        `add_scheduler_arguments`.
+        backend (Backend): The backend that renders each tile.
+        tile_size (Optional[int]): The edge length of a scheduled tile in
+                                   pixels, or None to hand out whole regions.
+
+    Returns:
+        RenderScheduler: The running scheduler.
+    """
+    return RenderScheduler(
+        backend,
+        workers=max(1, arguments.render_threads),
+        tile_size=tile_size,
+        debounce_seconds=arguments.debounce_ms / 1000,
+    )
@@ -1,7 +1,202 @@
+import math
+from decimal import Decimal, localcontext
+
+MINIMUM_CENTER_DIGITS = 28
+EXTRA_CENTER_DIGITS = 20
+PRECISIONS = ["float64", "float32", "auto"]
+
+
+def center_digits(scale: float) -> int:
+    """Finds how many significant digits locate the centre of a view.
+
+    Args:
+        scale (float): The distance on the complex plane spanned by the view.
+
+    Returns:
+        int: The decimal precision needed to place the centre well within one
+             pixel of a view at this scale.
+    """
+    return max(
+        MINIMUM_CENTER_DIGITS, math.ceil(-math.log10(scale)) + EXTRA_CENTER_DIGITS
+    )
+
+
 class AppState:
-    """A centralized class to manage the application's state."""
+    """A centralized class to manage the application's state.
+
+    The viewport is described by the point of the complex plane at the centre of
+    the view and by its scale, the distance on the complex plane spanned by the
+    full width (and the full height) of the view. The centre is stored as a
+    pair of `Decimal` coordinates, `center_real` and `center_imag`, so that
+    panning and zooming keep it exact far beyond double precision; `center`
+    is its nearest `complex` value, used by the double-precision engines.
 
-    def __init__(self, width: int, height: int, quality: int):
+    The escape-time short-circuits are off by default. Each one produces the
+    same iteration counts as the plain loop, so they can be toggled freely and
+    benchmarked against each other:
+
+    * `cardioid_check` skips points inside the main cardioid and the period-2
+      bulb, which are known to be in the set.
+    * `periodicity_check` stops iterating a point as soon as its orbit returns
+      exactly to an earlier value, since it can then never escape.
+    * `mirror_symmetry` calculates only one of each pair of rows that mirror
+      each other across the real axis and copies it to the other.
+
+    `precision` selects the floating-point type of the NumPy and CUDA engines,
+    one of `PRECISIONS`. "float64" is exact and the default; "float32" is
+    about twice as fast but runs out of precision early; "auto" picks
+    float32 for every render or tile whose pixels are far enough apart for
+    it and float64 otherwise (see `engine.float_dtype`).
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        quality: int,
+        center: complex = 0j,
+        scale: float = 4.0,
+        cardioid_check: bool = False,
+        periodicity_check: bool = False,
+        mirror_symmetry: bool = False,
+        precision: str = "float64",
+    ):
         self.width = width
         self.height = height
         self.quality = quality
+        self.scale = scale
+        self.center = center
+        self.cardioid_check = cardioid_check
+        self.periodicity_check = periodicity_check
+        self.mirror_symmetry = mirror_symmetry
+        self.precision = precision
+
+    @property
+    def center(self) -> complex:
+        """The centre of the view, rounded to double precision."""
+        return self._center
+
+    @center.setter
+    def center(self, value: complex) -> None:
+        self.set_precise_center(Decimal(value.real), Decimal(value.imag))
+
+    def set_precise_center(self, real: Decimal, imag: Decimal) -> None:
+        """Moves the centre of the view to an exact point.
+
+        Args:
+            real (Decimal): The real coordinate of the new centre.
+            imag (Decimal): The imaginary coordinate of the new centre.
+        """
+        self.center_real = real
+        self.center_imag = imag
+        self._center = complex(float(real), float(imag))
+
+    def move_center(self, offset: complex) -> None:
+        """Moves the centre of the view by a small offset without rounding it.
+
+        Args:
+            offset (complex): The distance to move, in complex-plane units.
+        """
+        with localcontext() as context:
+            context.prec = center_digits(self.scale)
+            self.set_precise_center(
+                self.center_real + Decimal(offset.real),
+                self.center_imag + Decimal(offset.imag),
+            )
+
+    def with_size(self, width: int, height: int) -> "AppState":
+        """Creates a copy of the state that shares its viewport and settings.
+
+        Args:
+            width (int): The width of the copy in pixels.
+            height (int): The height of the copy in pixels.
+
+        Returns:
+            AppState: A new state with the given size and the same view.
+        """
+        copy = AppState(
+            width=width,
+            height=height,
+            quality=self.quality,
+            scale=self.scale,
+            cardioid_check=self.cardioid_check,
+            periodicity_check=self.periodicity_check,
+            mirror_symmetry=self.mirror_symmetry,
+            precision=self.precision,
+        )
+        copy.set_precise_center(self.center_real, self.center_imag)
+        return copy
+
+    def to_dict(self) -> dict:
+        """Describes the view and settings as JSON-serializable values.
+
+        Returns:
+            dict: The description. The centre is kept as exact decimal strings.
+        """
+        return {
+            "width": self.width,
+            "height": self.height,
+            "quality": self.quality,
+            "center_real": str(self.center_real),
+            "center_imag": str(self.center_imag),
+            "scale": self.scale,
+            "cardioid_check": self.cardioid_check,
+            "periodicity_check": self.periodicity_check,
+            "mirror_symmetry": self.mirror_symmetry,
+            "precision": self.precision,
+        }
+
+    @classmethod
+    def from_dict(cls, description: dict) -> "AppState":
+        """Rebuilds a state described by `to_dict`.
+
+        Args:
+            description (dict): The description of the view and settings.
+
+        Returns:
+            AppState: The state.
+        """
+        state = cls(
+            width=description["width"],
+            height=description["height"],
+            quality=description["quality"],
+            scale=description["scale"],
+            cardioid_check=description["cardioid_check"],
+            periodicity_check=description["periodicity_check"],
+            mirror_symmetry=description["mirror_symmetry"],
+            precision=description.get("precision", "float64"),
+        )
+        state.set_precise_center(
+            Decimal(description["center_real"]), Decimal(description["center_imag"])
+        )
+        return state
+
+    def pan(self, dx: int, dy: int) -> None:
+        """Moves the viewport by a whole number of pixels.
+
+        After panning, the point that was drawn at pixel (x + dx, y + dy) is
+        drawn at pixel (x, y).
+
+        Args:
+            dx (int): The horizontal distance to move, in pixels.
+            dy (int): The vertical distance to move, in pixels.
+        """
+        self.move_center(
+            complex(dx * self.scale / self.width, dy * self.scale / self.height)
+        )
+
+    def zoom_at(self, x: int, y: int, factor: float) -> None:
+        """Zooms the viewport while keeping the point under a pixel in place.
+
+        Args:
+            x (int): The x-coordinate of the pixel to zoom around.
+            y (int): The y-coordinate of the pixel to zoom around.
+            factor (float): The magnification to apply. Values above 1 zoom in,
+                            values below 1 zoom out.
+        """
+        anchor_offset = complex(
+            (x - (self.width / 2)) / self.width * self.scale,
+            (y - (self.height / 2)) / self.height * self.scale,
+        )
+        self.move_center(anchor_offset - anchor_offset / factor)
+        self.scale /= factor
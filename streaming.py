@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+import argparse
+import numpy as np
+import os
+import pygame
+import threading
+import time
+from decimal import Decimal
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from backends import Backend, add_backend_argument, get_backend
+from colorizer import add_palette_argument, palette_colors
+from iteration_store import save_iterations
+from profiling import add_profiling_arguments, close_sinks, sinks_from_arguments
+
+DEFAULT_BAND_MEGABYTES = 256
+DEFAULT_IMAGE_TILE_SIZE = 1024
+WORKING_BYTES_PER_PIXEL = 128
+ITERATIONS_FILE = "iterations.npy"
+COLORS_FILE = "colors.npy"
+STORE_FILE = "iterations.itr"
+TILES_DIRECTORY = "tiles"
+
+
+class StreamStatistics:
+    """Measures an out-of-core render band by band."""
+
+    def __init__(self, band_rows: int):
+        self.band_rows = band_rows
+        self.bands = 0
+        self.pixels = 0
+        self.elapsed_seconds = 0.0
+
+    @property
+    def pixels_per_second(self) -> float:
+        """The number of pixels written per second of wall-clock time."""
+        return self.pixels / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.pixels:,} pixels in {self.bands} bands of {self.band_rows} rows, "
+            f"{self.elapsed_seconds:.2f} s ({self.pixels_per_second / 1e6:.2f} "
+            "Mpixel/s)"
+        )
+
+
+def band_rows_for_budget(width: int, band_megabytes: float) -> int:
+    """Finds how many rows of a view fit in a working-memory budget.
+
+    A band costs about `WORKING_BYTES_PER_PIXEL` bytes per pixel while it is
+    calculated and colored: its coordinates, the NumPy engine's working
+    arrays, its iteration counts and its colors.
+
+    Args:
+        width (int): The width of the view in pixels.
+        band_megabytes (float): The working memory allowed for one band.
+
+    Returns:
+        int: The number of rows per band, at least one.
+    """
+    return max(1, int(band_megabytes * 2**20) // (width * WORKING_BYTES_PER_PIXEL))
+
+
+def create_npy(path: str, dtype: np.dtype, shape: tuple[int, ...]) -> int:
+    """Creates a `.npy` file of the given shape without writing its data.
+
+    The data is left as a sparse region of the file, so creating an image far
+    larger than memory takes no time or memory.
+
+    Args:
+        path (str): The file to create, replacing any existing one.
+        dtype (np.dtype): The element type.
+        shape (tuple[int, ...]): The array shape.
+
+    Returns:
+        int: The byte offset of the data in the file, after the header.
+    """
+    array = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    offset = array.offset
+    del array
+    return offset
+
+
+def map_rows(
+    path: str,
+    offset: int,
+    dtype: np.dtype,
+    shape: tuple[int, ...],
+    row_start: int,
+    row_end: int,
+) -> np.memmap:
+    """Memory-maps a band of rows of a `.npy` file for writing.
+
+    Args:
+        path (str): The file created by `create_npy`.
+        offset (int): The data offset returned by `create_npy`.
+        dtype (np.dtype): The element type of the file.
+        shape (tuple[int, ...]): The shape of the whole array.
+        row_start (int): The first row to map (inclusive).
+        row_end (int): The last row to map (exclusive).
+
+    Returns:
+        np.memmap: The rows, backed by the file.
+    """
+    row_bytes = int(np.prod(shape[1:])) * np.dtype(dtype).itemsize
+    return np.memmap(
+        path,
+        dtype=dtype,
+        mode="r+",
+        offset=offset + row_start * row_bytes,
+        shape=(row_end - row_start, *shape[1:]),
+    )
+
+
+def render_to_memmap(
+    state: AppState,
+    backend: Backend,
+    iterations_path: str,
+    colors_path: Optional[str] = None,
+    band_rows: Optional[int] = None,
+    palette: str = "classic",
+    on_band: Optional[Callable[[int, int], None]] = None,
+    stop_event: Optional[threading.Event] = None,
+) -> StreamStatistics:
+    """Renders a view of any size into memory-mapped files, one band at a time.
+
+    Each band of rows is calculated by the backend, which builds the
+    coordinates of that band only, and written straight into a memory-mapped
+    `.npy` file of iteration counts and, optionally, one of RGB colors. Only
+    the band being written is mapped, so peak memory is set by the band size
+    rather than by the size of the view.
+
+    Args:
+        state (AppState): The view to render, at its full output resolution.
+        backend (Backend): The rendering backend that calculates each band.
+        iterations_path (str): The `.npy` file for the (height, width) int32
+                               iteration counts.
+        colors_path (Optional[str]): The `.npy` file for the (height, width, 3)
+                                     uint8 colors. Defaults to not coloring.
+        band_rows (Optional[int]): The rows per band. Defaults to the number
+                                   that fits in `DEFAULT_BAND_MEGABYTES`.
+        palette (str): The color palette, one of `colorizer.PALETTES`.
+        on_band (Optional[Callable[[int, int], None]]): Called with the first
+                                                        and last row of each
+                                                        finished band.
+        stop_event (Optional[threading.Event]): A signal to stop after the
+                                                current band.
+
+    Returns:
+        StreamStatistics: The band layout and throughput of the render.
+    """
+    if band_rows is None:
+        band_rows = band_rows_for_budget(state.width, DEFAULT_BAND_MEGABYTES)
+    colors = palette_colors(state.quality, palette)
+
+    statistics = StreamStatistics(band_rows)
+    start_time = time.perf_counter()
+
+    iteration_shape = (state.height, state.width)
+    iteration_offset = create_npy(iterations_path, np.int32, iteration_shape)
+    if colors_path is not None:
+        color_shape = (state.height, state.width, 3)
+        color_offset = create_npy(colors_path, np.uint8, color_shape)
+
+    for row_start in range(0, state.height, band_rows):
+        if stop_event is not None and stop_event.is_set():
+            break
+
+        row_end = min(row_start + band_rows, state.height)
+        band = backend.calculate(state, row_start, row_end)
+
+        iteration_band = map_rows(
+            iterations_path,
+            iteration_offset,
+            np.int32,
+            iteration_shape,
+            row_start,
+            row_end,
+        )
+        iteration_band[:] = band
+        iteration_band.flush()
+        del iteration_band
+
+        if colors_path is not None:
+            color_band = map_rows(
+                colors_path, color_offset, np.uint8, color_shape, row_start, row_end
+            )
+            np.take(colors, band, axis=0, out=color_band, mode="clip")
+            color_band.flush()
+            del color_band
+
+        statistics.bands += 1
+        statistics.pixels += band.size
+        if on_band is not None:
+            on_band(row_start, row_end)
+
+    statistics.elapsed_seconds = time.perf_counter() - start_time
+    return statistics
+
+
+def write_image_tiles(
+    colors: NDArray[np.uint8],
+    output_directory: str,
+    tile_size: int = DEFAULT_IMAGE_TILE_SIZE,
+) -> list[str]:
+    """Writes a large color array as a grid of PNG tiles.
+
+    Tiles are read from the array one at a time, so a memory-mapped image far
+    larger than memory can be written.
+
+    Args:
+        colors (NDArray[np.uint8]): The (height, width, 3) colors, usually
+                                    opened with `np.load(..., mmap_mode="r")`.
+        output_directory (str): The directory for the tiles, created if needed.
+                                Tiles are named `tile_<row>_<column>.png` by
+                                their index in the grid.
+        tile_size (int): The edge length of a tile in pixels.
+
+    Returns:
+        list[str]: The paths of the tiles written, row by row.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    height, width, _ = colors.shape
+
+    paths = []
+    for tile_row, row_start in enumerate(range(0, height, tile_size)):
+        for tile_column, column_start in enumerate(range(0, width, tile_size)):
+            tile = colors[
+                row_start : row_start + tile_size,
+                column_start : column_start + tile_size,
+            ]
+            image = pygame.surfarray.make_surface(tile.transpose(1, 0, 2))
+            path = os.path.join(
+                output_directory, f"tile_{tile_row:04d}_{tile_column:04d}.png"
+            )
+            pygame.image.save(image, path)
+            paths.append(path)
+
+    return paths
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses the command-line options of the streaming renderer.
+
+    Returns:
+        argparse.Namespace: The parsed options describing the view to render.
+    """
+    parser = argparse.ArgumentParser(
+        description="Out-of-core renderer for images larger than memory."
+    )
+    add_backend_argument(parser, default="auto")
+    parser.add_argument("--output", default="stream", help="output directory")
+    parser.add_argument("--width", type=int, default=16384)
+    parser.add_argument("--height", type=int, default=16384)
+    parser.add_argument("--quality", type=int, default=2500)
+    parser.add_argument(
+        "--center",
+        nargs=2,
+        type=Decimal,
+        default=[Decimal(-0.5), Decimal(0)],
+        metavar=("REAL", "IMAG"),
+        help="centre of the view, with as many digits as the zoom needs",
+    )
+    parser.add_argument("--scale", type=float, default=3.0)
+    parser.add_argument(
+        "--band-mb",
+        type=float,
+        default=DEFAULT_BAND_MEGABYTES,
+        help=f"working memory per band (default: {DEFAULT_BAND_MEGABYTES})",
+    )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=DEFAULT_IMAGE_TILE_SIZE,
+        help=f"edge of the PNG tiles (default: {DEFAULT_IMAGE_TILE_SIZE})",
+    )
+    parser.add_argument(
+        "--no-tiles", action="store_true", help="skip writing PNG tiles"
+    )
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help=f"also save the counts as a compressed {STORE_FILE} for recoloring",
+    )
+    add_palette_argument(parser)
+    add_profiling_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    """Renders one view into memory-mapped files and a grid of PNG tiles.
+
+    Writes `iterations.npy` and `colors.npy` into the output directory band
+    by band, printing progress, and then cuts the colors into tiles. With
+    `--store` the counts are also saved in the compact chunked format of
+    `iteration_store`, which can be recolored later without rendering again.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    arguments = parse_arguments()
+    backend = get_backend(arguments.backend)
+    sinks_from_arguments(arguments)
+
+    state = AppState(
+        width=arguments.width,
+        height=arguments.height,
+        quality=arguments.quality,
+        scale=arguments.scale,
+    )
+    state.set_precise_center(*arguments.center)
+    os.makedirs(arguments.output, exist_ok=True)
+    colors_path = os.path.join(arguments.output, COLORS_FILE)
+
+    def report_band(row_start: int, row_end: int) -> None:
+        """Prints how far the render has come."""
+        print(f"\rRows {row_end}/{state.height}", end="", flush=True)
+
+    iterations_path = os.path.join(arguments.output, ITERATIONS_FILE)
+    statistics = render_to_memmap(
+        state,
+        backend,
+        iterations_path,
+        colors_path,
+        band_rows=band_rows_for_budget(state.width, arguments.band_mb),
+        palette=arguments.palette,
+        on_band=report_band,
+    )
+    print(f"\nStreaming render ({backend.name}): {statistics}")
+
+    if arguments.store:
+        store_path = os.path.join(arguments.output, STORE_FILE)
+        store_bytes = save_iterations(
+            store_path, np.load(iterations_path, mmap_mode="r"), state
+        )
+        print(f"Iteration counts stored in {store_path} ({store_bytes:,} bytes)")
+
+    if not arguments.no_tiles:
+        paths = write_image_tiles(
+            np.load(colors_path, mmap_mode="r"),
+            os.path.join(arguments.output, TILES_DIRECTORY),
+            arguments.tile_size,
+        )
+        print(f"{len(paths)} tiles written to {os.path.dirname(paths[0])}")
+
+    close_sinks()
+
+
+if __name__ == "__main__":
+    main()
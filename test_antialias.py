@@ -0,0 +1,132 @@
+import numpy as np
+import unittest
+from decimal import Decimal
+from state import AppState
+from engine import calculate_fractal_numpy
+from antialias import (
+    antialias,
+    calculate_samples_numpy,
+    calculate_samples_perturbation,
+    edge_strength,
+    jittered_offsets,
+    points_calculator,
+)
+from backends import get_backend
+from colorizer import palette_colors
+from perturbation import calculate_fractal_perturbation, pixel_offsets
+
+
+class TestAntialias(unittest.TestCase):
+    """
+    Series of tests for the adaptive supersampling in antialias.py.
+    """
+
+    def setUp(self):
+        self.state = AppState(width=60, height=40, quality=100, scale=3.0)
+        self.iteration_grid = calculate_fractal_numpy(self.state)
+
+    def test_edge_strength(self):
+        """
+        Tests that only pixels next to a color change are marked as edges.
+        """
+        colors = np.zeros((5, 6, 3), dtype=np.uint8)
+        colors[:, 3:] = (200, 0, 0)
+        strength = edge_strength(colors)
+
+        # Test Case 1: Both sides of the boundary see the full difference.
+        np.testing.assert_array_equal(strength[:, 2:4], 200)
+
+        # Test Case 2: Pixels away from the boundary are flat.
+        np.testing.assert_array_equal(strength[:, :2], 0)
+        np.testing.assert_array_equal(strength[:, 4:], 0)
+
+    def test_jittered_offsets(self):
+        """
+        Tests that every subsample lies in its own cell of the pixel.
+        """
+        offsets = jittered_offsets(10, 3, np.random.default_rng(0))
+
+        # Test Case 1: One offset per cell, all inside the pixel.
+        self.assertEqual(offsets.shape, (10, 9, 2))
+        self.assertTrue(np.all((offsets >= -0.5) & (offsets < 0.5)))
+
+        # Test Case 2: Each pixel has exactly one sample in every cell.
+        cells = np.floor((offsets + 0.5) * 3).astype(int)
+        for pixel_cells in cells:
+            self.assertEqual(len({tuple(cell) for cell in pixel_cells}), 9)
+
+    def test_refines_only_edges(self):
+        """
+        Tests that flat pixels keep their color and edges are supersampled.
+        """
+        colors, statistics = antialias(self.state, self.iteration_grid, subsamples=3)
+        plain_colors = palette_colors(self.state.quality)[self.iteration_grid]
+        edges = edge_strength(plain_colors) > 32
+
+        # Test Case 1: Pixels away from edges are untouched.
+        np.testing.assert_array_equal(colors[~edges], plain_colors[~edges])
+
+        # Test Case 2: Edge pixels were supersampled, at a fraction of the cost
+        # of uniform supersampling.
+        self.assertEqual(statistics.refined_pixels, np.count_nonzero(edges))
+        self.assertGreater(statistics.refined_pixels, 0)
+        self.assertEqual(statistics.samples, 60 * 40 + statistics.refined_pixels * 9)
+        self.assertEqual(statistics.uniform_samples, 60 * 40 * 9)
+        self.assertLess(statistics.fraction_of_uniform, 1.0)
+
+        # Test Case 3: The same seed renders the same image.
+        repeated_colors, _ = antialias(self.state, self.iteration_grid, subsamples=3)
+        np.testing.assert_array_equal(colors, repeated_colors)
+
+    def test_sample_budget(self):
+        """
+        Tests that the sample budget caps the extra samples on the strongest edges.
+        """
+        sampled_points = []
+
+        def calculate_points(state, offsets):
+            sampled_points.append(offsets.size)
+            return calculate_samples_numpy(state, offsets)
+
+        _, statistics = antialias(
+            self.state,
+            self.iteration_grid,
+            calculate_points,
+            subsamples=2,
+            sample_budget=100,
+        )
+
+        # Test Case 1: No more samples than the budget were calculated.
+        self.assertEqual(statistics.refined_pixels, 25)
+        self.assertEqual(sum(sampled_points), 100)
+        self.assertGreater(statistics.edge_pixels, statistics.refined_pixels)
+
+    def test_deep_zoom_samples(self):
+        """
+        Tests that the perturbation backends sample a view beyond double precision.
+        """
+        state = AppState(width=24, height=16, quality=1000, scale=1e-50)
+        state.set_precise_center(Decimal(0), Decimal(1))
+        iteration_grid = calculate_fractal_perturbation(state)
+        calculate_points = points_calculator(get_backend("perturbation"))
+
+        # Test Case 1: Samples at the pixel centres reproduce the render.
+        self.assertIs(calculate_points, calculate_samples_perturbation)
+        np.testing.assert_array_equal(
+            calculate_points(state, pixel_offsets(state)), iteration_grid
+        )
+
+        # Test Case 2: Centre plus offset rounds every sample to one point in
+        # double precision, which the perturbation samples avoid.
+        offsets = pixel_offsets(state)
+        self.assertEqual(len(np.unique(calculate_samples_numpy(state, offsets))), 1)
+
+        # Test Case 3: Refined pixels keep the detail of the view.
+        colors, statistics = antialias(
+            state, iteration_grid, calculate_points, subsamples=2
+        )
+        plain_colors = palette_colors(state.quality)[iteration_grid]
+        edges = edge_strength(plain_colors) > 32
+        np.testing.assert_array_equal(colors[~edges], plain_colors[~edges])
+        self.assertGreater(statistics.refined_pixels, 0)
+        self.assertGreater(len(np.unique(colors[edges], axis=0)), 10)
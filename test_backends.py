@@ -0,0 +1,79 @@
+import unittest
+import warnings
+from state import AppState
+from engine import calculate_fractal_numpy
+from backends import Backend, register_backend, get_backend, backend_names
+from backends import CPU_FALLBACK_ORDER
+
+
+class TestBackendRegistry(unittest.TestCase):
+    """
+    Series of tests for the backend registry in backends.py.
+    Ommitting CUDA rendering tests due to hardware dependencies.
+    """
+
+    def test_registered_backends(self):
+        """
+        Tests that the standard backends are registered.
+        """
+        for name in ["python", "numpy", "multiprocess", "cuda"]:
+            self.assertIn(name, backend_names())
+
+    def test_cpu_backends_agree(self):
+        """
+        Tests that every CPU backend calculates the same iteration counts.
+        """
+        state = AppState(width=40, height=30, quality=50)
+        expected = calculate_fractal_numpy(state, 5, 25, 10, 30).tolist()
+
+        for name in ["python", "numpy", "multiprocess", "subdivide", "progressive"]:
+            backend = get_backend(name)
+            self.assertEqual(backend.calculate(state, 5, 25, 10, 30).tolist(), expected)
+
+    def test_sequential_render(self):
+        """
+        Tests the band-by-band render of backends without their own renderer.
+        """
+        state = AppState(width=40, height=40, quality=50)
+        bands = []
+
+        result = get_backend("numpy").render(
+            state, on_tile=lambda tile, iterations: bands.append(tile)
+        )
+
+        # Test Case 1: The whole view is rendered and reported in bands.
+        self.assertEqual(result.tolist(), calculate_fractal_numpy(state).tolist())
+        self.assertEqual(bands[0], (0, 0, 40, 16))
+        self.assertEqual(bands[-1], (0, 32, 40, 40))
+
+    def test_fallback(self):
+        """
+        Tests that an unavailable backend falls back with a warning.
+        """
+
+        def fail_to_load():
+            raise AssertionError("an unavailable backend must not be loaded")
+
+        register_backend(
+            Backend("unavailable", "Test backend", fail_to_load, probe=lambda: False)
+        )
+
+        # Test Case 1: The next backend in the fallback order is used instead.
+        with self.assertWarns(RuntimeWarning):
+            backend = get_backend("unavailable")
+        self.assertNotEqual(backend.name, "unavailable")
+
+        # Test Case 2: Without fallback the unavailable backend itself is returned.
+        backend = get_backend("unavailable", fallback=False)
+        self.assertEqual(backend.name, "unavailable")
+        self.assertFalse(backend.is_available())
+
+        # Test Case 3: Unknown names are rejected.
+        with self.assertRaises(ValueError):
+            get_backend("no-such-backend")
+
+        # Test Case 4: "cpu" silently picks the best available CPU backend.
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            backend = get_backend("cpu")
+        self.assertIn(backend.name, CPU_FALLBACK_ORDER)
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from engine import calculate_fractal_numpy
+from backends import Backend, get_backend
+from benchmark_suite import compare_results, load_results, run_benchmarks
+from benchmark_suite import save_results
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """
+    Series of tests for the headless benchmark suite in benchmark_suite.py.
+    """
+
+    def test_run_benchmarks(self):
+        """
+        Tests the measured rates and the skipping of unavailable backends.
+        """
+        unavailable = Backend(
+            "unavailable", "Test backend", lambda: None, probe=lambda: False
+        )
+
+        results = run_benchmarks(
+            [get_backend("numpy"), unavailable],
+            ["full", "interior"],
+            [(32, 24)],
+            [50],
+            repeats=3,
+            warmup=1,
+        )
+
+        # Test Case 1: Every combination is recorded.
+        self.assertEqual(len(results), 4)
+        self.assertEqual(
+            [result["status"] for result in results][1:3], ["ok", "skipped"]
+        )
+
+        # Test Case 2: Only the timed renders count towards the median.
+        full, interior = results[0], results[1]
+        self.assertEqual(len(full["seconds"]), 3)
+        self.assertAlmostEqual(
+            full["pixels_per_second"], 32 * 24 / full["median_seconds"]
+        )
+
+        # Test Case 3: Every interior pixel runs to the iteration limit.
+        self.assertAlmostEqual(
+            interior["iterations_per_second"] * interior["median_seconds"],
+            32 * 24 * 50,
+        )
+
+    def test_whole_view_per_render(self):
+        """
+        Tests that every timed render calculates the view in a single call.
+        """
+        calls = []
+
+        def calculate(state, *region):
+            calls.append(region)
+            return calculate_fractal_numpy(state, *region)
+
+        counting = Backend("counting", "Test backend", lambda: calculate, lambda: True)
+        run_benchmarks([counting], ["full"], [(40, 40)], [20], repeats=2, warmup=1)
+
+        # Test Case 1: One call per warmup and timed render, none in bands.
+        self.assertEqual(calls, [(0, None, 0, None)] * 3)
+
+    def test_compare_results(self):
+        """
+        Tests that slowdowns are paired with their baseline and round-trip JSON.
+        """
+        baseline = [
+            {
+                "backend": "numpy",
+                "viewport": "full",
+                "width": 8,
+                "height": 8,
+                "quality": 10,
+                "status": "ok",
+                "median_seconds": 1.0,
+            },
+        ]
+        current = [
+            dict(baseline[0], median_seconds=1.5),
+            dict(baseline[0], quality=20, median_seconds=1.0),
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            save_results(path, baseline, {"repeats": 1, "warmup": 0})
+            comparisons = compare_results(load_results(path), current)
+
+        # Test Case 1: Only the case measured in both runs is compared.
+        self.assertEqual(len(comparisons), 1)
+
+        # Test Case 2: The change is the relative slowdown of the median.
+        self.assertAlmostEqual(comparisons[0][2], 0.5)
+
+    def test_unsupported_precision_skipped(self):
+        """
+        Tests that backends iterating in float64 are not timed as float32.
+        """
+        results = run_benchmarks(
+            [get_backend("numpy"), get_backend("subdivide")],
+            ["full"],
+            [(32, 24)],
+            [50],
+            precisions=["float64", "float32"],
+            repeats=1,
+            warmup=0,
+        )
+
+        # Test Case 1: Every precision of the NumPy backend is timed.
+        self.assertEqual([result["status"] for result in results[:2]], ["ok", "ok"])
+
+        # Test Case 2: The subdivision backend is timed in float64 only.
+        self.assertEqual(results[2]["status"], "ok")
+        self.assertEqual(results[3]["precision"], "float32")
+        self.assertEqual(results[3]["status"], "skipped")
+        self.assertEqual(results[3]["reason"], "precision not supported")
+        self.assertNotIn("seconds", results[3])
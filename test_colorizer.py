@@ -0,0 +1,72 @@
+import numpy as np
+import os
+import pygame
+import unittest
+from engine import colorer_gpu
+from colorizer import Colorizer, palette_colors
+
+
+class TestColorizer(unittest.TestCase):
+    """
+    Series of tests for the palette lookup colorizer in colorizer.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.display.quit()
+
+    def test_palette_colors(self):
+        """
+        Tests the color tables of the built-in palettes.
+        """
+        # Test Case 1: Points inside the set are black in every palette.
+        for palette in ["classic", "smooth"]:
+            self.assertEqual(palette_colors(100, palette)[100].tolist(), [0, 0, 0])
+
+        # Test Case 2: Unknown palettes are rejected.
+        with self.assertRaises(ValueError):
+            palette_colors(100, "rainbow")
+        with self.assertRaises(ValueError):
+            Colorizer("rainbow")
+
+    def test_draw_matches_colorer(self):
+        """
+        Tests that the classic palette draws the same pixels as colorer_gpu.
+        """
+        rng = np.random.default_rng(0)
+        iteration_grid = rng.integers(0, 51, size=(30, 40), dtype=np.int32)
+        surface = pygame.Surface((40, 30), depth=32)
+
+        Colorizer().draw(iteration_grid, 50, surface)
+        expected = pygame.surfarray.array3d(colorer_gpu(iteration_grid, 50))
+
+        # Test Case 1: Every pixel has the color of the original colorer.
+        self.assertTrue(np.array_equal(pygame.surfarray.array3d(surface), expected))
+
+    def test_draw_at_position(self):
+        """
+        Tests that drawing a tile only touches its region of the surface.
+        """
+        surface = pygame.Surface((40, 30), depth=32)
+        surface.fill((255, 255, 255))
+        colorizer = Colorizer()
+
+        colorizer.draw(np.full((10, 20), 50, dtype=np.int32), 50, surface, (5, 8))
+        pixels = pygame.surfarray.array3d(surface)
+
+        # Test Case 1: The tile's region is black.
+        self.assertTrue((pixels[5:25, 8:18] == 0).all())
+
+        # Test Case 2: The rest of the surface is untouched.
+        pixels[5:25, 8:18] = 255
+        self.assertTrue((pixels == 255).all())
+
+        # Test Case 3: The lookup table is reused for the same quality.
+        self.assertIs(
+            colorizer.lookup_table(50, surface), colorizer.lookup_table(50, surface)
+        )
@@ -0,0 +1,102 @@
+import numpy as np
+import socket
+import threading
+import unittest
+from state import AppState
+from engine import calculate_fractal_numpy
+from backends import get_backend
+from distributed import Coordinator, LOCALHOST, receive_message, run_worker
+from distributed import send_message
+
+
+class TestDistributed(unittest.TestCase):
+    """
+    Series of tests for the coordinator and workers in distributed.py.
+    """
+
+    def setUp(self):
+        self.coordinator = Coordinator(port=0, tile_size=16, task_timeout=10)
+        self.state = AppState(width=70, height=50, quality=60, scale=3.0)
+
+    def tearDown(self):
+        self.coordinator.close()
+
+    def start_workers(self, count):
+        """
+        Starts workers in threads and waits until they are connected.
+        """
+        for _ in range(count):
+            threading.Thread(
+                target=run_worker,
+                args=(LOCALHOST, self.coordinator.port, get_backend("numpy")),
+                daemon=True,
+            ).start()
+        self.assertTrue(self.coordinator.wait_for_workers(count, timeout=10))
+
+    def test_protocol(self):
+        """
+        Tests that messages and views survive a round trip over a connection.
+        """
+        left, right = socket.socketpair()
+        self.state.center = complex(-0.75, 0.1)
+        payload = np.arange(6, dtype=np.int32).tobytes()
+
+        send_message(left, {"type": "tile", "state": self.state.to_dict()}, payload)
+        header, received_payload = receive_message(right)
+        left.close()
+        right.close()
+
+        # Test Case 1: The header and payload arrive intact.
+        self.assertEqual(header["type"], "tile")
+        self.assertEqual(bytes(received_payload), payload)
+
+        # Test Case 2: The view keeps its exact centre.
+        received_state = AppState.from_dict(header["state"])
+        self.assertEqual(received_state.center_real, self.state.center_real)
+        self.assertEqual(received_state.center, self.state.center)
+
+    def test_render(self):
+        """
+        Tests that the tiles rendered by several workers assemble into the view.
+        """
+        self.start_workers(3)
+        iteration_grid, statistics = self.coordinator.render(self.state, timeout=30)
+
+        # Test Case 1: Every pixel matches the reference render.
+        np.testing.assert_array_equal(
+            iteration_grid, calculate_fractal_numpy(self.state)
+        )
+
+        # Test Case 2: Every tile was counted once.
+        self.assertEqual(statistics.tiles, 5 * 4)
+        self.assertEqual(statistics.pixels, 70 * 50)
+
+    def test_lost_worker(self):
+        """
+        Tests that the tiles of a worker that disconnects are rendered again.
+        """
+        received = threading.Event()
+
+        def lost_worker():
+            with socket.create_connection((LOCALHOST, self.coordinator.port)) as lost:
+                send_message(lost, {"type": "hello", "name": "lost", "backend": "-"})
+                receive_message(lost)
+                received.set()
+
+        threading.Thread(target=lost_worker, daemon=True).start()
+        self.assertTrue(self.coordinator.wait_for_workers(1, timeout=10))
+        render = threading.Thread(
+            target=lambda: self.results.append(self.coordinator.render(self.state, 30))
+        )
+        self.results = []
+        render.start()
+        self.assertTrue(received.wait(timeout=10))
+        self.start_workers(1)
+        render.join(timeout=30)
+        iteration_grid, statistics = self.results[0]
+
+        # Test Case 1: The lost tile was retried and the view is complete.
+        self.assertGreaterEqual(statistics.retries, 1)
+        np.testing.assert_array_equal(
+            iteration_grid, calculate_fractal_numpy(self.state)
+        )
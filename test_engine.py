@@ -1,6 +1,11 @@
 import unittest
+import numpy as np
 from state import AppState
 from engine import pixel_to_complex_cpu, calculate_fractal_cpu, colorer_cpu
+from engine import pixel_grid_cpu, calculate_points_numpy, calculate_fractal_numpy
+from engine import exposed_regions, shift_iteration_grid, pan_fractal
+from engine import in_cardioid_or_bulb, mirrored_rows, render_subdivided
+from engine import float_dtype
 
 
 class TestEngineCPUFunctions(unittest.TestCase):
@@ -22,6 +27,11 @@ class TestEngineCPUFunctions(unittest.TestCase):
         # Test Case 2: The top-left corner (an "edge case" test)
         self.assertEqual(pixel_to_complex_cpu(0, 0, state), -2 - 2j)
 
+        # Test Case 3: A moved and zoomed viewport maps its centre and corner.
+        state = AppState(width=640, height=480, quality=100, center=-1 + 1j, scale=2)
+        self.assertEqual(pixel_to_complex_cpu(320, 240, state), -1 + 1j)
+        self.assertEqual(pixel_to_complex_cpu(0, 0, state), -2 + 0j)
+
     def test_calculate_fractal_cpu(self):
         """
         Tests the Mandelbrot calculation with points known to be inside and
@@ -43,3 +53,218 @@ class TestEngineCPUFunctions(unittest.TestCase):
         # Test Case 2: A point that escapes immediately (1 iteration) should be a known
         # color. red=(1%8)*32=32, green=(1%4)*64=64, blue=(1%16)*16=16
         self.assertEqual(colorer_cpu(1, max_iterations=100), (32, 64, 16))
+
+    def test_pixel_grid_cpu(self):
+        """
+        Tests that the vectorized coordinate grid matches the per-pixel mapping.
+        """
+        state = AppState(width=640, height=480, quality=100)
+
+        # Test Case 1: The full grid has one coordinate per pixel.
+        grid = pixel_grid_cpu(state)
+        self.assertEqual(grid.shape, (480, 640))
+        self.assertEqual(grid[0, 0], pixel_to_complex_cpu(0, 0, state))
+        self.assertEqual(grid[240, 320], pixel_to_complex_cpu(320, 240, state))
+
+        # Test Case 2: A row band starts at the requested row.
+        band = pixel_grid_cpu(state, row_start=100, row_end=110)
+        self.assertEqual(band.shape, (10, 640))
+        self.assertEqual(band[0, 17], pixel_to_complex_cpu(17, 100, state))
+
+        # Test Case 3: A tile starts at the requested row and column.
+        tile = pixel_grid_cpu(state, 100, 110, column_start=200, column_end=264)
+        self.assertEqual(tile.shape, (10, 64))
+        self.assertEqual(tile[3, 5], pixel_to_complex_cpu(205, 103, state))
+
+    def test_calculate_points_numpy(self):
+        """
+        Tests the vectorized calculation against the known single-point results.
+        """
+        points = np.array([0 + 0j, 3 + 0j, -1 + 0j, 0.5 + 0.5j])
+        expected = [calculate_fractal_cpu(point, 100) for point in points]
+
+        # Test Case 1: Every point matches the scalar calculation.
+        self.assertEqual(calculate_points_numpy(points, 100).tolist(), expected)
+
+        # Test Case 2: The output keeps the input shape and the int32 contract.
+        result = calculate_points_numpy(points.reshape(2, 2), 100)
+        self.assertEqual(result.shape, (2, 2))
+        self.assertEqual(result.dtype, np.int32)
+
+    def test_calculate_fractal_numpy(self):
+        """
+        Tests that the NumPy renderer reproduces the per-pixel CPU render.
+        """
+        state = AppState(width=64, height=48, quality=50)
+        expected = [
+            [
+                calculate_fractal_cpu(pixel_to_complex_cpu(x, y, state), state.quality)
+                for x in range(state.width)
+            ]
+            for y in range(state.height)
+        ]
+
+        # Test Case 1: The full view matches pixel for pixel.
+        self.assertEqual(calculate_fractal_numpy(state).tolist(), expected)
+
+        # Test Case 2: A row band matches the same rows of the full view.
+        band = calculate_fractal_numpy(state, row_start=10, row_end=20)
+        self.assertEqual(band.tolist(), expected[10:20])
+
+    def test_exposed_regions(self):
+        """
+        Tests which regions must be recalculated after a pan.
+        """
+        # Test Case 1: A diagonal pan exposes a column strip and a row strip.
+        regions = exposed_regions(width=100, height=80, dx=10, dy=-5)
+        self.assertEqual(regions, [(90, 0, 100, 80), (0, 0, 90, 5)])
+
+        # Test Case 2: Panning past the edge exposes the whole view.
+        self.assertEqual(exposed_regions(100, 80, -100, 0), [(0, 0, 100, 80)])
+
+        # Test Case 3: No pan exposes nothing.
+        self.assertEqual(exposed_regions(100, 80, 0, 0), [])
+
+    def test_shift_iteration_grid(self):
+        """
+        Tests that a pan moves the existing iteration counts.
+        """
+        grid = np.arange(12, dtype=np.int32).reshape(3, 4)
+
+        # Test Case 1: Pixel (x, y) receives the old value of (x + dx, y + dy).
+        shifted = shift_iteration_grid(grid, dx=1, dy=-1)
+        self.assertEqual(shifted[1:, :3].tolist(), grid[:2, 1:].tolist())
+
+        # Test Case 2: The exposed column and row are cleared.
+        self.assertEqual(shifted[0].tolist(), [0, 0, 0, 0])
+        self.assertEqual(shifted[:, 3].tolist(), [0, 0, 0])
+
+    def test_pan_fractal(self):
+        """
+        Tests that an incremental pan matches a full render of the new view.
+        """
+        # Pixel spacings are powers of two so the panned centre is exact.
+        state = AppState(width=64, height=32, quality=80, center=-0.5 + 0j, scale=2)
+        grid = calculate_fractal_numpy(state)
+
+        # Test Case 1: The panned grid matches a fresh render pixel for pixel.
+        panned = pan_fractal(grid, state, dx=-7, dy=4)
+        self.assertEqual(panned.tolist(), calculate_fractal_numpy(state).tolist())
+
+    def test_in_cardioid_or_bulb(self):
+        """
+        Tests the analytic interior check with points inside and outside.
+        """
+        # Test Case 1: The centres of the main cardioid and the period-2 bulb.
+        self.assertTrue(in_cardioid_or_bulb(0 + 0j))
+        self.assertTrue(in_cardioid_or_bulb(-1 + 0j))
+
+        # Test Case 2: Points outside both regions, including the cusp itself.
+        self.assertFalse(in_cardioid_or_bulb(0.25 + 0j))
+        self.assertFalse(in_cardioid_or_bulb(-1.5 + 0j))
+        self.assertFalse(in_cardioid_or_bulb(3 + 0j))
+
+    def test_short_circuits_match_naive(self):
+        """
+        Tests that every escape-time short-circuit leaves the results unchanged.
+        """
+        points = [0j, -1 + 0j, 0.25 + 0j, -0.75 + 0.1j, -1.75 + 0j, 0.3 + 0.5j, 3]
+        for point in points:
+            expected = calculate_fractal_cpu(point, max_iterations=500)
+
+            # Test Case 1: The scalar path with both checks enabled.
+            self.assertEqual(
+                calculate_fractal_cpu(
+                    point, 500, cardioid_check=True, periodicity_check=True
+                ),
+                expected,
+            )
+
+        # Test Case 2: The vectorized path with every combination of toggles.
+        naive_state = AppState(width=64, height=48, quality=300, center=-0.5 + 0j)
+        expected_grid = calculate_fractal_numpy(naive_state).tolist()
+        for flags in range(8):
+            state = naive_state.with_size(64, 48)
+            state.cardioid_check = bool(flags & 1)
+            state.periodicity_check = bool(flags & 2)
+            state.mirror_symmetry = bool(flags & 4)
+            self.assertEqual(calculate_fractal_numpy(state).tolist(), expected_grid)
+
+    def test_mirrored_rows(self):
+        """
+        Tests which rows are copied from their mirror image.
+        """
+        state = AppState(width=8, height=8, quality=10, mirror_symmetry=True)
+
+        # Test Case 1: Rows 1-3 mirror rows 7-5; row 0 and rows 4-7 are calculated.
+        computed_rows, row_sources = mirrored_rows(state)
+        self.assertEqual(computed_rows.tolist(), [0, 4, 5, 6, 7])
+        self.assertEqual(row_sources.tolist(), [0, 4, 3, 2, 1, 2, 3, 4])
+
+        # Test Case 2: A view that does not straddle the axis calculates every row.
+        state.center = 10j
+        computed_rows, row_sources = mirrored_rows(state)
+        self.assertEqual(computed_rows.tolist(), list(range(8)))
+
+    def test_render_subdivided(self):
+        """
+        Tests that subdivision matches a brute-force render with less work.
+        """
+        views = [(0j, 4.0), (-0.5 + 0j, 3.0), (-0.75 + 0.1j, 0.2)]
+        for center, scale in views:
+            state = AppState(width=160, height=120, quality=300, center=center)
+            state.scale = scale
+            iteration_grid, calculated_fraction = render_subdivided(state)
+
+            # Test Case 1: Every pixel matches the NumPy render.
+            self.assertEqual(
+                iteration_grid.tolist(), calculate_fractal_numpy(state).tolist()
+            )
+
+            # Test Case 2: Only part of the view was calculated.
+            self.assertLess(calculated_fraction, 0.8)
+
+        # Test Case 3: A band of the view matches the same rows of the full view.
+        band, _ = render_subdivided(state, row_start=30, row_end=70)
+        self.assertEqual(band.tolist(), calculate_fractal_numpy(state)[30:70].tolist())
+
+    def test_float_dtype(self):
+        """
+        Tests that the automatic precision keeps float64 for deep views only.
+        """
+        state = AppState(width=800, height=600, quality=500, precision="auto")
+
+        # Test Case 1: The default view is shallow enough for float32.
+        self.assertEqual(float_dtype(state), np.float32)
+
+        # Test Case 2: A deep zoom needs float64, as do fixed float64 views.
+        state.scale = 1e-4
+        self.assertEqual(float_dtype(state), np.float64)
+        state.precision = "float64"
+        state.scale = 4.0
+        self.assertEqual(float_dtype(state), np.float64)
+
+        # Test Case 3: Unknown precisions are rejected.
+        state.precision = "float16"
+        with self.assertRaises(ValueError):
+            float_dtype(state)
+
+    def test_float32_matches_float64(self):
+        """
+        Tests that float32 renders of a shallow view differ in few pixels.
+        """
+        state = AppState(width=160, height=120, quality=500)
+        reference = calculate_fractal_numpy(state)
+        state.precision = "auto"
+        iteration_grid = calculate_fractal_numpy(state)
+
+        # Test Case 1: Only scattered boundary pixels change their count.
+        mismatched = np.count_nonzero(iteration_grid != reference)
+        self.assertLess(mismatched / reference.size, 0.01)
+
+        # Test Case 2: Points far from the boundary agree exactly.
+        points = np.array([0j, -1 + 0j, 1 + 1j, -2.5 + 0j])
+        np.testing.assert_array_equal(
+            calculate_points_numpy(points, 100, dtype=np.dtype(np.float32)),
+            calculate_points_numpy(points, 100),
+        )
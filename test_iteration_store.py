@@ -0,0 +1,104 @@
+import numpy as np
+import os
+import tempfile
+import unittest
+from state import AppState
+from engine import calculate_fractal_numpy
+from colorizer import palette_colors
+from iteration_store import IterationFile, IterationWriter, colorize_region
+from iteration_store import narrowest_dtype, save_iterations
+
+
+class TestIterationStore(unittest.TestCase):
+    """
+    Series of tests for the chunked iteration format in iteration_store.py.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "view.itr")
+        self.state = AppState(
+            width=90, height=70, quality=300, center=-0.5 + 0j, scale=3.0
+        )
+        self.iteration_grid = calculate_fractal_numpy(self.state)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_narrowest_dtype(self):
+        """
+        Tests that counts are stored in the smallest type that fits.
+        """
+        # Test Case 1: Each limit picks the narrowest unsigned type.
+        self.assertEqual(narrowest_dtype(255), np.uint8)
+        self.assertEqual(narrowest_dtype(256), np.uint16)
+        self.assertEqual(narrowest_dtype(70000), np.uint32)
+
+    def test_round_trip(self):
+        """
+        Tests that the counts and the view survive a save and load.
+        """
+        for compression in ["zlib", "none"]:
+            with self.subTest(compression=compression):
+                file_bytes = save_iterations(
+                    self.path,
+                    self.iteration_grid,
+                    self.state,
+                    chunk_size=32,
+                    compression=compression,
+                )
+
+                with IterationFile(self.path) as iteration_file:
+                    # Test Case 1: Every count is restored in a narrow type.
+                    self.assertEqual(iteration_file.dtype, np.uint16)
+                    np.testing.assert_array_equal(
+                        iteration_file.read(), self.iteration_grid
+                    )
+
+                    # Test Case 2: The viewport and quality are restored.
+                    self.assertEqual(
+                        iteration_file.state.to_dict(), self.state.to_dict()
+                    )
+
+                # Test Case 3: The file is smaller than raw int32 counts.
+                self.assertLess(file_bytes, self.iteration_grid.nbytes)
+
+    def test_partial_reads(self):
+        """
+        Tests that any region can be read, across chunk boundaries.
+        """
+        with IterationWriter(self.path, self.state, chunk_size=32) as writer:
+            for row_start in range(0, 70, 13):
+                writer.write_rows(self.iteration_grid[row_start : row_start + 13])
+
+        with IterationFile(self.path) as iteration_file:
+            # Test Case 1: A region spanning four chunks.
+            np.testing.assert_array_equal(
+                iteration_file.read(20, 50, 25, 70), self.iteration_grid[20:50, 25:70]
+            )
+
+            # Test Case 2: The ragged bottom-right chunk.
+            np.testing.assert_array_equal(
+                iteration_file.read(64, 70, 64, 90), self.iteration_grid[64:, 64:]
+            )
+
+    def test_colorize_region(self):
+        """
+        Tests recoloring, cropping and downscaling without recalculating.
+        """
+        save_iterations(self.path, self.iteration_grid, self.state, chunk_size=32)
+        colors = palette_colors(300, "smooth")[self.iteration_grid]
+
+        with IterationFile(self.path) as iteration_file:
+            # Test Case 1: A crop in another palette matches coloring the counts.
+            np.testing.assert_array_equal(
+                colorize_region(iteration_file, "smooth", (10, 5, 60, 45)),
+                colors[5:45, 10:60],
+            )
+
+            # Test Case 2: Downscaling averages squares and drops partial ones.
+            downscaled = colorize_region(iteration_file, "smooth", downscale=4)
+            self.assertEqual(downscaled.shape, (17, 22, 3))
+            np.testing.assert_array_equal(
+                downscaled[3, 5], colors[12:16, 20:24].mean(axis=(0, 1)).round()
+            )
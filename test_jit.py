@@ -0,0 +1,47 @@
+import importlib.util
+import numpy as np
+import unittest
+from state import AppState
+from engine import calculate_fractal_numpy
+
+
+@unittest.skipUnless(importlib.util.find_spec("numba"), "Numba is not installed")
+class TestJit(unittest.TestCase):
+    """
+    Series of tests for the compiled CPU kernel in jit.py.
+    """
+
+    def test_matches_numpy(self):
+        """
+        Tests that the compiled kernel matches the NumPy engine exactly.
+        """
+        from jit import calculate_fractal_jit
+
+        options = [
+            {},
+            {"cardioid_check": True, "periodicity_check": True},
+            {"mirror_symmetry": True},
+        ]
+        for option in options:
+            with self.subTest(option=option):
+                state = AppState(width=40, height=30, quality=80, scale=3.0, **option)
+
+                # Test Case 1: The whole view.
+                np.testing.assert_array_equal(
+                    calculate_fractal_jit(state), calculate_fractal_numpy(state)
+                )
+
+                # Test Case 2: A region of it.
+                np.testing.assert_array_equal(
+                    calculate_fractal_jit(state, 3, 17, 5, 25),
+                    calculate_fractal_numpy(state, 3, 17, 5, 25),
+                )
+
+    def test_interleaved_rows(self):
+        """
+        Tests that rows are dealt out evenly between threads.
+        """
+        from jit import interleaved_rows
+
+        # Test Case 1: Every row appears once, spread over the threads' runs.
+        self.assertEqual(interleaved_rows(7, 3).tolist(), [0, 3, 6, 1, 4, 2, 5])
@@ -0,0 +1,99 @@
+import unittest
+from state import AppState
+from engine import calculate_fractal_numpy
+from parallel import split_into_tiles, estimate_tile_costs, render_tiled
+from parallel import render_tiled_bounds
+
+
+class TestParallelRenderer(unittest.TestCase):
+    """
+    Series of tests for the multiprocess tiled renderer in parallel.py.
+    """
+
+    def test_split_into_tiles(self):
+        """
+        Tests that tiles cover the whole view exactly once.
+        """
+        tiles = split_into_tiles(width=100, height=70, tile_size=32)
+
+        # Test Case 1: Partial tiles are clipped at the right and bottom edges.
+        self.assertEqual(len(tiles), 4 * 3)
+        self.assertEqual(tiles[-1], (96, 64, 100, 70))
+
+        # Test Case 2: The tile areas add up to the full view.
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in tiles)
+        self.assertEqual(area, 100 * 70)
+
+    def test_estimate_tile_costs(self):
+        """
+        Tests that tiles inside the set are estimated as more expensive.
+        """
+        state = AppState(width=64, height=64, quality=100)
+        tiles = [(0, 0, 8, 8), (24, 24, 40, 40)]
+
+        # Test Case 1: The corner tile escapes quickly, the centre tile does not.
+        corner_cost, center_cost = estimate_tile_costs(state, tiles)
+        self.assertLess(corner_cost, center_cost)
+
+    def test_render_tiled(self):
+        """
+        Tests that the tiled render matches the single-process NumPy render.
+        """
+        state = AppState(width=90, height=60, quality=60)
+        completed_tiles = []
+
+        result = render_tiled(
+            state,
+            workers=2,
+            tile_size=32,
+            on_tile=lambda tile, iterations: completed_tiles.append(tile),
+        )
+
+        # Test Case 1: Every pixel matches the reference render.
+        self.assertEqual(result.tolist(), calculate_fractal_numpy(state).tolist())
+
+        # Test Case 2: Every tile was reported exactly once.
+        self.assertEqual(sorted(completed_tiles), sorted(split_into_tiles(90, 60, 32)))
+
+    def test_render_tiled_regions(self):
+        """
+        Tests that a restricted render only fills the requested regions.
+        """
+        state = AppState(width=60, height=40, quality=60)
+        reference = calculate_fractal_numpy(state)
+
+        result = render_tiled(
+            state, workers=2, tile_size=16, regions=[(50, 0, 60, 40), (0, 0, 50, 8)]
+        )
+
+        # Test Case 1: The requested regions match the reference render.
+        self.assertEqual(result[:, 50:].tolist(), reference[:, 50:].tolist())
+        self.assertEqual(result[:8, :50].tolist(), reference[:8, :50].tolist())
+
+        # Test Case 2: Everything else is left untouched.
+        self.assertFalse(result[8:, :50].any())
+
+        # Test Case 3: A band can be rendered without allocating the full view.
+        band = render_tiled_bounds(state, [(0, 10, 60, 25)], workers=2, tile_size=16)
+        self.assertEqual(band.tolist(), reference[10:25].tolist())
+
+    def test_render_tiled_mirror_symmetry(self):
+        """
+        Tests that mirrored rows are filled in and reported after the tiles.
+        """
+        state = AppState(width=48, height=40, quality=60, mirror_symmetry=True)
+        reported_pixels = []
+
+        result = render_tiled(
+            state,
+            workers=2,
+            tile_size=16,
+            on_tile=lambda tile, iterations: reported_pixels.append(iterations.size),
+        )
+
+        # Test Case 1: The result matches a render without the optimization.
+        state.mirror_symmetry = False
+        self.assertEqual(result.tolist(), calculate_fractal_numpy(state).tolist())
+
+        # Test Case 2: Every pixel is reported exactly once.
+        self.assertEqual(sum(reported_pixels), 48 * 40)
@@ -0,0 +1,125 @@
+import numpy as np
+import perturbation
+import threading
+import unittest
+from decimal import Decimal, localcontext
+from unittest import mock
+from state import AppState
+from engine import calculate_fractal_numpy
+from perturbation import calculate_fractal_perturbation, reference_orbit
+from perturbation import prepare_reference, series_approximation
+
+
+def calculate_point_decimal(real: Decimal, imag: Decimal, max_iterations: int) -> int:
+    """Iterates one point in the precision of the current decimal context."""
+    z_real = z_imag = Decimal(0)
+    for iteration in range(1, max_iterations + 1):
+        z_real, z_imag = (
+            z_real * z_real - z_imag * z_imag + real,
+            2 * z_real * z_imag + imag,
+        )
+        if z_real * z_real + z_imag * z_imag > 4:
+            return iteration
+
+    return max_iterations
+
+
+class TestPerturbation(unittest.TestCase):
+    """
+    Series of tests for the deep-zoom engine in perturbation.py.
+    Ommitting CUDA rendering tests due to hardware dependencies.
+    """
+
+    def test_reference_orbit(self):
+        """
+        Tests the arbitrary-precision orbit of the reference point.
+        """
+        # Test Case 1: A periodic point is iterated up to the limit.
+        orbit = reference_orbit(Decimal(-1), Decimal(0), 6, digits=30)
+        self.assertEqual(orbit.tolist(), [0, -1, 0, -1, 0, -1, 0])
+
+        # Test Case 2: An escaping point stops at the first escaped value.
+        orbit = reference_orbit(Decimal(1), Decimal(0), 100, digits=30)
+        self.assertEqual(orbit.tolist(), [0, 1, 2, 5])
+
+    def test_series_approximation(self):
+        """
+        Tests that the series skips iterations only for small views.
+        """
+        orbit = reference_orbit(Decimal(0), Decimal(1), 500, digits=80)
+
+        # Test Case 1: A deep view skips many iterations.
+        deep_skip, (a, b, c) = series_approximation(orbit, radius=1e-50)
+        self.assertGreater(deep_skip, 100)
+        self.assertTrue(np.isfinite([a, b, c]).all())
+
+        # Test Case 2: A shallow view skips fewer.
+        shallow_skip, _ = series_approximation(orbit, radius=1e-3)
+        self.assertLess(shallow_skip, deep_skip)
+
+    def test_shallow_view(self):
+        """
+        Tests that a shallow view matches the double-precision engine.
+        """
+        state = AppState(width=80, height=60, quality=200, center=-0.5 + 0j)
+
+        # Test Case 1: Nearly every pixel agrees; boundary pixels may round apart.
+        difference = calculate_fractal_perturbation(state) != calculate_fractal_numpy(
+            state
+        )
+        self.assertLess(difference.mean(), 0.001)
+
+    def test_deep_view(self):
+        """
+        Tests a view at a scale of 1e-50 against arbitrary-precision iteration.
+        """
+        state = AppState(width=8, height=6, quality=1000, scale=1e-50)
+        state.set_precise_center(Decimal(0), Decimal(1))
+
+        expected = []
+        with localcontext() as context:
+            context.prec = 90
+            for y in range(state.height):
+                row = []
+                for x in range(state.width):
+                    real = Decimal((x - state.width / 2) / state.width * state.scale)
+                    imag = state.center_imag + Decimal(
+                        (y - state.height / 2) / state.height * state.scale
+                    )
+                    row.append(calculate_point_decimal(real, imag, state.quality))
+                expected.append(row)
+
+        result = calculate_fractal_perturbation(state)
+
+        # Test Case 1: Every pixel matches the arbitrary-precision count.
+        self.assertEqual(result.tolist(), expected)
+
+        # Test Case 2: The view is not flattened to a single value.
+        self.assertGreater(len(np.unique(result)), 10)
+
+    def test_prepare_reference_threads(self):
+        """
+        Tests that threads rendering the same view share one reference orbit.
+        """
+        state = AppState(width=40, height=30, quality=300, center=-0.75 + 0.1j)
+        state.scale = 1e-3
+        references = []
+
+        with mock.patch.object(
+            perturbation, "reference_orbit", wraps=perturbation.reference_orbit
+        ) as orbit:
+            threads = [
+                threading.Thread(
+                    target=lambda: references.append(prepare_reference(state))
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # Test Case 1: The orbit was iterated once and every thread received it.
+        self.assertEqual(orbit.call_count, 1)
+        self.assertEqual(len(references), 4)
+        self.assertTrue(all(reference is references[0] for reference in references))
@@ -0,0 +1,78 @@
+import argparse
+import io
+import unittest
+from contextlib import redirect_stderr
+from state import AppState
+from backends import add_backend_argument, get_backend
+from precision import (
+    PrecisionStatistics,
+    add_precision_arguments,
+    precision_from_arguments,
+    validating_backend,
+)
+
+
+class TestPrecision(unittest.TestCase):
+    """
+    Series of tests for the mixed-precision validation in precision.py.
+    """
+
+    def test_validating_backend(self):
+        """
+        Tests that reduced-precision regions are compared with float64.
+        """
+        statistics = PrecisionStatistics()
+        backend = validating_backend(get_backend("numpy"), statistics)
+        state = AppState(width=120, height=90, quality=1000, scale=3.0)
+        reference = get_backend("numpy").calculate(state)
+        state.precision = "float32"
+
+        backend.calculate(state)
+
+        # Test Case 1: The whole view was rendered in float32 and compared.
+        self.assertEqual(statistics.pixels, 120 * 90)
+        self.assertEqual(statistics.reduced_pixels, 120 * 90)
+        self.assertLess(statistics.mismatch_fraction, 0.05)
+
+        # Test Case 2: A float64 view is counted but not compared.
+        state.precision = "float64"
+        iteration_grid = backend.calculate(state)
+        self.assertEqual(statistics.pixels, 2 * 120 * 90)
+        self.assertEqual(statistics.reduced_pixels, 120 * 90)
+        self.assertEqual(iteration_grid.tolist(), reference.tolist())
+
+    def test_precision_backends(self):
+        """
+        Tests that backends which always iterate in float64 refuse other precisions.
+        """
+        parser = argparse.ArgumentParser()
+        add_backend_argument(parser, default="numpy")
+        add_precision_arguments(parser, default="float64")
+
+        # Test Case 1: float64 is accepted by every backend.
+        arguments = parser.parse_args(["--backend", "progressive"])
+        backend, statistics = precision_from_arguments(
+            parser, arguments, get_backend("progressive")
+        )
+        self.assertEqual(backend.name, "progressive")
+        self.assertIsNone(statistics)
+
+        # Test Case 2: Only the backends that can iterate in float32 accept auto.
+        arguments = parser.parse_args(["--precision", "auto"])
+        backend, _ = precision_from_arguments(parser, arguments, get_backend("numpy"))
+        self.assertEqual(backend.name, "numpy")
+        self.assertEqual(arguments.precision, "auto")
+        for name in ["progressive", "resumable", "perturbation", "subdivide"]:
+            arguments = parser.parse_args(["--backend", name, "--precision", "auto"])
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                precision_from_arguments(parser, arguments, get_backend(name))
+
+        # Test Case 3: A fallback that cannot iterate in float32 warns and
+        # renders in float64 instead.
+        arguments = parser.parse_args(["--backend", "cuda", "--precision", "auto"])
+        with self.assertWarns(RuntimeWarning):
+            backend, _ = precision_from_arguments(
+                parser, arguments, get_backend("subdivide")
+            )
+        self.assertEqual(backend.name, "subdivide")
+        self.assertEqual(arguments.precision, "float64")
@@ -0,0 +1,99 @@
+import argparse
+import os
+import pygame
+import threading
+import unittest
+from presenter import (
+    PRESENT_EVENT,
+    Presenter,
+    add_presenter_arguments,
+    parse_frame_rate,
+)
+
+
+class TestPresenter(unittest.TestCase):
+    """
+    Series of tests for the dirty-rectangle presenter in presenter.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.display.quit()
+
+    def setUp(self):
+        self.window = pygame.display.set_mode((64, 48))
+        self.window.fill((0, 0, 0))
+        pygame.event.clear()
+        self.surface = pygame.Surface((32, 48))
+        self.surface.fill((255, 0, 0))
+        self.layers = [(self.surface, (32, 0), threading.Lock())]
+
+    def test_wakes_once_per_frame(self):
+        """
+        Tests that the first tile of a frame wakes the main loop.
+        """
+        presenter = Presenter(self.window)
+        presenter.mark_dirty(pygame.Rect(32, 0, 8, 8))
+        presenter.mark_dirty(pygame.Rect(40, 0, 8, 8))
+
+        # Test Case 1: Only one wake-up event was posted for both tiles.
+        events = presenter.wait_for_events()
+        self.assertEqual([event.type for event in events], [PRESENT_EVENT])
+
+        # Test Case 2: After presenting, the next tile wakes the loop again.
+        self.assertTrue(presenter.present(self.layers))
+        presenter.mark_dirty(pygame.Rect(32, 8, 8, 8))
+        self.assertEqual(len(pygame.event.get(PRESENT_EVENT)), 1)
+
+    def test_presents_dirty_rectangles(self):
+        """
+        Tests that only the dirty areas are copied, at most once per frame.
+        """
+        presenter = Presenter(self.window, frame_rate=0.1)
+        presenter.mark_dirty(pygame.Rect(28, 0, 8, 8))
+
+        # Test Case 1: The dirty area is copied where it overlaps the layer.
+        self.assertTrue(presenter.present(self.layers))
+        self.assertEqual(self.window.get_at((33, 1))[:3], (255, 0, 0))
+        self.assertEqual(self.window.get_at((29, 1))[:3], (0, 0, 0))
+        self.assertEqual(self.window.get_at((33, 20))[:3], (0, 0, 0))
+        self.assertEqual(presenter.statistics.presented_pixels, 64)
+
+        # Test Case 2: The frame rate holds back the next frame.
+        presenter.mark_all_dirty()
+        self.assertFalse(presenter.present(self.layers))
+        self.assertEqual(self.window.get_at((33, 20))[:3], (0, 0, 0))
+        self.assertEqual(presenter.statistics.frames, 1)
+
+        # Test Case 3: Without a frame rate limit, the whole window is shown
+        # once and nothing is presented while nothing changes.
+        presenter = Presenter(self.window, frame_rate=float("inf"))
+        presenter.mark_all_dirty()
+        self.assertTrue(presenter.present(self.layers))
+        self.assertEqual(self.window.get_at((33, 20))[:3], (255, 0, 0))
+        self.assertFalse(presenter.present(self.layers))
+
+    def test_frame_rate_arguments(self):
+        """
+        Tests that only positive frame rates are accepted.
+        """
+        parser = argparse.ArgumentParser()
+        add_presenter_arguments(parser)
+
+        # Test Case 1: A positive rate is parsed as a number.
+        self.assertEqual(parser.parse_args(["--max-fps", "30"]).max_fps, 30.0)
+
+        # Test Case 2: Zero, negative and invalid rates are rejected.
+        for frame_rate in ["0", "-5", "nan", "fast"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_frame_rate(frame_rate)
+
+        # Test Case 3: The presenter refuses rates it cannot wait between.
+        for frame_rate in [0.0, -5.0]:
+            with self.assertRaises(ValueError):
+                Presenter(self.window, frame_rate=frame_rate)
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+import profiling
+from state import AppState
+from engine import calculate_fractal_numpy
+from profiling import ChromeTraceSink, OverlaySink
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Series of tests for the spans, counters and sinks in profiling.py.
+    """
+
+    def tearDown(self):
+        profiling.close_sinks()
+
+    def test_disabled(self):
+        """
+        Tests that instrumentation does nothing without sinks.
+        """
+        # Test Case 1: Every disabled span is the same no-op context manager.
+        self.assertFalse(profiling.enabled())
+        self.assertIs(profiling.span("first"), profiling.span("second"))
+
+        # Test Case 2: Counters are dropped.
+        profiling.count("pixels", 10)
+
+    def test_overlay(self):
+        """
+        Tests that the engine's spans and counters reach a sink.
+        """
+        overlay = OverlaySink()
+        profiling.add_sink(overlay)
+
+        calculate_fractal_numpy(AppState(width=20, height=10, quality=50))
+
+        # Test Case 1: The stages of the calculation are timed.
+        self.assertIn("numpy.iterate", overlay.spans)
+        self.assertGreater(overlay.spans["numpy.iterate"], 0)
+
+        # Test Case 2: Every calculated pixel is counted.
+        self.assertEqual(overlay.counters["pixels"], 200)
+        self.assertIn("pixels: 200", overlay.lines())
+
+        # Test Case 3: Resetting starts a new frame.
+        overlay.reset()
+        self.assertEqual(overlay.lines(), [])
+
+    def test_chrome_trace(self):
+        """
+        Tests that closing a trace sink writes a Chrome trace file.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            profiling.add_sink(ChromeTraceSink(path))
+
+            with profiling.span("outer"):
+                with profiling.span("inner"):
+                    profiling.count("cache_hits")
+                    profiling.count("cache_hits")
+            profiling.close_sinks()
+
+            with open(path) as trace_file:
+                events = json.load(trace_file)["traceEvents"]
+
+        # Test Case 1: Spans are complete events, innermost first.
+        spans = [event for event in events if event["ph"] == "X"]
+        self.assertEqual([event["name"] for event in spans], ["inner", "outer"])
+        self.assertLessEqual(spans[1]["ts"], spans[0]["ts"])
+
+        # Test Case 2: Counters carry their running total.
+        counters = [
+            event["args"]["cache_hits"] for event in events if event["ph"] == "C"
+        ]
+        self.assertEqual(counters, [1, 2])
+
+        # Test Case 3: Closing removes the sink.
+        self.assertFalse(profiling.enabled())
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+from state import AppState
+from engine import calculate_fractal_numpy, calculate_points_numpy
+from progressive import render_progressive, sample_anchors
+
+
+class TestProgressiveRenderer(unittest.TestCase):
+    """
+    Series of tests for the coarse-to-fine renderer in progressive.py.
+    """
+
+    def test_sample_anchors(self):
+        """
+        Tests that pixels are mapped to the first pixel of their block.
+        """
+        # Test Case 1: Blocks start at the beginning of the range.
+        self.assertEqual(sample_anchors(3, 10, 4).tolist(), [3, 3, 3, 3, 7, 7, 7])
+
+        # Test Case 2: A stride of one maps every pixel to itself.
+        self.assertEqual(sample_anchors(0, 3, 1).tolist(), [0, 1, 2])
+
+    def test_render_progressive(self):
+        """
+        Tests that the passes sharpen to the exact render without extra work.
+        """
+        state = AppState(width=70, height=50, quality=60)
+        passes = []
+
+        with mock.patch(
+            "progressive.calculate_points_numpy", wraps=calculate_points_numpy
+        ) as calculate_points:
+            result = render_progressive(
+                state, on_tile=lambda tile, band: passes.append(band.copy())
+            )
+
+        # Test Case 1: The final result matches the NumPy render.
+        self.assertEqual(result.tolist(), calculate_fractal_numpy(state).tolist())
+
+        # Test Case 2: Every pixel was calculated exactly once across all passes.
+        calculated_pixels = sum(
+            call.args[0].size for call in calculate_points.call_args_list
+        )
+        self.assertEqual(calculated_pixels, 70 * 50)
+
+        # Test Case 3: The first preview covers the view in 4x4 blocks.
+        self.assertEqual(passes[0].shape, (50, 70))
+        self.assertTrue((passes[0][:4, :4] == passes[0][0, 0]).all())
+
+    def test_render_progressive_regions(self):
+        """
+        Tests restricted renders, with and without mirror symmetry.
+        """
+        state = AppState(width=60, height=40, quality=60)
+        reference = calculate_fractal_numpy(state)
+
+        # Test Case 1: Only the requested regions are rendered.
+        result = render_progressive(state, regions=[(45, 0, 60, 40), (0, 3, 45, 9)])
+        self.assertEqual(result[:, 45:].tolist(), reference[:, 45:].tolist())
+        self.assertEqual(result[3:9, :45].tolist(), reference[3:9, :45].tolist())
+        self.assertFalse(result[9:, :45].any())
+
+        # Test Case 2: Mirrored rows are copied without changing the result.
+        state.mirror_symmetry = True
+        self.assertEqual(render_progressive(state).tolist(), reference.tolist())
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from state import AppState
+from backends import Backend, get_backend
+from render_batch import interpolate_frames, render_frames
+
+
+class TestBatchRenderer(unittest.TestCase):
+    """
+    Series of tests for the headless batch renderer in render_batch.py.
+    """
+
+    def test_interpolate_frames(self):
+        """
+        Tests zoom paths and quality sweeps.
+        """
+        state = AppState(width=40, height=30, quality=100, scale=4.0)
+
+        frame_states = interpolate_frames(state, 3, end_scale=1.0, end_quality=200)
+
+        # Test Case 1: The scale shrinks by the same factor every frame.
+        self.assertEqual([frame.scale for frame in frame_states], [4.0, 2.0, 1.0])
+
+        # Test Case 2: The quality changes linearly.
+        self.assertEqual([frame.quality for frame in frame_states], [100, 150, 200])
+
+        # Test Case 3: The first state is left untouched.
+        self.assertEqual((state.scale, state.quality), (4.0, 100))
+
+    def test_render_frames(self):
+        """
+        Tests that every frame is written in the requested format.
+        """
+        state = AppState(width=40, height=30, quality=50)
+        frame_states = interpolate_frames(state, 5, end_scale=0.5)
+
+        with tempfile.TemporaryDirectory() as output_directory:
+            statistics = render_frames(
+                frame_states,
+                get_backend("numpy"),
+                output_directory,
+                image_format="raw",
+                queue_size=1,
+            )
+
+            # Test Case 1: One raw RGB file is written per frame.
+            file_names = sorted(os.listdir(output_directory))
+            self.assertEqual(file_names[0], "frame_00000.raw")
+            self.assertEqual(len(file_names), 5)
+            for file_name in file_names:
+                file_path = os.path.join(output_directory, file_name)
+                self.assertEqual(os.path.getsize(file_path), 40 * 30 * 3)
+
+            # Test Case 2: The statistics describe every stage.
+            self.assertEqual(statistics.frames, 5)
+            self.assertGreater(statistics.utilization("compute"), 0)
+            self.assertLessEqual(statistics.utilization("encode"), 1)
+
+        # Test Case 3: PNG files are written as well.
+        with tempfile.TemporaryDirectory() as output_directory:
+            render_frames(frame_states[:1], get_backend("numpy"), output_directory)
+            self.assertEqual(os.listdir(output_directory), ["frame_00000.png"])
+
+    def test_render_frames_failure(self):
+        """
+        Tests that an error in a stage stops the pipeline and is raised.
+        """
+
+        def fail_to_calculate(*arguments):
+            raise RuntimeError("backend failed")
+
+        backend = Backend(
+            "failing", "Test backend", lambda: fail_to_calculate, probe=lambda: True
+        )
+        frame_states = interpolate_frames(AppState(20, 20, 10), 10)
+
+        # Test Case 1: The error reaches the caller instead of hanging.
+        with tempfile.TemporaryDirectory() as output_directory:
+            with self.assertRaises(RuntimeError):
+                render_frames(frame_states, backend, output_directory)
+
+        # Test Case 2: Unknown formats are rejected.
+        with self.assertRaises(ValueError):
+            render_frames(frame_states, backend, "unused", image_format="gif")
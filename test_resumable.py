@@ -0,0 +1,111 @@
+import numpy as np
+import threading
+import unittest
+from state import AppState
+from engine import calculate_fractal_numpy, pixel_grid_cpu
+from resumable import IterationState, auto_quality, calculate_fractal_resumable
+from resumable import _iteration_states
+
+
+class TestResumable(unittest.TestCase):
+    """
+    Series of tests for the resumable iteration state in resumable.py.
+    """
+
+    def test_resume_matches_full_render(self):
+        """
+        Tests that raising the quality gives the counts of a render from scratch.
+        """
+        options = [
+            {},
+            {"cardioid_check": True, "periodicity_check": True},
+            {"mirror_symmetry": True},
+        ]
+        for option in options:
+            with self.subTest(option=option):
+                state = AppState(width=40, height=30, quality=50, scale=3.0, **option)
+                calculate_fractal_resumable(state)
+                state.quality = 200
+
+                # Test Case 1: Resuming from 50 to 200 iterations.
+                np.testing.assert_array_equal(
+                    calculate_fractal_resumable(state), calculate_fractal_numpy(state)
+                )
+
+                # Test Case 2: Lowering the quality again.
+                state.quality = 80
+                np.testing.assert_array_equal(
+                    calculate_fractal_resumable(state), calculate_fractal_numpy(state)
+                )
+
+    def test_advance_iterates_active_points(self):
+        """
+        Tests that only points that have not escaped are carried forward.
+        """
+        state = AppState(width=40, height=30, quality=20, scale=3.0)
+        iteration_state = IterationState(pixel_grid_cpu(state))
+
+        iteration_state.advance(20)
+        active_after_20 = iteration_state.active_points
+
+        # Test Case 1: Escaped points are dropped from the orbit arrays.
+        self.assertLess(active_after_20, 40 * 30)
+        self.assertEqual(iteration_state.limit, 20)
+
+        # Test Case 2: More iterations only shrink the active set.
+        iteration_state.advance(100)
+        self.assertLessEqual(iteration_state.active_points, active_after_20)
+        self.assertEqual(iteration_state.limit, 100)
+
+        # Test Case 3: A lower limit does no work and keeps the state.
+        iteration_state.advance(50)
+        self.assertEqual(iteration_state.limit, 100)
+        self.assertEqual(iteration_state.iteration_grid(50).max(), 50)
+
+    def test_auto_quality(self):
+        """
+        Tests that auto quality raises the quality until the boundary settles.
+        """
+        state = AppState(width=40, height=30, quality=25, scale=3.0)
+        qualities = []
+
+        iteration_grid = auto_quality(
+            state,
+            calculate_fractal_resumable,
+            max_quality=400,
+            on_step=lambda grid: qualities.append(state.quality),
+        )
+
+        # Test Case 1: Every step doubles the quality, up to the maximum.
+        self.assertEqual(qualities[0], 25)
+        self.assertGreater(state.quality, 25)
+        self.assertLessEqual(state.quality, 400)
+        for previous, current in zip(qualities, qualities[1:]):
+            self.assertEqual(current, min(400, previous * 2))
+
+        # Test Case 2: The final counts are those of the final quality.
+        np.testing.assert_array_equal(iteration_grid, calculate_fractal_numpy(state))
+
+    def test_regions_advance_independently(self):
+        """
+        Tests that a region being advanced does not block other regions.
+        """
+        state = AppState(width=40, height=30, quality=50, center=0.3 + 0.2j)
+        calculate_fractal_resumable(state, 0, 15)
+        busy_state = next(reversed(_iteration_states.values()))
+        results = []
+
+        with busy_state.lock:
+            worker = threading.Thread(
+                target=lambda: results.append(
+                    calculate_fractal_resumable(state, 15, 30)
+                )
+            )
+            worker.start()
+            worker.join(timeout=5)
+
+            # Test Case 1: The other region finished while the first was held.
+            self.assertFalse(worker.is_alive())
+            np.testing.assert_array_equal(
+                results[0], calculate_fractal_numpy(state, 15, 30)
+            )
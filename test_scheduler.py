@@ -0,0 +1,177 @@
+import numpy as np
+import threading
+import time
+import unittest
+from state import AppState
+from engine import calculate_fractal_numpy
+from backends import Backend
+from scheduler import RenderScheduler, order_tiles
+
+
+class TestRenderScheduler(unittest.TestCase):
+    """
+    Series of tests for the generation-based render scheduler in scheduler.py.
+    """
+
+    def setUp(self):
+        self.calculated_states = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def calculate(state, row_start, row_end, column_start, column_end):
+            self.calculated_states.append(state)
+            self.release.wait(timeout=5)
+            return calculate_fractal_numpy(
+                state, row_start, row_end, column_start, column_end
+            )
+
+        self.backend = Backend("test", "NumPy", lambda: calculate, probe=lambda: True)
+
+    def test_order_tiles(self):
+        """
+        Tests that the tiles nearest to the focus are rendered first.
+        """
+        tiles = [(0, 0, 10, 10), (10, 0, 20, 10), (20, 0, 30, 10)]
+
+        # Test Case 1: The centre tile comes first.
+        self.assertEqual(order_tiles(tiles, (15, 5))[0], (10, 0, 20, 10))
+
+        # Test Case 2: A focus on the right edge starts there.
+        self.assertEqual(order_tiles(tiles, (30, 5))[0], (20, 0, 30, 10))
+
+    def test_render(self):
+        """
+        Tests that a submitted view is drawn completely, matching the engine.
+        """
+        scheduler = RenderScheduler(self.backend, workers=2, tile_size=16)
+        state = AppState(width=40, height=30, quality=50)
+        iteration_grid = np.zeros((30, 40), dtype=np.int32)
+        durations = []
+
+        def draw(tile, iteration_tile):
+            column_start, row_start, column_end, row_end = tile
+            iteration_grid[row_start:row_end, column_start:column_end] = iteration_tile
+
+        scheduler.submit(state, draw, on_done=durations.append)
+        self.assertTrue(scheduler.wait(timeout=10))
+        scheduler.close()
+
+        # Test Case 1: Every pixel matches the reference render.
+        np.testing.assert_array_equal(iteration_grid, calculate_fractal_numpy(state))
+
+        # Test Case 2: Completion and the first-pixel latency are reported.
+        self.assertEqual(len(durations), 1)
+        self.assertEqual(len(scheduler.statistics.first_pixel_seconds), 1)
+        self.assertFalse(scheduler.busy)
+
+    def test_stale_generation_dropped(self):
+        """
+        Tests that a new submission drops the tiles of the previous one.
+        """
+        scheduler = RenderScheduler(self.backend, workers=1, tile_size=10)
+        state = AppState(width=40, height=30, quality=20)
+        drawn = []
+
+        self.release.clear()
+        scheduler.submit(state, lambda tile, tiles: drawn.append("old"))
+        while not self.calculated_states:
+            time.sleep(0.01)
+        scheduler.submit(state, lambda tile, tiles: drawn.append("new"))
+        self.release.set()
+        self.assertTrue(scheduler.wait(timeout=10))
+        scheduler.close()
+
+        # Test Case 1: Only the newest generation reached the screen.
+        self.assertEqual(set(drawn), {"new"})
+        self.assertEqual(len(drawn), 12)
+
+        # Test Case 2: The old job's pending tiles and its tile in flight were
+        # dropped.
+        self.assertEqual(scheduler.statistics.tiles_dropped, 12)
+        self.assertEqual(scheduler.generation, 2)
+
+    def test_debounce(self):
+        """
+        Tests that a burst of debounced submissions renders only the last one.
+        """
+        scheduler = RenderScheduler(self.backend, tile_size=None, debounce_seconds=0.2)
+
+        for width in range(20, 30):
+            scheduler.submit(
+                AppState(width=width, height=10, quality=20),
+                lambda tile, tiles: None,
+                debounce=True,
+            )
+        self.assertTrue(scheduler.wait(timeout=10))
+        scheduler.close()
+
+        # Test Case 1: Only the final size was calculated.
+        self.assertEqual([state.width for state in self.calculated_states], [29])
+        self.assertEqual(scheduler.statistics.jobs, 10)
+
+    def test_renderer_gets_whole_regions(self):
+        """
+        Tests that backends with their own renderer get regions, not tiles.
+        """
+        rendered_regions = []
+        drawing = threading.Event()
+        release_drawing = threading.Event()
+
+        def render(state, on_tile=None, stop_event=None, regions=None):
+            rendered_regions.extend(regions)
+            for region in regions:
+                on_tile(region, np.zeros((1, 1), dtype=np.int32))
+            return np.zeros((state.height, state.width), dtype=np.int32)
+
+        def draw(tile, iteration_tile):
+            drawing.set()
+            release_drawing.wait(timeout=5)
+
+        backend = Backend(
+            "passes", "Test", lambda: None, lambda: True, load_render=lambda: render
+        )
+        scheduler = RenderScheduler(backend, tile_size=16)
+        scheduler.submit(AppState(width=40, height=30, quality=20), draw)
+
+        # Test Case 1: The whole view is one render, not twelve tiles.
+        self.assertTrue(drawing.wait(timeout=5))
+        self.assertEqual(rendered_regions, [(0, 0, 40, 30)])
+
+        # Test Case 2: Cancelling waits for the piece being drawn.
+        cancelled = threading.Thread(target=scheduler.cancel)
+        cancelled.start()
+        cancelled.join(timeout=0.2)
+        self.assertTrue(cancelled.is_alive())
+        release_drawing.set()
+        cancelled.join(timeout=5)
+        self.assertFalse(cancelled.is_alive())
+        scheduler.close()
+
+    def test_no_stale_draw_after_submit(self):
+        """
+        Tests that a piece being drawn finishes before a new submission returns.
+        """
+        scheduler = RenderScheduler(self.backend, workers=1, tile_size=None)
+        state = AppState(width=40, height=30, quality=20)
+        drawn = []
+        drawing = threading.Event()
+        release_drawing = threading.Event()
+
+        def draw_old(tile, iteration_tile):
+            drawing.set()
+            release_drawing.wait(timeout=5)
+            drawn.append("old")
+
+        scheduler.submit(state, draw_old)
+        self.assertTrue(drawing.wait(timeout=5))
+        threading.Timer(0.2, release_drawing.set).start()
+        scheduler.submit(state, lambda tile, tiles: drawn.append("new"))
+        drawn_at_submit = list(drawn)
+        self.assertTrue(scheduler.wait(timeout=10))
+        scheduler.close()
+
+        # Test Case 1: The old piece was drawn before submit returned.
+        self.assertEqual(drawn_at_submit, ["old"])
+
+        # Test Case 2: Nothing of the old generation was drawn afterwards.
+        self.assertEqual(drawn, ["old", "new"])
@@ -0,0 +1,89 @@
+import unittest
+from decimal import Decimal
+from state import AppState
+
+
+class TestAppState(unittest.TestCase):
+    """
+    Series of tests for the viewport handling in state.py.
+    """
+
+    def test_pan(self):
+        """
+        Tests that panning moves the centre by whole pixels.
+        """
+        state = AppState(width=400, height=200, quality=100)
+
+        # Test Case 1: One pixel is scale / width across and scale / height down.
+        state.pan(dx=100, dy=-50)
+        self.assertEqual(state.center, 1 - 1j)
+        self.assertEqual(state.scale, 4)
+
+    def test_zoom_at(self):
+        """
+        Tests that zooming keeps the point under the cursor in place.
+        """
+        state = AppState(width=400, height=400, quality=100)
+
+        # Test Case 1: Zooming at the centre only changes the scale.
+        state.zoom_at(200, 200, factor=2)
+        self.assertEqual(state.center, 0j)
+        self.assertEqual(state.scale, 2)
+
+        # Test Case 2: Zooming at a corner pulls the centre towards it.
+        state.zoom_at(0, 0, factor=2)
+        self.assertEqual(state.center, -0.5 - 0.5j)
+        self.assertEqual(state.scale, 1)
+
+    def test_with_size(self):
+        """
+        Tests that a resized copy keeps the viewport and quality.
+        """
+        state = AppState(width=400, height=400, quality=123, center=1j, scale=0.5)
+        state.periodicity_check = True
+        copy = state.with_size(200, 100)
+
+        # Test Case 1: Only the size differs, and the original is untouched.
+        self.assertEqual((copy.width, copy.height), (200, 100))
+        self.assertEqual((copy.quality, copy.center, copy.scale), (123, 1j, 0.5))
+        self.assertEqual(state.width, 400)
+
+        # Test Case 2: The escape-time short-circuit toggles are copied too.
+        self.assertFalse(copy.cardioid_check)
+        self.assertTrue(copy.periodicity_check)
+        self.assertFalse(copy.mirror_symmetry)
+
+    def test_deep_zoom_precision(self):
+        """
+        Tests that the centre stays exact beyond double precision.
+        """
+        state = AppState(width=100, height=100, quality=100, center=-0.5 + 0j)
+        state.scale = 1e-40
+
+        # Test Case 1: A one-pixel pan moves the exact centre by one pixel.
+        state.pan(dx=1, dy=0)
+        self.assertAlmostEqual(
+            float((state.center_real + Decimal("0.5")) / Decimal(1e-42)), 1.0
+        )
+
+        # Test Case 2: The rounded centre cannot see the move.
+        self.assertEqual(state.center, -0.5 + 0j)
+
+        # Test Case 3: Copies keep the exact centre.
+        self.assertEqual(state.with_size(10, 10).center_real, state.center_real)
+
+    def test_to_dict(self):
+        """
+        Tests that a state survives a round trip through its description.
+        """
+        state = AppState(width=30, height=20, quality=77, scale=1e-30)
+        state.set_precise_center(
+            Decimal("-0.75000000000000000000000000001"), Decimal(0)
+        )
+        state.cardioid_check = True
+        copy = AppState.from_dict(state.to_dict())
+
+        # Test Case 1: The view, settings and exact centre are restored.
+        self.assertEqual(copy.to_dict(), state.to_dict())
+        self.assertEqual(copy.center_real, state.center_real)
+        self.assertTrue(copy.cardioid_check)
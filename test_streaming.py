@@ -0,0 +1,67 @@
+import numpy as np
+import os
+import tempfile
+import unittest
+from state import AppState
+from backends import get_backend
+from engine import calculate_fractal_numpy
+from colorizer import palette_colors
+from streaming import band_rows_for_budget, render_to_memmap, write_image_tiles
+
+
+class TestStreaming(unittest.TestCase):
+    """
+    Series of tests for the out-of-core renderer in streaming.py.
+    """
+
+    def test_band_rows_for_budget(self):
+        """
+        Tests that bands shrink as the view gets wider.
+        """
+        # Test Case 1: A wider view fits fewer rows in the same budget.
+        self.assertGreater(
+            band_rows_for_budget(1024, 64), band_rows_for_budget(4096, 64)
+        )
+
+        # Test Case 2: At least one row is always rendered.
+        self.assertEqual(band_rows_for_budget(10**9, 1), 1)
+
+    def test_render_to_memmap(self):
+        """
+        Tests that a banded render matches a single full render.
+        """
+        state = AppState(width=50, height=37, quality=60, center=-0.5 + 0j, scale=3.0)
+        bands = []
+
+        with tempfile.TemporaryDirectory() as directory:
+            iterations_path = os.path.join(directory, "iterations.npy")
+            colors_path = os.path.join(directory, "colors.npy")
+            statistics = render_to_memmap(
+                state,
+                get_backend("numpy"),
+                iterations_path,
+                colors_path,
+                band_rows=8,
+                on_band=lambda start, end: bands.append((start, end)),
+            )
+            iterations = np.load(iterations_path)
+            colors = np.load(colors_path)
+
+            # Test Case 3: The colors can be cut into image tiles.
+            tile_paths = write_image_tiles(
+                np.load(colors_path, mmap_mode="r"),
+                os.path.join(directory, "tiles"),
+                tile_size=32,
+            )
+            self.assertEqual(len(tile_paths), 4)
+
+        expected = calculate_fractal_numpy(state)
+
+        # Test Case 1: The iteration counts match, band for band.
+        self.assertEqual(iterations.tolist(), expected.tolist())
+        self.assertEqual(bands[0], (0, 8))
+        self.assertEqual(bands[-1], (32, 37))
+        self.assertEqual(statistics.bands, 5)
+
+        # Test Case 2: Every pixel has the color of its iteration count.
+        self.assertTrue(np.array_equal(colors, palette_colors(60)[expected]))
@@ -0,0 +1,166 @@
+import numpy as np
+import os
+import tempfile
+import unittest
+from state import AppState
+from engine import calculate_fractal_numpy
+from backends import Backend, get_backend
+from tile_cache import TileCache, cached_backend, merge_adjacent_tiles, render_cached
+
+
+class TestTileCache(unittest.TestCase):
+    """
+    Series of tests for the iteration tile cache in tile_cache.py.
+    """
+
+    def test_least_recently_used_eviction(self):
+        """
+        Tests that the memory budget evicts the least recently used tile.
+        """
+        tile = np.zeros((4, 4), dtype=np.int32)
+        cache = TileCache(memory_budget=2 * tile.nbytes)
+
+        cache.put("a", tile)
+        cache.put("b", tile + 1)
+        cache.get("a")
+        cache.put("c", tile + 2)
+
+        # Test Case 1: "b" was used least recently and is evicted.
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").tolist(), tile.tolist())
+        self.assertEqual(cache.get("c").tolist(), (tile + 2).tolist())
+
+        # Test Case 2: The statistics count every request.
+        self.assertEqual(cache.statistics.hits, 3)
+        self.assertEqual(cache.statistics.misses, 1)
+        self.assertEqual(cache.statistics.evictions, 1)
+
+    def test_spill_to_disk(self):
+        """
+        Tests that evicted tiles are spilled to disk and promoted back.
+        """
+        tile = np.arange(16, dtype=np.int32).reshape(4, 4)
+
+        with tempfile.TemporaryDirectory() as spill_directory:
+            cache = TileCache(
+                memory_budget=tile.nbytes, spill_directory=spill_directory
+            )
+            cache.put("a", tile)
+            cache.put("b", tile + 1)
+
+            # Test Case 1: The evicted tile is served from disk.
+            self.assertEqual(len(os.listdir(spill_directory)), 1)
+            self.assertEqual(cache.get("a").tolist(), tile.tolist())
+            self.assertEqual(cache.statistics.disk_hits, 1)
+
+            # Test Case 2: Spilling a key a second time replaces its file.
+            cache.put("b", tile + 2)
+            cache.put("c", tile)
+            cache.put("d", tile)
+            self.assertEqual(cache._disk_bytes, 3 * tile.nbytes)
+            self.assertEqual(len(os.listdir(spill_directory)), 3)
+
+            # Test Case 3: Clearing the cache deletes the spilled tiles.
+            cache.clear()
+            self.assertEqual(os.listdir(spill_directory), [])
+
+    def test_render_cached(self):
+        """
+        Tests that a repeated render is served entirely from the cache.
+        """
+        state = AppState(width=100, height=60, quality=50)
+        cache = TileCache()
+        backend = get_backend("numpy")
+
+        first = render_cached(state, backend, cache)
+        second = render_cached(state, backend, cache)
+
+        # Test Case 1: Both renders match the NumPy render.
+        expected = calculate_fractal_numpy(state).tolist()
+        self.assertEqual(first.tolist(), expected)
+        self.assertEqual(second.tolist(), expected)
+
+        # Test Case 2: The second render did not miss.
+        self.assertEqual(cache.statistics.misses, cache.statistics.hits)
+
+        # Test Case 3: A different iteration limit misses.
+        state.quality = 60
+        render_cached(state, backend, cache)
+        self.assertEqual(cache.statistics.misses, 2 * cache.statistics.hits)
+
+    def test_cached_backend(self):
+        """
+        Tests that a cached backend calculates regions like the original.
+        """
+        state = AppState(width=80, height=50, quality=50)
+        backend = cached_backend(get_backend("numpy"), TileCache())
+
+        # Test Case 1: A region matches the NumPy render.
+        self.assertEqual(
+            backend.calculate(state, 5, 45, 10, 70).tolist(),
+            calculate_fractal_numpy(state, 5, 45, 10, 70).tolist(),
+        )
+
+    def test_missing_tiles_in_one_call(self):
+        """
+        Tests that the missing tiles of a view are calculated in one engine call.
+        """
+        calls = []
+
+        def calculate(state, *region):
+            calls.append(region)
+            return calculate_fractal_numpy(state, *region)
+
+        counting = Backend("counting", "Test backend", lambda: calculate, lambda: True)
+        backend = cached_backend(counting, TileCache())
+        state = AppState(width=200, height=150, quality=50)
+
+        # Test Case 1: A view of twelve cache tiles is a single calculation.
+        iteration_grid = backend.calculate(state)
+        self.assertEqual(calls, [(0, 150, 0, 200)])
+        self.assertEqual(
+            iteration_grid.tolist(), calculate_fractal_numpy(state).tolist()
+        )
+
+        # Test Case 2: Only the bounding box of the missing tiles is calculated.
+        state.quality = 60
+        backend.calculate(state, 0, 64, 0, 200)
+        backend.calculate(state)
+        self.assertEqual(calls[1:], [(0, 64, 0, 200), (64, 150, 0, 200)])
+
+    def test_scattered_missing_tiles(self):
+        """
+        Tests that scattered missing tiles do not recalculate the cached ones.
+        """
+        calculated_pixels = []
+
+        def calculate(state, row_start, row_end, column_start, column_end):
+            calculated_pixels.append(
+                (row_end - row_start) * (column_end - column_start)
+            )
+            return calculate_fractal_numpy(
+                state, row_start, row_end, column_start, column_end
+            )
+
+        counting = Backend("counting", "Test backend", lambda: calculate, lambda: True)
+        backend = cached_backend(counting, TileCache())
+        state = AppState(width=200, height=150, quality=50)
+        backend.calculate(state, 0, 64, 64, 200)
+        backend.calculate(state, 64, 128, 0, 200)
+        backend.calculate(state, 128, 150, 0, 192)
+        calculated_pixels.clear()
+
+        # Test Case 1: Only the two opposite corner tiles are calculated.
+        iteration_grid = backend.calculate(state)
+        self.assertEqual(sorted(calculated_pixels), [8 * 22, 64 * 64])
+        self.assertEqual(
+            iteration_grid.tolist(), calculate_fractal_numpy(state).tolist()
+        )
+
+        # Test Case 2: Neighbouring tiles are still merged into one rectangle.
+        self.assertEqual(
+            merge_adjacent_tiles(
+                [(0, 0, 64, 64), (64, 0, 128, 64), (0, 64, 64, 128), (64, 64, 128, 128)]
+            ),
+            [(0, 0, 128, 128)],
+        )
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from tile_server import TileServer, WORLD_CENTER, WORLD_SCALE, fetch, load_test
+from tile_server import tile_state
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class TestTileServer(unittest.TestCase):
+    """
+    Series of tests for the slippy-map tile server in tile_server.py.
+    """
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.server = TileServer("numpy", self.executor, quality=20)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_tile_state(self):
+        """
+        Tests that tiles split the world in quarters at every zoom level.
+        """
+        # Test Case 1: The single tile of zoom level 0 is the whole world.
+        world = tile_state(0, 0, 0, 100)
+        self.assertEqual(world.center, WORLD_CENTER)
+        self.assertEqual(world.scale, WORLD_SCALE)
+
+        # Test Case 2: The bottom-right tile of zoom level 1.
+        quarter = tile_state(1, 1, 1, 100)
+        self.assertEqual(quarter.scale, WORLD_SCALE / 2)
+        self.assertEqual(
+            quarter.center, WORLD_CENTER + complex(WORLD_SCALE, WORLD_SCALE) / 4
+        )
+
+    def test_coalescing_and_cache(self):
+        """
+        Tests that concurrent requests for a tile share a single render.
+        """
+
+        async def request_tiles():
+            first = await asyncio.gather(
+                *(self.server.get_tile(2, 1, 1) for _ in range(5))
+            )
+            second = await self.server.get_tile(2, 1, 1)
+            return first, second
+
+        first, second = asyncio.run(request_tiles())
+
+        # Test Case 1: Five concurrent requests rendered the tile once.
+        self.assertEqual(self.server.statistics.renders, 1)
+        self.assertEqual(self.server.statistics.coalesced, 4)
+        self.assertTrue(all(png == first[0] for png in first))
+        self.assertTrue(first[0].startswith(PNG_SIGNATURE))
+
+        # Test Case 2: A later request is served from the cache.
+        self.assertEqual(second, first[0])
+        self.assertEqual(self.server.statistics.cache_hits, 1)
+
+    def test_http(self):
+        """
+        Tests the tile, statistics and error responses over a local connection.
+        """
+
+        async def exchange():
+            listener = await self.server.serve(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = [
+                await fetch(reader, writer, path)
+                for path in ["/1/0/1.png", "/1/2/0.png", "/tiles", "/stats"]
+            ]
+            writer.close()
+            result = await load_test(["/1/0/0.png"] * 6, port, concurrency=3)
+            listener.close()
+            await listener.wait_closed()
+            return responses, result
+
+        responses, result = asyncio.run(exchange())
+        (tile_status, tile), (outside_status, _), (unknown_status, _) = responses[:3]
+        stats_status, stats = responses[3]
+
+        # Test Case 1: A tile is returned as a PNG over a kept-alive connection.
+        self.assertEqual(tile_status, 200)
+        self.assertTrue(tile.startswith(PNG_SIGNATURE))
+
+        # Test Case 2: Tiles outside the world and other paths are not found.
+        self.assertEqual(outside_status, 404)
+        self.assertEqual(unknown_status, 404)
+
+        # Test Case 3: The statistics count the tile request.
+        self.assertEqual(stats_status, 200)
+        self.assertEqual(json.loads(stats)["requests"], 1)
+
+        # Test Case 4: The load test client saw every request succeed.
+        self.assertEqual(result.statuses, {200: 6})
+        self.assertEqual(self.server.statistics.renders, 2)
@@ -0,0 +1,406 @@
+import argparse
+import hashlib
+import numpy as np
+import os
+import profiling
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from numpy.typing import NDArray
+from typing import Callable, Optional
+from state import AppState
+from engine import Tile
+from backends import Backend
+from parallel import split_region_into_tiles
+
+CACHE_TILE_SIZE = 64
+DEFAULT_CACHE_MEGABYTES = 256
+
+TileKey = tuple[int, int, Decimal, Decimal, float, Tile, int, str]
+
+
+class CacheStatistics:
+    """Counts how the requests to a `TileCache` were served."""
+
+    def __init__(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of requests served from memory or disk."""
+        requests = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / requests if requests else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate), {self.evictions} evictions, "
+            f"{self.spills} spilled to disk"
+        )
+
+
+class TileCache:
+    """A least-recently-used store of iteration tiles with an optional disk tier.
+
+    Tiles are kept in memory up to `memory_budget` bytes. When a tile is
+    evicted and a `spill_directory` is configured, it is written there instead
+    of discarded and moved back into memory the next time it is requested. The
+    disk tier evicts its least recently spilled tiles once it holds more than
+    `spill_budget` bytes, if given. All methods are safe to call from several
+    threads.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = DEFAULT_CACHE_MEGABYTES * 2**20,
+        spill_directory: Optional[str] = None,
+        spill_budget: Optional[int] = None,
+    ):
+        self.memory_budget = memory_budget
+        self.spill_directory = spill_directory
+        self.spill_budget = spill_budget
+        self.statistics = CacheStatistics()
+        self._memory: OrderedDict[TileKey, NDArray[np.int32]] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[TileKey, tuple[str, int]] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        if spill_directory is not None:
+            os.makedirs(spill_directory, exist_ok=True)
+
+    @staticmethod
+    def key(state: AppState, tile: Tile) -> TileKey:
+        """Builds the cache key of a tile of a view.
+
+        The escape-time short-circuits are left out because they never change
+        an iteration count.
+
+        Args:
+            state (AppState): The application state describing the view.
+            tile (Tile): The (column_start, row_start, column_end, row_end) tile.
+
+        Returns:
+            TileKey: The viewport, tile coordinates, iteration limit and
+                     precision.
+        """
+        return (
+            state.width,
+            state.height,
+            state.center_real,
+            state.center_imag,
+            state.scale,
+            tile,
+            state.quality,
+            state.precision,
+        )
+
+    def get(self, key: TileKey) -> Optional[NDArray[np.int32]]:
+        """Looks up a tile, promoting it to most recently used.
+
+        Args:
+            key (TileKey): The key built by `TileCache.key`.
+
+        Returns:
+            Optional[NDArray[np.int32]]: The cached iteration counts, or None on
+                                         a miss. The array must not be modified.
+        """
+        with self._lock:
+            iteration_tile = self._memory.get(key)
+            if iteration_tile is not None:
+                self._memory.move_to_end(key)
+                self.statistics.hits += 1
+                profiling.count("cache_hits")
+                return iteration_tile
+
+            if key in self._disk:
+                path, size = self._disk.pop(key)
+                self._disk_bytes -= size
+                iteration_tile = np.load(path)
+                os.remove(path)
+                self.statistics.disk_hits += 1
+                profiling.count("cache_disk_hits")
+                self._store(key, iteration_tile)
+                return iteration_tile
+
+            self.statistics.misses += 1
+            profiling.count("cache_misses")
+            return None
+
+    def put(self, key: TileKey, iteration_tile: NDArray[np.int32]) -> None:
+        """Stores a tile as the most recently used, evicting others if needed.
+
+        Args:
+            key (TileKey): The key built by `TileCache.key`.
+            iteration_tile (NDArray[np.int32]): The iteration counts to store. A
+                                                copy is kept.
+        """
+        with self._lock:
+            self._store(key, np.array(iteration_tile, dtype=np.int32))
+
+    def clear(self) -> None:
+        """Drops every tile from memory and deletes every spilled tile."""
+        with self._lock:
+            for path, _ in self._disk.values():
+                os.remove(path)
+            self._memory.clear()
+            self._disk.clear()
+            self._memory_bytes = self._disk_bytes = 0
+
+    def _store(self, key: TileKey, iteration_tile: NDArray[np.int32]) -> None:
+        """Adds a tile to memory and evicts until the budget is met."""
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[key] = iteration_tile
+        self._memory_bytes += iteration_tile.nbytes
+
+        while self._memory_bytes > self.memory_budget and self._memory:
+            evicted_key, evicted_tile = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_tile.nbytes
+            self.statistics.evictions += 1
+            if self.spill_directory is not None:
+                self._spill(evicted_key, evicted_tile)
+
+    def _spill(self, key: TileKey, iteration_tile: NDArray[np.int32]) -> None:
+        """Writes an evicted tile to the spill directory."""
+        if self.spill_budget is not None and iteration_tile.nbytes > self.spill_budget:
+            return
+
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        path = os.path.join(self.spill_directory, f"{digest}.npy")
+        np.save(path, iteration_tile)
+        previous = self._disk.pop(key, None)
+        if previous is not None:
+            self._disk_bytes -= previous[1]
+        self._disk[key] = (path, iteration_tile.nbytes)
+        self._disk_bytes += iteration_tile.nbytes
+        self.statistics.spills += 1
+
+        while self.spill_budget is not None and self._disk_bytes > self.spill_budget:
+            old_path, size = self._disk.popitem(last=False)[1]
+            os.remove(old_path)
+            self._disk_bytes -= size
+
+
+def merge_adjacent_tiles(tiles: list[Tile]) -> list[Tile]:
+    """Merges neighbouring tiles into larger rectangles covering the same pixels.
+
+    Tiles that continue each other along a row are joined first, and then
+    rows of the same columns that continue each other downwards.
+
+    Args:
+        tiles (list[Tile]): Non-overlapping tiles as (column_start, row_start,
+                            column_end, row_end).
+
+    Returns:
+        list[Tile]: Rectangles covering exactly the pixels of the tiles.
+    """
+    spans: list[Tile] = []
+    for column_start, row_start, column_end, row_end in sorted(
+        tiles, key=lambda tile: (tile[1], tile[0])
+    ):
+        if spans and spans[-1][1:] == (row_start, column_start, row_end):
+            spans[-1] = (spans[-1][0], row_start, column_end, row_end)
+        else:
+            spans.append((column_start, row_start, column_end, row_end))
+
+    boxes: list[Tile] = []
+    for column_start, row_start, column_end, row_end in sorted(
+        spans, key=lambda span: (span[0], span[2], span[1])
+    ):
+        if boxes and boxes[-1] == (column_start, boxes[-1][1], column_end, row_start):
+            boxes[-1] = (column_start, boxes[-1][1], column_end, row_end)
+        else:
+            boxes.append((column_start, row_start, column_end, row_end))
+
+    return boxes
+
+
+def render_cached(
+    state: AppState,
+    backend: Backend,
+    cache: TileCache,
+    on_tile: Optional[Callable[[Tile, NDArray[np.int32]], None]] = None,
+    stop_event: Optional[threading.Event] = None,
+    regions: Optional[list[Tile]] = None,
+    tile_size: int = CACHE_TILE_SIZE,
+) -> NDArray[np.int32]:
+    """Renders the view from cached tiles, calculating only the missing ones.
+
+    Cached tiles are reported first. Backends with a renderer of their own
+    get the missing tiles in a single render. Every other backend calculates
+    each rectangle of neighbouring missing tiles in a single call, since
+    rendering them would split every tile into bands and, on the GPU, launch
+    a kernel per band, while a box around scattered tiles would recalculate
+    the cached ones between them. The tiles are stored once the backend
+    completes; a render abandoned through the stop event stores nothing.
+
+    Args:
+        state (AppState): The application state containing all parameters for the
+                          render (width, height, quality, zoom, etc.).
+        backend (Backend): The backend that calculates missing tiles.
+        cache (TileCache): The cache to read from and fill.
+        on_tile (Optional[Callable[[Tile, NDArray[np.int32]], None]]): Called
+            with each cached tile and each piece the backend completes.
+        stop_event (Optional[threading.Event]): A signal to abandon the render.
+        regions (Optional[list[Tile]]): Restricts the render to these regions of
+            the view. Defaults to the whole view.
+        tile_size (int): The edge length of a cached tile in pixels.
+
+    Returns:
+        NDArray[np.int32]: A 2D NumPy array containing the final iteration count
+                           for every pixel. Pixels outside `regions` are left at
+                           zero.
+    """
+    iteration_grid = np.zeros((state.height, state.width), dtype=np.int32)
+    if regions is None:
+        regions = [(0, 0, state.width, state.height)]
+
+    missing_tiles = []
+    for region in regions:
+        for tile in split_region_into_tiles(region, tile_size):
+            iteration_tile = cache.get(TileCache.key(state, tile))
+            if iteration_tile is None:
+                missing_tiles.append(tile)
+                continue
+
+            column_start, row_start, column_end, row_end = tile
+            iteration_grid[row_start:row_end, column_start:column_end] = iteration_tile
+            if on_tile is not None:
+                on_tile(tile, iteration_tile)
+
+    if not missing_tiles:
+        return iteration_grid
+
+    calculated: list[tuple[Tile, NDArray[np.int32]]] = []
+    if backend.has_renderer:
+        calculated_grid = backend.render(
+            state, on_tile=on_tile, stop_event=stop_event, regions=missing_tiles
+        )
+        calculated.append(((0, 0, state.width, state.height), calculated_grid))
+    else:
+        for box in merge_adjacent_tiles(missing_tiles):
+            if stop_event is not None and stop_event.is_set():
+                return iteration_grid
+            column_start, row_start, column_end, row_end = box
+            calculated_grid = backend.calculate(
+                state, row_start, row_end, column_start, column_end
+            )
+            calculated.append((box, calculated_grid))
+    if stop_event is not None and stop_event.is_set():
+        return iteration_grid
+
+    for box, calculated_grid in calculated:
+        box_column_start, box_row_start, box_column_end, box_row_end = box
+        for tile in missing_tiles:
+            column_start, row_start, column_end, row_end = tile
+            if not (
+                box_column_start <= column_start
+                and box_row_start <= row_start
+                and column_end <= box_column_end
+                and row_end <= box_row_end
+            ):
+                continue
+
+            iteration_tile = calculated_grid[
+                row_start - box_row_start : row_end - box_row_start,
+                column_start - box_column_start : column_end - box_column_start,
+            ]
+            iteration_grid[row_start:row_end, column_start:column_end] = iteration_tile
+            cache.put(TileCache.key(state, tile), iteration_tile)
+            if on_tile is not None and not backend.has_renderer:
+                on_tile(tile, iteration_tile)
+
+    return iteration_grid
+
+
+def cached_backend(backend: Backend, cache: TileCache) -> Backend:
+    """Puts a tile cache in front of a backend.
+
+    Args:
+        backend (Backend): The backend that calculates missing tiles.
+        cache (TileCache): The cache to read from and fill.
+
+    Returns:
+        Backend: A backend with the same name that serves cached tiles. It has
+                 a renderer of its own only if the wrapped backend does.
+    """
+
+    def calculate(
+        state: AppState,
+        row_start: int = 0,
+        row_end: Optional[int] = None,
+        column_start: int = 0,
+        column_end: Optional[int] = None,
+    ) -> NDArray[np.int32]:
+        """Calculates a region of the view through the cache."""
+        if row_end is None:
+            row_end = state.height
+        if column_end is None:
+            column_end = state.width
+
+        iteration_grid = render_cached(
+            state,
+            backend,
+            cache,
+            regions=[(column_start, row_start, column_end, row_end)],
+        )
+        return iteration_grid[row_start:row_end, column_start:column_end].copy()
+
+    def render(state: AppState, **options) -> NDArray[np.int32]:
+        """Renders the view through the cache."""
+        return render_cached(state, backend, cache, **options)
+
+    return Backend(
+        backend.name,
+        f"{backend.description}, cached",
+        lambda: calculate,
+        probe=backend.is_available,
+        load_render=(lambda: render) if backend.has_renderer else None,
+    )
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser, default: int) -> None:
+    """Adds the standard tile cache options to a command-line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to extend.
+        default (int): The memory budget in megabytes when the option is not
+                       given. Zero disables the cache.
+    """
+    parser.add_argument(
+        "--cache-mb",
+        type=int,
+        default=default,
+        help=f"tile cache memory budget in MB, 0 to disable (default: {default})",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="directory to spill evicted tiles to (default: discard them)",
+    )
+
+
+def cache_from_arguments(
+    arguments: argparse.Namespace, backend: Backend
+) -> tuple[Backend, Optional[TileCache]]:
+    """Wraps a backend in the tile cache requested on the command line.
+
+    Args:
+        arguments (argparse.Namespace): Options parsed with `add_cache_arguments`.
+        backend (Backend): The backend to put the cache in front of.
+
+    Returns:
+        tuple[Backend, Optional[TileCache]]: The backend to render with, and the
+            cache, or None if caching is disabled.
+    """
+    if arguments.cache_mb <= 0:
+        return backend, None
+
+    cache = TileCache(arguments.cache_mb * 2**20, spill_directory=arguments.cache_dir)
+    return cached_backend(backend, cache), cache
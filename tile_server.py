@@ -0,0 +1,602 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import pygame
+import random
+import re
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable
+from state import AppState
+from backends import add_backend_argument, get_backend
+from colorizer import add_palette_argument, palette_colors
+
+LOCALHOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+TILE_SIZE = 256
+WORLD_CENTER = complex(-0.5, 0.0)
+WORLD_SCALE = 4.0
+MAX_ZOOM = 36
+DEFAULT_TILE_QUALITY = 250
+DEFAULT_QUALITY_PER_ZOOM = 50
+DEFAULT_TILE_CACHE_MEGABYTES = 64
+KEEP_ALIVE_SECONDS = 5.0
+LATENCY_WINDOW = 10_000
+
+TILE_PATH = re.compile(r"^/(\d+)/(\d+)/(\d+)\.png$")
+STATUS_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+TileKey = tuple[int, int, int]
+
+
+def latency_percentile(latencies: Iterable[float], percentile: float) -> float:
+    """Finds a percentile of a set of latencies.
+
+    Args:
+        latencies (Iterable[float]): The latencies in seconds.
+        percentile (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The latency in seconds at that percentile, or 0 without any.
+    """
+    ordered = sorted(latencies)
+    if not ordered:
+        return 0.0
+
+    return ordered[round(percentile / 100 * (len(ordered) - 1))]
+
+
+class ServerStatistics:
+    """Counts how the tile requests of a `TileServer` were served and how fast."""
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.renders = 0
+        self.errors = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.started = time.perf_counter()
+
+    @property
+    def requests_per_second(self) -> float:
+        """The tile requests answered per second since the server started."""
+        elapsed_seconds = time.perf_counter() - self.started
+        return self.requests / elapsed_seconds if elapsed_seconds else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        """Collects the counters and latencies for the `/stats` endpoint.
+
+        Returns:
+            dict[str, float]: The statistics, latencies in milliseconds.
+        """
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "renders": self.renders,
+            "errors": self.errors,
+            "requests_per_second": self.requests_per_second,
+            "latency_p50_ms": latency_percentile(self.latencies, 50) * 1000,
+            "latency_p95_ms": latency_percentile(self.latencies, 95) * 1000,
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.requests} requests ({self.requests_per_second:.1f}/s), "
+            f"{self.cache_hits} cache hits, {self.coalesced} coalesced, "
+            f"{self.renders} renders, {self.errors} errors, latency p50 "
+            f"{latency_percentile(self.latencies, 50) * 1000:.1f} ms, p95 "
+            f"{latency_percentile(self.latencies, 95) * 1000:.1f} ms"
+        )
+
+
+def tile_state(zoom: int, x: int, y: int, quality: int) -> AppState:
+    """Maps a slippy-map tile to the view it shows.
+
+    Zoom level 0 is a single tile covering `WORLD_SCALE` units around
+    `WORLD_CENTER`, and every level splits each tile of the previous one into
+    four. Tile rows grow downwards like the rows of a view.
+
+    Args:
+        zoom (int): The zoom level.
+        x (int): The tile column, from 0 to 2**zoom - 1.
+        y (int): The tile row, from 0 to 2**zoom - 1.
+        quality (int): The iteration limit of the tile.
+
+    Returns:
+        AppState: A `TILE_SIZE` square view of the tile.
+    """
+    tile_scale = WORLD_SCALE / 2**zoom
+    center = complex(
+        WORLD_CENTER.real - WORLD_SCALE / 2 + (x + 0.5) * tile_scale,
+        WORLD_CENTER.imag - WORLD_SCALE / 2 + (y + 0.5) * tile_scale,
+    )
+    return AppState(
+        width=TILE_SIZE,
+        height=TILE_SIZE,
+        quality=quality,
+        center=center,
+        scale=tile_scale,
+    )
+
+
+def render_tile_png(
+    backend_name: str, zoom: int, x: int, y: int, quality: int, palette: str
+) -> bytes:
+    """Renders and encodes one tile.
+
+    Runs in a worker thread or process of the server, so it takes the backend
+    by name rather than as an object that would have to be pickled.
+
+    Args:
+        backend_name (str): The backend that calculates the tile.
+        zoom (int): The zoom level.
+        x (int): The tile column.
+        y (int): The tile row.
+        quality (int): The iteration limit of the tile.
+        palette (str): The color palette, one of `colorizer.PALETTES`.
+
+    Returns:
+        bytes: The tile as a PNG file.
+    """
+    iteration_grid = get_backend(backend_name).calculate(
+        tile_state(zoom, x, y, quality)
+    )
+    colors = palette_colors(quality, palette)[iteration_grid]
+    image = pygame.surfarray.make_surface(colors.transpose(1, 0, 2))
+
+    png_file = io.BytesIO()
+    pygame.image.save(image, png_file, "tile.png")
+    return png_file.getvalue()
+
+
+class TileServer:
+    """An asyncio HTTP server of slippy-map tiles, `/{z}/{x}/{y}.png`.
+
+    Encoded tiles are kept in a least-recently-used cache of up to
+    `cache_budget` bytes. Requests for a tile that is already being rendered
+    wait for that render instead of starting another, and renders run in
+    `executor` so the event loop keeps answering while they calculate. The
+    event loop is the only thread that touches the cache and the statistics.
+    `/stats` returns the statistics as JSON.
+    """
+
+    def __init__(
+        self,
+        backend_name: str,
+        executor: Executor,
+        palette: str = "classic",
+        quality: int = DEFAULT_TILE_QUALITY,
+        quality_per_zoom: int = DEFAULT_QUALITY_PER_ZOOM,
+        cache_budget: int = DEFAULT_TILE_CACHE_MEGABYTES * 2**20,
+    ):
+        self.backend_name = backend_name
+        self.executor = executor
+        self.palette = palette
+        self.quality = quality
+        self.quality_per_zoom = quality_per_zoom
+        self.cache_budget = cache_budget
+        self.statistics = ServerStatistics()
+        self._cache: OrderedDict[TileKey, bytes] = OrderedDict()
+        self._cache_bytes = 0
+        self._in_flight: dict[TileKey, asyncio.Future] = {}
+
+    def tile_quality(self, zoom: int) -> int:
+        """The iteration limit of the tiles of a zoom level."""
+        return self.quality + self.quality_per_zoom * zoom
+
+    async def get_tile(self, zoom: int, x: int, y: int) -> bytes:
+        """Returns a tile from the cache, an ongoing render or a new render.
+
+        Args:
+            zoom (int): The zoom level.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            bytes: The tile as a PNG file.
+        """
+        key = (zoom, x, y)
+        png = self._cache.get(key)
+        if png is not None:
+            self._cache.move_to_end(key)
+            self.statistics.cache_hits += 1
+            return png
+
+        render = self._in_flight.get(key)
+        if render is None:
+            render = asyncio.ensure_future(self._render(key))
+            self._in_flight[key] = render
+        else:
+            self.statistics.coalesced += 1
+
+        # A client that disconnects must not cancel the render others wait for.
+        return await asyncio.shield(render)
+
+    async def _render(self, key: TileKey) -> bytes:
+        """Renders a tile in the executor and caches it."""
+        zoom, x, y = key
+        self.statistics.renders += 1
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                render_tile_png,
+                self.backend_name,
+                zoom,
+                x,
+                y,
+                self.tile_quality(zoom),
+                self.palette,
+            )
+        finally:
+            del self._in_flight[key]
+
+        self._cache[key] = png
+        self._cache_bytes += len(png)
+        while self._cache_bytes > self.cache_budget and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+        return png
+
+    async def respond(self, method: str, path: str) -> tuple[int, str, bytes]:
+        """Answers one request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path, without the query string.
+
+        Returns:
+            tuple[int, str, bytes]: The status code, content type and body.
+        """
+        if method != "GET":
+            return 405, "text/plain", b"Only GET is supported.\n"
+
+        if path == "/stats":
+            body = json.dumps(self.statistics.as_dict(), indent=2).encode()
+            return 200, "application/json", body
+
+        match = TILE_PATH.match(path)
+        if match is None:
+            return 404, "text/plain", b"Tiles are served at /{z}/{x}/{y}.png.\n"
+
+        zoom, x, y = (int(group) for group in match.groups())
+        if zoom > MAX_ZOOM or x >= 2**zoom or y >= 2**zoom:
+            return 404, "text/plain", b"No such tile.\n"
+
+        start_time = time.perf_counter()
+        self.statistics.requests += 1
+        try:
+            png = await self.get_tile(zoom, x, y)
+        except Exception as error:
+            self.statistics.errors += 1
+            return 500, "text/plain", f"Rendering failed: {error}\n".encode()
+        finally:
+            self.statistics.latencies.append(time.perf_counter() - start_time)
+
+        return 200, "image/png", png
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves the requests of one connection, keeping it alive between them.
+
+        Args:
+            reader (asyncio.StreamReader): The incoming side of the connection.
+            writer (asyncio.StreamWriter): The outgoing side of the connection.
+        """
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS
+                    )
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+
+                lines = request.decode("latin-1").split("\r\n")
+                request_line = lines[0].split()
+                headers = {
+                    name.strip().lower(): value.strip()
+                    for name, _, value in (line.partition(":") for line in lines[1:])
+                    if name
+                }
+                if len(request_line) != 3:
+                    status, content_type, body = 400, "text/plain", b"Bad request.\n"
+                else:
+                    method, target, _ = request_line
+                    status, content_type, body = await self.respond(
+                        method, target.split("?", 1)[0]
+                    )
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {STATUS_REASONS[status]}\r\n"
+                        f"Content-Type: {content_type}\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        "Cache-Control: max-age=86400\r\n"
+                        "Access-Control-Allow-Origin: *\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                        "\r\n"
+                    ).encode("latin-1")
+                    + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        """Starts listening on localhost.
+
+        Args:
+            port (int): The port to listen on, or 0 for any free port.
+
+        Returns:
+            asyncio.AbstractServer: The running server.
+        """
+        return await asyncio.start_server(self.handle_connection, LOCALHOST, port)
+
+
+class LoadTestResult:
+    """The responses and latencies seen by a load test client."""
+
+    def __init__(self):
+        self.statuses: dict[int, int] = {}
+        self.latencies: list[float] = []
+        self.elapsed_seconds = 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        """The responses received per second of wall-clock time."""
+        if not self.elapsed_seconds:
+            return 0.0
+        return len(self.latencies) / self.elapsed_seconds
+
+    def __str__(self) -> str:
+        statuses = ", ".join(
+            f"{count} x {status}" for status, count in sorted(self.statuses.items())
+        )
+        return (
+            f"{len(self.latencies)} requests in {self.elapsed_seconds:.2f} s "
+            f"({self.requests_per_second:.1f}/s), latency p50 "
+            f"{latency_percentile(self.latencies, 50) * 1000:.1f} ms, p95 "
+            f"{latency_percentile(self.latencies, 95) * 1000:.1f} ms; "
+            f"responses: {statuses}"
+        )
+
+
+async def fetch(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str
+) -> tuple[int, bytes]:
+    """Sends a GET request over an open connection and reads the response.
+
+    Args:
+        reader (asyncio.StreamReader): The incoming side of the connection.
+        writer (asyncio.StreamWriter): The outgoing side of the connection.
+        path (str): The path to request.
+
+    Returns:
+        tuple[int, bytes]: The status code and body of the response.
+    """
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {LOCALHOST}\r\n\r\n".encode())
+    await writer.drain()
+
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split()[1])
+    length = next(
+        int(line.partition(":")[2])
+        for line in head[1:]
+        if line.lower().startswith("content-length:")
+    )
+    return status, await reader.readexactly(length)
+
+
+async def load_test(
+    paths: list[str], port: int = DEFAULT_PORT, concurrency: int = 8
+) -> LoadTestResult:
+    """Requests paths from a local tile server over concurrent connections.
+
+    Args:
+        paths (list[str]): The paths to request, shared out between clients.
+        port (int): The port of the server on localhost.
+        concurrency (int): The number of clients, each with its own
+                           keep-alive connection.
+
+    Returns:
+        LoadTestResult: The responses and latencies seen.
+    """
+    result = LoadTestResult()
+    pending = deque(paths)
+
+    async def client() -> None:
+        """Requests paths one after another until none are left."""
+        reader, writer = await asyncio.open_connection(LOCALHOST, port)
+        try:
+            while pending:
+                path = pending.popleft()
+                start_time = time.perf_counter()
+                status, _ = await fetch(reader, writer, path)
+                result.latencies.append(time.perf_counter() - start_time)
+                result.statuses[status] = result.statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result.elapsed_seconds = time.perf_counter() - start_time
+    return result
+
+
+def load_test_paths(zoom: int, requests: int, seed: int = 0) -> list[str]:
+    """Picks tile paths like a map viewer would, with repeated tiles.
+
+    Tiles are drawn from a window of 4 by 4 tiles at the given zoom level, so
+    concurrent requests for the same tile and cache hits both occur.
+
+    Args:
+        zoom (int): The zoom level of the tiles.
+        requests (int): The number of paths.
+        seed (int): Seeds the choice of tiles.
+
+    Returns:
+        list[str]: The tile paths.
+    """
+    generator = random.Random(seed)
+    tiles_per_axis = 2**zoom
+    first_x = generator.randrange(max(1, tiles_per_axis - 3))
+    first_y = generator.randrange(max(1, tiles_per_axis - 3))
+    window = min(4, tiles_per_axis)
+
+    return [
+        f"/{zoom}/{first_x + generator.randrange(window)}/"
+        f"{first_y + generator.randrange(window)}.png"
+        for _ in range(requests)
+    ]
+
+
+def serve_command(arguments: argparse.Namespace) -> int:
+    """Runs the tile server until interrupted.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "serve" command.
+
+    Returns:
+        int: The exit status.
+    """
+    backend = get_backend(arguments.backend)
+    executor_class = ProcessPoolExecutor if arguments.processes else ThreadPoolExecutor
+    executor = executor_class(max_workers=arguments.workers)
+    server = TileServer(
+        backend.name,
+        executor,
+        palette=arguments.palette,
+        quality=arguments.quality,
+        quality_per_zoom=arguments.quality_per_zoom,
+        cache_budget=int(arguments.cache_megabytes * 2**20),
+    )
+
+    async def run() -> None:
+        """Serves until the task is cancelled."""
+        listener = await server.serve(arguments.port)
+        print(
+            f"Serving {backend.name} tiles at "
+            f"http://{LOCALHOST}:{arguments.port}/{{z}}/{{x}}/{{y}}.png"
+        )
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+        print(f"Tile server: {server.statistics}")
+
+    return 0
+
+
+def load_command(arguments: argparse.Namespace) -> int:
+    """Load tests a running tile server and prints the results.
+
+    Args:
+        arguments (argparse.Namespace): The options of the "load" command.
+
+    Returns:
+        int: 1 if any request failed, else 0.
+    """
+    paths = load_test_paths(arguments.zoom, arguments.requests, arguments.seed)
+    result = asyncio.run(load_test(paths, arguments.port, arguments.concurrency))
+    print(f"Load test: {result}")
+    return 0 if set(result.statuses) == {200} else 1
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses the command-line options of the tile server.
+
+    Returns:
+        argparse.Namespace: The chosen command and its options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Local slippy-map tile server and load tester."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="serve tiles on localhost")
+    serve_parser.set_defaults(handler=serve_command)
+    add_backend_argument(serve_parser, default="cpu")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="tiles rendered at once (default: one per core)",
+    )
+    serve_parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="render in worker processes instead of threads",
+    )
+    serve_parser.add_argument(
+        "--quality",
+        type=int,
+        default=DEFAULT_TILE_QUALITY,
+        help=f"iteration limit at zoom level 0 (default: {DEFAULT_TILE_QUALITY})",
+    )
+    serve_parser.add_argument(
+        "--quality-per-zoom",
+        type=int,
+        default=DEFAULT_QUALITY_PER_ZOOM,
+        help="iterations added per zoom level "
+        f"(default: {DEFAULT_QUALITY_PER_ZOOM})",
+    )
+    serve_parser.add_argument(
+        "--cache-megabytes",
+        type=float,
+        default=DEFAULT_TILE_CACHE_MEGABYTES,
+        help="encoded tiles kept in memory "
+        f"(default: {DEFAULT_TILE_CACHE_MEGABYTES})",
+    )
+    add_palette_argument(serve_parser)
+
+    load_parser = commands.add_parser("load", help="load test a running server")
+    load_parser.set_defaults(handler=load_command)
+    load_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load_parser.add_argument("--requests", type=int, default=200)
+    load_parser.add_argument("--concurrency", type=int, default=16)
+    load_parser.add_argument("--zoom", type=int, default=4)
+    load_parser.add_argument("--seed", type=int, default=0)
+
+    return parser.parse_args()
+
+
+def main():
+    """Runs the requested command of the tile server.
+
+    "serve" answers `/{z}/{x}/{y}.png` tile requests on localhost until
+    interrupted and prints its statistics on exit. "load" sends a burst of
+    tile requests to a running server over concurrent connections and prints
+    the throughput and latency it saw.
+    """
+    arguments = parse_arguments()
+    sys.exit(arguments.handler(arguments))
+
+
+if __name__ == "__main__":
+    main()